@@ -0,0 +1,379 @@
+"""
+End-to-end benchmark of the indexer on synthetic repositories.
+
+Generates `--repos` repositories under a temporary directory, each holding `--files` source files
+in every one of the seven supported languages. Files are nested `--depth` directories below
+`app/src/`, as in a multi-module project, so each repository becomes one user of the graph. They are
+padded with methods to about `--file-size` bytes and import `--fan-out` other files of the same
+language and repository. Java and Kotlin imports name the imported class, so they also produce links.
+
+Every step is timed on its own:
+
+    process_modules                 walk, parse, link, lay out and write `full_graph.json` (a full rebuild)
+    save_file_trees                 writing `index/file_trees.json` again
+    generate_layouts                laying out the file and repository graphs again from scratch (needs NumPy)
+    generate_individual_user_jsons  per-repository graphs
+    generate_root_level_json        repository-level graph
+
+and recorded with its throughput in files/s and source MB/s and the peak RSS of the process so far
+to a JSON results file. Pass the results of another commit with `--compare` to print the ratios.
+
+Run from the repository root, next to `languages.so`:
+
+    python -m benchmarks.indexer [--repos 4] [--files 50] [--file-size 2000] [--fan-out 3] [--depth 3]
+                                 [--workers 1] [--repeat 1] [--output FILE] [--compare FILE]
+
+Like a real indexing run it overwrites the graphs under `assets/` and the files under `index/`.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from src.parser.process import LANGUAGE_EXTENSIONS, process_modules, save_file_trees
+from src.generator.dillude import generate_individual_user_jsons, generate_root_level_json
+from src.generator.layout import LAYOUT_PATH, generate_layouts, layout_available
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+# Sources live in a module of each repository; `process_modules` takes the directory above `src/`
+# as the user, and the temporary directory would match instead with `<repo>/src/`
+SOURCE_ROOT = ("app", "src")
+
+
+def module_name(language, index):
+    return f"{language.capitalize()}{index}"
+
+
+def module_directories(index, depth):
+    """Directories below the source root holding file `index`, spread over a tree `depth` levels deep."""
+    return [f"level{level}_{(index >> level) % 2}" for level in range(depth)]
+
+
+def java_source(repo, directories, name, imports, methods):
+    package = ".".join(["com", repo] + directories)
+    lines = [f"package {package};", ""]
+    lines += [f"import com.{repo}.{'.'.join(target_directories)}.{target};" for target_directories, target in imports]
+    lines += ["", f"public class {name} {{", "    private int counter = 0;", ""]
+    for method in range(methods):
+        lines += [
+            f"    public int method{method}(int value) {{",
+            f"        counter += value * {method};",
+            "        return counter;",
+            "    }",
+            "",
+        ]
+    lines.append("}")
+    return lines
+
+
+def kotlin_source(repo, directories, name, imports, methods):
+    package = ".".join(["com", repo] + directories)
+    lines = [f"package {package}", ""]
+    lines += [f"import com.{repo}.{'.'.join(target_directories)}.{target}" for target_directories, target in imports]
+    lines += ["", f"class {name} {{", "    var counter = 0", ""]
+    for method in range(methods):
+        lines += [
+            f"    fun method{method}(value: Int): Int {{",
+            f"        counter += value * {method}",
+            "        return counter",
+            "    }",
+            "",
+        ]
+    lines.append("}")
+    return lines
+
+
+def python_source(repo, directories, name, imports, methods):
+    lines = [
+        f"from {'.'.join([repo] + target_directories)}.{target.lower()} import {target}"
+        for target_directories, target in imports
+    ]
+    lines += ["", "", f"class {name}:", "    counter = 0", ""]
+    for method in range(methods):
+        lines += [
+            f"    def method{method}(self, value):",
+            f"        self.counter += value * {method}",
+            "        return self.counter",
+            "",
+        ]
+    return lines
+
+
+def go_source(repo, directories, name, imports, methods):
+    lines = [f"package {directories[-1] if directories else repo}", "", "import ("]
+    lines += [f'    "{repo}/{"/".join(target_directories)}"' for target_directories, _ in imports]
+    lines += [")", "", f"type {name} struct {{", "    counter int", "}", ""]
+    for method in range(methods):
+        lines += [
+            f"func (receiver *{name}) Method{method}(value int) int {{",
+            f"    receiver.counter += value * {method}",
+            "    return receiver.counter",
+            "}",
+            "",
+        ]
+    return lines
+
+
+def javascript_source(repo, directories, name, imports, methods):
+    lines = [
+        f'import {{ {target} }} from "{repo}/{"/".join(target_directories + [target.lower()])}";'
+        for target_directories, target in imports
+    ]
+    lines += ["", f"export class {name} {{", "    counter = 0;", ""]
+    for method in range(methods):
+        lines += [
+            f"    method{method}(value) {{",
+            f"        this.counter += value * {method};",
+            "        return this.counter;",
+            "    }",
+            "",
+        ]
+    lines.append("}")
+    return lines
+
+
+def cpp_source(repo, directories, name, imports, methods):
+    lines = [f'#include "{"/".join(target_directories + [target.lower()])}.h"' for target_directories, target in imports]
+    lines += ["", f"namespace {repo} {{", "", f"class {name} {{", "public:", "    int counter = 0;", ""]
+    for method in range(methods):
+        lines += [
+            f"    int method{method}(int value) {{",
+            f"        counter += value * {method};",
+            "        return counter;",
+            "    }",
+            "",
+        ]
+    lines += ["};", "", "}"]
+    return lines
+
+
+def c_source(repo, directories, name, imports, methods):
+    lines = [f'#include "{"/".join(target_directories + [target.lower()])}.h"' for target_directories, target in imports]
+    lines += ["", f"static int {name.lower()}_counter = 0;", ""]
+    for method in range(methods):
+        lines += [
+            f"int {name.lower()}_method{method}(int value) {{",
+            f"    {name.lower()}_counter += value * {method};",
+            f"    return {name.lower()}_counter;",
+            "}",
+            "",
+        ]
+    return lines
+
+
+SOURCE_TEMPLATES = {
+    "java": java_source,
+    "kotlin": kotlin_source,
+    "javascript": javascript_source,
+    "go": go_source,
+    "python": python_source,
+    "cpp": cpp_source,
+    "c": c_source,
+}
+
+
+def render_source(language, repo, directories, name, imports, file_size):
+    """Render a file of `language`, adding methods until it is at least `file_size` bytes long."""
+    template = SOURCE_TEMPLATES[language]
+    methods = 1
+    source = "\n".join(template(repo, directories, name, imports, methods)) + "\n"
+    while len(source) < file_size:
+        # Grow geometrically towards the target instead of one method at a time
+        methods = max(methods + 1, int(methods * file_size / len(source)))
+        source = "\n".join(template(repo, directories, name, imports, methods)) + "\n"
+    return source
+
+
+def generate_repositories(root_dir, repos, files, file_size, fan_out, depth, seed=0):
+    """
+    Write the synthetic repositories under `root_dir`.
+
+    Returns:
+        tuple: (number of files written, total bytes written)
+    """
+    rng = random.Random(seed)
+    file_count = 0
+    total_bytes = 0
+    for repo_index in range(repos):
+        repo = f"repo{repo_index}"
+        for language, extensions in LANGUAGE_EXTENSIONS.items():
+            for index in range(files):
+                directories = module_directories(index, depth)
+                targets = rng.sample([i for i in range(files) if i != index], min(fan_out, files - 1))
+                imports = [(module_directories(target, depth), module_name(language, target)) for target in targets]
+                name = module_name(language, index)
+                source = render_source(language, repo, directories, name, imports, file_size)
+
+                directory = os.path.join(root_dir, repo, *SOURCE_ROOT, *directories)
+                os.makedirs(directory, exist_ok=True)
+                with open(os.path.join(directory, name.lower() + extensions[0]), "w") as f:
+                    f.write(source)
+                file_count += 1
+                total_bytes += len(source)
+        with open(os.path.join(root_dir, repo, "README.md"), "w") as f:
+            f.write(f"# {repo}\n\nSynthetic repository generated by benchmarks.indexer.\n")
+    return file_count, total_bytes
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, or `None` where it is not available."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_commit():
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+    except OSError:
+        return None
+    return completed.stdout.strip() or None
+
+
+def time_step(function, repeat):
+    """Run `function` `repeat` times and return its fastest time and its last result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmark(root_dir, file_count, total_bytes, workers, repeat):
+    """Time every indexing step over the repositories under `root_dir`."""
+    megabytes = total_bytes / (1024 * 1024)
+    steps = {}
+
+    def record(name, seconds):
+        steps[name] = {
+            "seconds": round(seconds, 4),
+            "files_per_second": round(file_count / seconds, 1) if seconds else None,
+            "mb_per_second": round(megabytes / seconds, 3) if seconds else None,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    seconds, (_, _, _, file_trees, json_data) = time_step(
+        lambda: process_modules(root_dir, workers=workers, full_rebuild=True, use_ast_cache=False), repeat
+    )
+    record("process_modules", seconds)
+    seconds, _ = time_step(lambda: save_file_trees(file_trees), repeat)
+    record("save_file_trees", seconds)
+    repo_positions = None
+    if layout_available():
+
+        def layout_from_scratch():
+            LAYOUT_PATH.unlink(missing_ok=True)
+            return generate_layouts(json_data)
+
+        seconds, repo_positions = time_step(layout_from_scratch, repeat)
+        record("generate_layouts", seconds)
+    seconds, _ = time_step(lambda: generate_individual_user_jsons(json_data), repeat)
+    record("generate_individual_user_jsons", seconds)
+    seconds, _ = time_step(lambda: generate_root_level_json(json_data, positions=repo_positions), repeat)
+    record("generate_root_level_json", seconds)
+
+    return steps, {"nodes": len(json_data["nodes"]), "links": len(json_data["links"])}
+
+
+def print_comparison(results, baseline):
+    print(f"\n{'step':>32} {'baseline s':>11} {'current s':>10} {'ratio':>7}")
+    for name, step in results["steps"].items():
+        baseline_step = baseline.get("steps", {}).get(name)
+        if baseline_step is None:
+            continue
+        ratio = step["seconds"] / baseline_step["seconds"] if baseline_step["seconds"] else float("inf")
+        print(f"{name:>32} {baseline_step['seconds']:>11.4f} {step['seconds']:>10.4f} {ratio:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repos", type=int, default=4)
+    parser.add_argument("--files", type=int, default=50, help="files per language and repository")
+    parser.add_argument("--file-size", type=int, default=2000, help="approximate bytes per file")
+    parser.add_argument("--fan-out", type=int, default=3, help="imports per file")
+    parser.add_argument("--depth", type=int, default=3, help="directory levels below app/src/")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results file, benchmarks/results/indexer-<commit>.json by default")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    args = parser.parse_args()
+
+    commit = current_commit()
+    output = args.output or os.path.join(RESULTS_DIR, f"indexer-{commit or 'unknown'}.json")
+    parameters = {
+        "repos": args.repos,
+        "files": args.files,
+        "file_size": args.file_size,
+        "fan_out": args.fan_out,
+        "depth": args.depth,
+        "workers": args.workers,
+        "repeat": args.repeat,
+        "seed": args.seed,
+    }
+
+    root_dir = tempfile.mkdtemp(prefix="codeview-bench-")
+    try:
+        start = time.perf_counter()
+        file_count, total_bytes = generate_repositories(
+            root_dir, args.repos, args.files, args.file_size, args.fan_out, args.depth, args.seed
+        )
+        print(
+            f"Generated {file_count} files, {total_bytes / (1024 * 1024):.2f} MB "
+            f"in {time.perf_counter() - start:.2f}s under {root_dir}"
+        )
+        steps, graph = run_benchmark(root_dir, file_count, total_bytes, args.workers, args.repeat)
+    finally:
+        shutil.rmtree(root_dir, ignore_errors=True)
+
+    results = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": parameters,
+        "files": file_count,
+        "bytes": total_bytes,
+        "graph": graph,
+        "steps": steps,
+    }
+
+    print(f"\n{'step':>32} {'seconds':>9} {'files/s':>9} {'MB/s':>8} {'peak RSS MB':>12}")
+    for name, step in steps.items():
+        print(
+            f"{name:>32} {step['seconds']:>9.4f} {step['files_per_second'] or 0:>9.1f} "
+            f"{step['mb_per_second'] or 0:>8.3f} {step['peak_rss_mb'] or 0:>12.1f}"
+        )
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            print_comparison(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
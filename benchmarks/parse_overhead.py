@@ -0,0 +1,164 @@
+"""
+Micro-benchmark of the per-file overhead around tree-sitter parsing.
+
+Times each step the parser pool removes or shortens, before and after, over the same files:
+
+    languages  loading the seven `Language` objects and compiling their queries, once per request
+    parser     creating and configuring a `Parser` vs. fetching the thread's pooled one
+    source     text read plus two `bytes(code_string, "utf8")` encodes vs. a single binary read
+    total      `parse_file` end to end, dominated by tree-sitter itself
+
+Before and after runs alternate, and the best of `--repeat` rounds is reported for each.
+
+Run from the repository root, next to `languages.so`:
+
+    python -m benchmarks.parse_overhead [paths ...] [--repeat 5]
+
+Paths default to `src`; directories are searched for every supported extension.
+"""
+
+import os
+import time
+import argparse
+
+from tree_sitter import Language, Parser
+
+from src.parser.TreeNode import TreeNode
+from src.parser.parsers import LANGUAGE_LIBRARY, get_parser
+from src.parser.process import LANGUAGE_EXTENSIONS, load_languages, parse_file, should_skip_path
+from src.parser.queries import compile_queries, get_query
+from src.parser.languages.c import traverse_tree_c
+from src.parser.languages.java import traverse_tree_java
+from src.parser.languages.kt import traverse_tree_kt
+from src.parser.languages.go import traverse_tree_go
+from src.parser.languages.py import traverse_tree_python
+from src.parser.languages.js import traverse_tree_js
+from src.parser.languages.cpp import traverse_tree_cpp
+
+TRAVERSERS = {
+    "java": traverse_tree_java,
+    "kotlin": traverse_tree_kt,
+    "javascript": traverse_tree_js,
+    "go": traverse_tree_go,
+    "python": traverse_tree_python,
+    "cpp": traverse_tree_cpp,
+    "c": traverse_tree_c,
+}
+
+
+def unpooled_parse_file(file_path, language):
+    """The per-file path before the parser pool: text read, fresh parser, repeated encoding."""
+    with open(file_path, "r") as f:
+        code_string = f.read()
+    parser = Parser()
+    parser.set_language(language)
+    tree = parser.parse(bytes(code_string, "utf8"))
+
+    node_tree = TreeNode()
+    TRAVERSERS[language.name](tree.root_node, bytes(code_string, "utf8"), node_tree, language)
+    node_tree.imports = "\n".join(set(node_tree.imports))
+    node_tree.file_path = file_path
+    node_tree.class_names = list(set(node_tree.class_names))
+    node_tree.property_declarations = list(set(node_tree.property_declarations))
+    return node_tree
+
+
+def find_files(paths):
+    """Yield `(file_path, lang)` for every supported file under `paths`."""
+    extension_languages = {ext: lang for lang, extensions in LANGUAGE_EXTENSIONS.items() for ext in extensions}
+    for path in paths:
+        candidates = [path] if os.path.isfile(path) else (
+            os.path.join(directory, name) for directory, _, names in os.walk(path) for name in names
+        )
+        for file_path in candidates:
+            lang = extension_languages.get(os.path.splitext(file_path)[1])
+            if lang and not should_skip_path(file_path):
+                yield file_path, lang
+
+
+def best_time(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def best_times(before, after, repeat):
+    """Best time of `before` and of `after`, run alternately so that drift affects both alike."""
+    best_before = best_after = float("inf")
+    for _ in range(repeat):
+        best_before = min(best_before, best_time(before, 1))
+        best_after = min(best_after, best_time(after, 1))
+    return best_before, best_after
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="*", default=["src"])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    languages = load_languages()
+    file_tasks = [(file_path, languages[lang]) for file_path, lang in find_files(args.paths)]
+    if not file_tasks:
+        parser.error("no supported source files found")
+
+    def languages_before():
+        compile_queries({lang: Language(LANGUAGE_LIBRARY, lang) for lang in LANGUAGE_EXTENSIONS}.values())
+
+    def languages_after():
+        for language in load_languages().values():
+            get_query(language)
+
+    def parser_before():
+        for _, language in file_tasks:
+            Parser().set_language(language)
+
+    def parser_after():
+        for _, language in file_tasks:
+            get_parser(language)
+
+    def source_before():
+        for file_path, _ in file_tasks:
+            with open(file_path, "r") as f:
+                code_string = f.read()
+            bytes(code_string, "utf8")
+            bytes(code_string, "utf8")
+
+    def source_after():
+        for file_path, _ in file_tasks:
+            with open(file_path, "rb") as f:
+                code = f.read()
+            if b"\r" in code:
+                code.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+    def total_before():
+        for file_path, language in file_tasks:
+            unpooled_parse_file(file_path, language)
+
+    def total_after():
+        for file_path, language in file_tasks:
+            parse_file(file_path, language)
+
+    total_after()  # Warm up the page cache before timing
+    steps = [
+        ("languages", languages_before, languages_after, 1),
+        ("parser", parser_before, parser_after, len(file_tasks)),
+        ("source", source_before, source_after, len(file_tasks)),
+        ("total", total_before, total_after, len(file_tasks)),
+    ]
+
+    total_bytes = sum(os.path.getsize(file_path) for file_path, _ in file_tasks)
+    print(f"{len(file_tasks)} files, {total_bytes / 1024:.0f} KiB, best of {args.repeat}")
+    print(f"{'step':>10} {'before us':>10} {'after us':>10} {'per':>6}")
+    for name, before, after, count in steps:
+        before_seconds, after_seconds = best_times(before, after, args.repeat)
+        before_us = before_seconds / count * 1e6
+        after_us = after_seconds / count * 1e6
+        print(f"{name:>10} {before_us:>10.2f} {after_us:>10.2f} {'request' if count == 1 else 'file':>6}")
+
+
+if __name__ == "__main__":
+    main()
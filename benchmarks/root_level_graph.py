@@ -0,0 +1,59 @@
+"""
+Benchmark `build_root_level_graph` on synthetic graphs of 10k to 1M nodes.
+
+Run from the repository root:
+
+    python -m benchmarks.root_level_graph [--sizes 10000 100000 1000000] [--users 200] [--links-per-node 3]
+
+The time per node should stay roughly constant as the graph grows, i.e. the aggregation scales
+linearly with the number of nodes and links.
+"""
+
+import time
+import random
+import argparse
+
+from src.generator.dillude import build_root_level_graph
+
+
+def synthetic_graph(node_count, user_count, links_per_node, seed=0):
+    """Build a `{"nodes": [...], "links": [...]}` graph shaped like `full_graph.json`."""
+    rng = random.Random(seed)
+    nodes = []
+    for index in range(node_count):
+        user = f"user{index % user_count}"
+        nodes.append({
+            "id": f"repos/{user}/src/module{index // 100}/File{index}.java",
+            "user": user,
+            "package": f"com.{user}.module{index // 100}",
+            "description": f"File{index}.java",
+            "fileSize": float(rng.randint(100, 50000)),
+        })
+    links = [
+        {"source": nodes[rng.randrange(node_count)]["id"], "target": nodes[rng.randrange(node_count)]["id"]}
+        for _ in range(node_count * links_per_node)
+    ]
+    return {"nodes": nodes, "links": links}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--links-per-node", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>10} {'links':>10} {'seconds':>10} {'us/node':>10}")
+    for size in args.sizes:
+        graph = synthetic_graph(size, args.users, args.links_per_node)
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            build_root_level_graph(graph)
+            best = min(best, time.perf_counter() - start)
+        print(f"{size:>10} {len(graph['links']):>10} {best:>10.3f} {best / size * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
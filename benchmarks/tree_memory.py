@@ -0,0 +1,131 @@
+"""
+Memory benchmark of the parsed file trees, before and after the compact `TreeNode` and `FunctionNode`.
+
+Measures the bytes kept alive by the trees of the same files in both representations:
+
+    before  one `__dict__` per object, a fresh copy of every identifier and a decoded `str` per body
+    after   `__slots__`, interned identifiers and bodies as spans of one UTF-8 buffer per file
+
+for the trees returned by the parser (`parsed`), rebuilt from their `to_dict()` records as when
+loaded from `index/file_trees.json` (`json`), and read from a file tree store (`store`). It also
+times `to_dict`, which now decodes the bodies. Sizes are the sum of `sys.getsizeof` over every object
+reachable from the trees, shared objects counted once.
+
+Run from the repository root, next to `languages.so`:
+
+    python -m benchmarks.tree_memory [paths ...] [--repeat 5]
+
+Paths default to `src`; directories are searched for every supported extension.
+"""
+
+import gc
+import sys
+import json
+import argparse
+import pathlib
+import tempfile
+
+from src.parser.TreeNode import TreeNode
+from src.parser.process import load_languages, parse_file
+from src.parser.tree_store import FileTreeStore, write_file_tree_store
+from benchmarks.parse_overhead import best_time, find_files
+
+
+class LegacyTreeNode:
+    """`TreeNode` before `__slots__`."""
+
+    def __init__(self, data):
+        self.file_path = data["file_path"]
+        self.class_names = data["class_names"] or []
+        self.package_import_paths = data["package_import_paths"] or {}
+        self.package = data["package"]
+        self.imports = data["imports"]
+        self.exports = data["exports"] or []
+        self.property_declarations = data["property_declarations"] or []
+        self.functions = [LegacyFunctionNode(function) for function in data["functions"]]
+
+
+class LegacyFunctionNode:
+    """`FunctionNode` before `__slots__`, interning and body spans."""
+
+    def __init__(self, data):
+        self.name = data["name"]
+        self.parameters = data["parameters"] or []
+        self.return_type = data["return_type"]
+        self.body = data["body"]
+        self.is_abstract = data["is_abstract"]
+        self.class_name = data["class_name"]
+        self.annotations = data["annotations"] or []
+
+
+def retained_bytes(root):
+    """Sum `sys.getsizeof` over the objects reachable from `root`, each counted once, classes excluded."""
+    seen = set()
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return total
+
+
+def fresh_records(trees):
+    # A JSON round trip copies every string, as the regex groups of the former parsers did
+    return json.loads(json.dumps([tree.to_dict() for tree in trees]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="*", default=["src"])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    languages = load_languages()
+    file_tasks = [(file_path, languages[lang]) for file_path, lang in find_files(args.paths)]
+    if not file_tasks:
+        parser.error("no supported source files found")
+
+    parsed_after = [parse_file(file_path, language) for file_path, language in file_tasks]
+    parsed_before = [LegacyTreeNode(record) for record in fresh_records(parsed_after)]
+    json_after = [TreeNode.from_dict(record) for record in fresh_records(parsed_after)]
+    json_before = [LegacyTreeNode(record) for record in fresh_records(parsed_after)]
+    with tempfile.TemporaryDirectory() as directory:
+        store_path = pathlib.Path(directory) / "file_trees.bin"
+        write_file_tree_store(fresh_records(parsed_after), store_path)
+        with FileTreeStore(store_path) as store:
+            store_after = [tree for _, tree in store.items()]
+            store_before = [LegacyTreeNode(store.record(file_path, bodies=True)) for file_path in store]
+
+    function_count = sum(len(tree.functions) for tree in parsed_after)
+    body_bytes = sum(len(function.body.encode("utf-8")) for tree in parsed_after for function in tree.functions)
+    print(f"{len(file_tasks)} files, {function_count} functions, {body_bytes / 1024:.0f} KiB of bodies")
+    print(f"{'trees':>8} {'before KiB':>11} {'after KiB':>10} {'ratio':>6} {'bytes/function':>15}")
+    for name, before, after in [
+        ("parsed", parsed_before, parsed_after), ("json", json_before, json_after), ("store", store_before, store_after)
+    ]:
+        before_bytes = retained_bytes(before)
+        after_bytes = retained_bytes(after)
+        print(
+            f"{name:>8} {before_bytes / 1024:>11.0f} {after_bytes / 1024:>10.0f} {after_bytes / before_bytes:>6.2f} "
+            f"{(before_bytes - after_bytes) / max(function_count, 1):>15.0f}"
+        )
+
+    def to_dict_before():
+        for tree in parsed_before:
+            {**vars(tree), "functions": [dict(vars(function)) for function in tree.functions]}
+
+    def to_dict_after():
+        for tree in parsed_after:
+            tree.to_dict()
+
+    before_us = best_time(to_dict_before, args.repeat) / len(file_tasks) * 1e6
+    after_us = best_time(to_dict_after, args.repeat) / len(file_tasks) * 1e6
+    print(f"{'to_dict':>8} {before_us:>10.2f} us {after_us:>9.2f} us per file")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,31 @@
 import os
+import re
 import subprocess
 import logging
-from flask import Flask, request, jsonify, session
+import json
+from flask import Flask, Response, request, jsonify, session, send_from_directory
 from flask_cors import CORS
+import time
 import threading
 import subprocess
 
 
 from src.generator.dillude import generate_individual_user_jsons, generate_root_level_json
-
-from src.parser.process import process_modules
+from src.generator.layout import REPOS_VIEW, load_positions
+
+from src.parser.process import EXTENSION_LANGUAGES, process_modules
+from src.parser.pipeline import DEFAULT_IO_WORKERS
+from src.clone import DEFAULT_CLONE_WORKERS, FAILED, clone_repositories, repository_path, sparse_checkout_patterns
+from src.jobs import DONE, FAILED as JOB_FAILED, QUEUED, RUNNING, JobManager
+from src.metrics import gauges, render_prometheus
+from src.profiling import PROFILERS, profiler_available
+from src.parser.search_index import DEFAULT_LIMIT, SEARCH_MODES, SYMBOL_INDEX_PATH, SYMBOL_KINDS, SymbolIndex
+from src.parser.trigram_index import DEFAULT_GREP_LIMIT, TRIGRAM_DOCS_PATH, TrigramIndex
+from src.parser.retrieval import DEFAULT_TOKEN_BUDGET, RetrievalIndex
+from src.parser.tree_store import FILE_TREE_STORE_PATH, FileTreeStore
+from src.generator.graph_views import DEFAULT_VIEW_LIMIT, LEVELS, REPO, GraphViews
+from src.generator.impact import DEFAULT_IMPACT_LIMIT, IMPACT_INDEX_PATH, ImpactIndex, changed_files
+from src.parser.manifest import FILE_TREES_PATH, FULL_GRAPH_PATH, load_cached_file_trees, load_cached_links
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -18,6 +34,31 @@ app.secret_key = os.urandom(24).hex()
 # Enable CORS for all domains on all routes
 CORS(app)
 
+jobs = JobManager()
+
+# Seconds between progress events streamed for a job, and between keep-alive comments
+JOB_EVENT_INTERVAL = 0.25
+JOB_KEEPALIVE_INTERVAL = 15
+
+MAX_SEARCH_LIMIT = 500
+MAX_CONTEXT_BUDGET = 32000
+MAX_GRAPH_VIEW_LIMIT = 5000
+MAX_IMPACT_LIMIT = 10000
+
+# Symbol index loaded by `/search`, reloaded whenever an indexing run rewrites it
+_symbol_index = {'mtime': None, 'index': None}
+_symbol_index_lock = threading.Lock()
+_trigram_index = {'mtime': None, 'index': None}
+_trigram_index_lock = threading.Lock()
+_retrieval_index = {'mtimes': None, 'index': None}
+_retrieval_index_lock = threading.Lock()
+_file_tree_store = {'mtime': None, 'store': None}
+_file_tree_store_lock = threading.Lock()
+_graph_views = {'mtime': None, 'views': None}
+_graph_views_lock = threading.Lock()
+_impact_index = {'mtime': None, 'index': None}
+_impact_index_lock = threading.Lock()
+
 def run_npm_start():
     """Run npm start in a subprocess."""
     subprocess.run(['npm', 'start'], cwd='.')
@@ -89,41 +130,470 @@ def get_file():
 
 
 
+def job_response(job, created):
+    """Describe a submitted job and where to follow its progress."""
+    return jsonify({
+        'job_id': job.id,
+        'deduplicated': not created,
+        'status_url': f'/jobs/{job.id}',
+        'events_url': f'/jobs/{job.id}/events',
+    }), 202
+
+
+def generate_graphs(json_data, report):
+    report('generate')
+    generate_individual_user_jsons(json_data)
+    generate_root_level_json(json_data, positions=load_positions(REPOS_VIEW))
+    return {'nodes': len(json_data['nodes']), 'links': len(json_data['links'])}
+
+
+def requested_profiler(data):
+    """Return the profiler named by the request's `profile` field, or raise `ValueError`."""
+    profiler = data.get('profile') or None
+    if profiler is True:
+        profiler = 'cprofile'
+    if profiler is not None and (profiler not in PROFILERS or not profiler_available(profiler)):
+        raise ValueError(f"Profiler not available: {profiler}, expected one of {', '.join(PROFILERS)}")
+    return profiler
+
+
+def requested_count(data, name, default):
+    """Return the request's `name` field as a positive integer, `default` if absent, or raise `ValueError`."""
+    value = data.get(name, default)
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        count = 0
+    if count < 1 or isinstance(value, bool):
+        raise ValueError(f"{name} must be a positive integer")
+    return count
+
+
 @app.route('/process/local', methods=['POST'])
 def process_local():
-    """Process modules from a local path."""
+    """Queue a job processing modules from a local path and return its ID right away."""
     data = request.json
     local_path = data.get('path', './index/repos')
+    verify_links = bool(data.get('verify_links', False))
+    full_rebuild = bool(data.get('full_rebuild', False))
+    compact = bool(data.get('compact', False))
     try:
-        # Assume process_modules is a function from your provided code
-        _, _, _, _, json_data = process_modules(local_path)
+        workers = requested_count(data, 'workers', 1)
+        io_workers = requested_count(data, 'io_workers', DEFAULT_IO_WORKERS)
+        profiler = requested_profiler(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def run(report):
+        _, _, _, _, json_data = process_modules(
+            local_path, workers=workers, verify_links=verify_links, full_rebuild=full_rebuild, compact=compact,
+            progress=report, io_workers=io_workers
+        )
+        return generate_graphs(json_data, report)
 
-        print(f"process_local: ${json_data}")
-        generate_individual_user_jsons(json_data)
-        print("generate_individual_user_jsons done.")
-        generate_root_level_json(json_data)
-        print("generate_root_level_json done.")
-        return jsonify(json_data), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    job, created = jobs.submit('local', os.path.abspath(local_path), run, profiler=profiler)
+    return job_response(job, created)
 
 @app.route('/clone_and_process', methods=['POST'])
 def clone_and_process():
-    """Clone repositories from provided GitHub links and process them."""
+    """Queue a job cloning repositories from provided GitHub links and processing them."""
     data = request.json
-    repo_urls = data.get('repo_urls')
-    if repo_urls:
+    repo_urls = [url.strip() for url in data.get('repo_urls') or [] if url.strip()]
+    depth = data.get('depth', 1)
+    blob_filter = bool(data.get('blob_filter', True))
+    sparse = bool(data.get('sparse', True))
+    if not repo_urls:
+        return jsonify({'error': 'Repo URLs are required'}), 400
+    if any(url.startswith('-') for url in repo_urls):
+        return jsonify({'error': 'Repo URLs must not start with "-"'}), 400
+    try:
+        workers = requested_count(data, 'workers', 1)
+        io_workers = requested_count(data, 'io_workers', DEFAULT_IO_WORKERS)
+        clone_workers = requested_count(data, 'clone_workers', DEFAULT_CLONE_WORKERS)
+        profiler = requested_profiler(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def run(report):
+        base_path = './index/repos'
+        report('clone', repos_requested=len(repo_urls), repos_cloned=0, repos_failed=0)
+        clone_results = []
+
+        def module_dirs():
+            # Repositories that are not being cloned are indexed right away, the others as their clones finish
+            cloning = {repository_path(url, base_path) for url in repo_urls}
+            for name in sorted(os.listdir(base_path)) if os.path.isdir(base_path) else ():
+                path = os.path.join(base_path, name)
+                if path not in cloning and os.path.isdir(path):
+                    yield path
+            clones = clone_repositories(
+                repo_urls, base_path, max_workers=clone_workers, depth=depth, blob_filter=blob_filter,
+                sparse_patterns=sparse_checkout_patterns(EXTENSION_LANGUAGES) if sparse else None
+            )
+            for result in clones:
+                clone_results.append(result)
+                failed = sum(result['status'] == FAILED for result in clone_results)
+                report(repos_cloned=len(clone_results) - failed, repos_failed=failed)
+                if result['status'] != FAILED:
+                    yield result['path']
+
+        _, _, _, _, json_data = process_modules(
+            base_path, workers=workers, progress=report, module_dirs=module_dirs(), io_workers=io_workers
+        )
+        summary = generate_graphs(json_data, report)
+        summary['clones'] = [
+            {'url': result['url'], 'status': result['status'], 'seconds': round(result['seconds'], 3), 'error': result['error']}
+            for result in clone_results
+        ]
+        summary['failed_clones'] = [result['url'] for result in clone_results if result['status'] == FAILED]
+        return summary
+
+    root = os.path.abspath('./index/repos')
+    job, created = jobs.submit('clone', root, run, key=('clone', root, tuple(sorted(repo_urls))), profiler=profiler)
+    return job_response(job, created)
+
+@app.route('/jobs')
+def list_jobs():
+    return jsonify([job.to_dict() for job in jobs.list()]), 200
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/jobs/<job_id>/events')
+def stream_job_events(job_id):
+    """Stream a job's status as server-sent events until it is done or failed."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def events():
+        version = None
+        while True:
+            new_version = job.wait_for_update(version, JOB_KEEPALIVE_INTERVAL)
+            if new_version == version and not job.finished:
+                yield ': keep-alive\n\n'
+                continue
+            version = new_version
+            yield f'data: {json.dumps(job.to_dict())}\n\n'
+            if job.finished:
+                return
+            # Coalesce bursts of per-file updates into one event per interval
+            time.sleep(JOB_EVENT_INTERVAL)
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/jobs/<job_id>/profile')
+def get_job_profile(job_id):
+    """Download the profile of a finished job submitted with `profile` set."""
+    job = jobs.get(job_id)
+    if job is None or job.profile_path is None or not job.profile_path.exists():
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_from_directory(job.profile_path.parent, job.profile_path.name, as_attachment=True)
+
+def current_symbol_index():
+    """Return the saved `SymbolIndex`, loading it again if it changed, or `None` if there is none."""
+    try:
+        mtime = os.path.getmtime(SYMBOL_INDEX_PATH)
+    except OSError:
+        return None
+    with _symbol_index_lock:
+        if _symbol_index['mtime'] != mtime:
+            _symbol_index['index'] = SymbolIndex.load(SYMBOL_INDEX_PATH)
+            _symbol_index['mtime'] = mtime
+        return _symbol_index['index']
+
+@app.route('/search')
+def search_symbols():
+    """
+    Search classes, functions and properties of every indexed file by name.
+
+    Query parameters: `q`, `mode` (`prefix` by default, `exact` or `fuzzy`), `kind` (repeatable or
+    comma separated), `limit` and `distance` for fuzzy queries. Results carry the graph's file IDs.
+    """
+    query = request.args.get('q', '').strip()
+    mode = request.args.get('mode', 'prefix')
+    kinds = [kind for value in request.args.getlist('kind') for kind in value.split(',') if kind]
+    if not query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    if mode not in SEARCH_MODES:
+        return jsonify({'error': f"Unknown mode: {mode}, expected one of {', '.join(SEARCH_MODES)}"}), 400
+    unknown_kinds = [kind for kind in kinds if kind not in SYMBOL_KINDS]
+    if unknown_kinds:
+        return jsonify({'error': f"Unknown kind: {', '.join(unknown_kinds)}, expected {', '.join(SYMBOL_KINDS)}"}), 400
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_LIMIT)), MAX_SEARCH_LIMIT)
+        distance = request.args.get('distance')
+        distance = int(distance) if distance is not None else None
+    except ValueError:
+        return jsonify({'error': 'limit and distance must be integers'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+
+    index = current_symbol_index()
+    if index is None:
+        return jsonify({'error': 'Symbol index not found, index some repositories first'}), 404
+    start = time.perf_counter()
+    results = index.search(query, mode=mode, kinds=kinds, limit=limit, max_distance=distance)
+    return jsonify({
+        'query': query,
+        'mode': mode,
+        'results': results,
+        'took_ms': round((time.perf_counter() - start) * 1000, 3),
+    }), 200
+
+def current_trigram_index():
+    """Return the saved `TrigramIndex`, opening it again after every indexing run, or `None` if there is none."""
+    try:
+        mtime = os.path.getmtime(TRIGRAM_DOCS_PATH)
+    except OSError:
+        return None
+    with _trigram_index_lock:
+        if _trigram_index['mtime'] != mtime:
+            # The previous index stays mapped until the requests still using it are done
+            _trigram_index['index'] = TrigramIndex.open()
+            _trigram_index['mtime'] = mtime
+        return _trigram_index['index']
+
+@app.route('/grep')
+def grep():
+    """
+    Search the contents of every indexed file with a regular expression.
+
+    Query parameters: `q`, `i` to ignore case, `path` to only search files under a path prefix and
+    `limit`. Only the files containing the trigrams of the pattern's literals are read.
+    """
+    pattern = request.args.get('q', '')
+    ignore_case = request.args.get('i', 'false').lower() in ('1', 'true', 'yes')
+    path_prefix = request.args.get('path') or None
+    if not pattern:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_GREP_LIMIT)), MAX_SEARCH_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+
+    index = current_trigram_index()
+    if index is None:
+        return jsonify({'error': 'Trigram index not found, index some repositories first'}), 404
+    start = time.perf_counter()
+    try:
+        found = index.grep(pattern, ignore_case=ignore_case, limit=limit, path_prefix=path_prefix)
+    except re.error as e:
+        return jsonify({'error': f'Invalid regular expression: {e}'}), 400
+    return jsonify({
+        'query': pattern,
+        **found,
+        'took_ms': round((time.perf_counter() - start) * 1000, 3),
+    }), 200
+
+def current_retrieval_index():
+    """Return the `RetrievalIndex` of the saved file trees and graph, rebuilt after every indexing run."""
+    try:
+        mtimes = (os.path.getmtime(FILE_TREES_PATH), os.path.getmtime(FULL_GRAPH_PATH))
+    except OSError:
+        return None
+    with _retrieval_index_lock:
+        if _retrieval_index['mtimes'] != mtimes:
+            start = time.perf_counter()
+            _retrieval_index['index'] = RetrievalIndex(load_cached_file_trees(), load_cached_links() or [])
+            _retrieval_index['mtimes'] = mtimes
+            logging.info(
+                f"Built the retrieval index of {len(_retrieval_index['index'].units)} units "
+                f"in {time.perf_counter() - start:.2f}s"
+            )
+        return _retrieval_index['index']
+
+@app.route('/context', methods=['GET', 'POST'])
+def code_context():
+    """
+    Pick the functions and file outlines most relevant to a chat question, packed into a prompt context.
+
+    Takes `q` (or `question` in a JSON body) and `budget`, the maximum size of the context in tokens.
+    """
+    data = request.get_json(silent=True) or {}
+    question = (data.get('question') or request.args.get('q') or '').strip()
+    if not question:
+        return jsonify({'error': 'A question is required, as q or as question in a JSON body'}), 400
+    budget = data.get('budget', request.args.get('budget'))
+    try:
+        budget = min(int(budget), MAX_CONTEXT_BUDGET) if budget is not None else DEFAULT_TOKEN_BUDGET
+    except (TypeError, ValueError):
+        return jsonify({'error': 'budget must be an integer'}), 400
+    if budget < 1:
+        return jsonify({'error': 'budget must be positive'}), 400
+
+    index = current_retrieval_index()
+    if index is None:
+        return jsonify({'error': 'No indexed files, index some repositories first'}), 404
+    start = time.perf_counter()
+    context = index.build_context(question, token_budget=budget)
+    return jsonify({
+        'question': question,
+        'budget': budget,
+        **context,
+        'took_ms': round((time.perf_counter() - start) * 1000, 3),
+    }), 200
+
+def current_file_tree_store():
+    """Return the saved `FileTreeStore`, mapping it again after every indexing run, or `None` if there is none."""
+    try:
+        mtime = os.path.getmtime(FILE_TREE_STORE_PATH)
+    except OSError:
+        return None
+    with _file_tree_store_lock:
+        if _file_tree_store['mtime'] != mtime:
+            # The previous store stays mapped until the requests still using it are done
+            _file_tree_store['store'] = FileTreeStore.open()
+            _file_tree_store['mtime'] = mtime
+        return _file_tree_store['store']
+
+@app.route('/file-tree')
+def get_file_tree():
+    """Parsed `TreeNode` of one file, with function bodies only if `bodies` is set."""
+    file_path = request.args.get('filePath')
+    if not file_path:
+        return jsonify({'error': 'Missing file path'}), 400
+    store = current_file_tree_store()
+    if store is None:
+        return jsonify({'error': 'File tree store not found, index some repositories first'}), 404
+    if file_path not in store:
+        return jsonify({'error': 'File not indexed'}), 404
+    bodies = request.args.get('bodies', 'false').lower() in ('1', 'true', 'yes')
+    return jsonify(store.record(file_path, bodies=bodies)), 200
+
+@app.route('/function-body')
+def get_function_body():
+    """Body of the `index`-th function of a file, as plain text."""
+    file_path = request.args.get('filePath')
+    if not file_path:
+        return jsonify({'error': 'Missing file path'}), 400
+    try:
+        index = int(request.args.get('index', ''))
+    except ValueError:
+        return jsonify({'error': 'index must be an integer'}), 400
+    store = current_file_tree_store()
+    if store is None:
+        return jsonify({'error': 'File tree store not found, index some repositories first'}), 404
+    try:
+        body = store.function_body(file_path, index)
+    except KeyError:
+        return jsonify({'error': 'File not indexed'}), 404
+    except IndexError as e:
+        return jsonify({'error': str(e)}), 404
+    return Response(body, mimetype='text/plain'), 200
+
+def current_graph_views():
+    """Return the `GraphViews` of the saved full graph, loading it again after every indexing run."""
+    try:
+        mtime = os.path.getmtime(FULL_GRAPH_PATH)
+    except OSError:
+        return None
+    with _graph_views_lock:
+        if _graph_views['mtime'] != mtime:
+            _graph_views['views'] = GraphViews.load(FULL_GRAPH_PATH)
+            _graph_views['mtime'] = mtime
+        return _graph_views['views']
+
+@app.route('/graph')
+def graph_view():
+    """
+    A capped page of the dependency graph at the `repo`, `package` or `file` level.
+
+    Query parameters: `level`, `repo` and `package` to restrict the view, `focus` and `hops` for the
+    neighbourhood of one node, `limit` and `offset`. Without a focus, nodes come by decreasing degree.
+    """
+    level = request.args.get('level', REPO)
+    if level not in LEVELS:
+        return jsonify({'error': f"Unknown level: {level}, expected one of {', '.join(LEVELS)}"}), 400
+    try:
+        limit = min(int(request.args.get('limit', DEFAULT_VIEW_LIMIT)), MAX_GRAPH_VIEW_LIMIT)
+        offset = max(int(request.args.get('offset', 0)), 0)
+        hops = int(request.args.get('hops', 1))
+    except ValueError:
+        return jsonify({'error': 'limit, offset and hops must be integers'}), 400
+    if limit < 1 or hops < 0:
+        return jsonify({'error': 'limit must be positive and hops non-negative'}), 400
+
+    views = current_graph_views()
+    if views is None:
+        return jsonify({'error': 'Graph not found, index some repositories first'}), 404
+    try:
+        view = views.view(
+            level, repo=request.args.get('repo'), package=request.args.get('package'),
+            focus=request.args.get('focus'), hops=hops, limit=limit, offset=offset
+        )
+    except KeyError:
+        return jsonify({'error': f"Unknown {level}: {request.args.get('focus')}"}), 404
+    return jsonify(view), 200
+
+def current_impact_index():
+    """Return the saved `ImpactIndex`, loading it again after every indexing run, or `None` if there is none."""
+    try:
+        mtime = os.path.getmtime(IMPACT_INDEX_PATH)
+    except OSError:
+        return None
+    with _impact_index_lock:
+        if _impact_index['mtime'] != mtime:
+            _impact_index['index'] = ImpactIndex.load()
+            _impact_index['mtime'] = mtime
+        return _impact_index['index']
+
+@app.route('/impact', methods=['GET', 'POST'])
+def change_impact():
+    """
+    Files affected by a change: every file importing a changed file, directly or transitively.
+
+    Takes the changed files as `paths`, a JSON list or repeated query parameters, and/or a local git
+    repository `repo` with a diff `range` such as `main...HEAD`. `depth` limits the imports followed
+    back from the changed files and `limit` the files returned, nearest first.
+    """
+    data = request.get_json(silent=True) or {}
+    paths = data.get('paths') or request.args.getlist('paths')
+    if isinstance(paths, str):
+        paths = [paths]
+    repo = data.get('repo') or request.args.get('repo')
+    diff_range = data.get('range') or request.args.get('range')
+    try:
+        depth = data.get('depth', request.args.get('depth'))
+        depth = int(depth) if depth is not None else None
+        limit = data.get('limit', request.args.get('limit'))
+        limit = min(int(limit), MAX_IMPACT_LIMIT) if limit is not None else DEFAULT_IMPACT_LIMIT
+        if (depth is not None and depth < 0) or limit < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        return jsonify({'error': 'depth and limit must be non-negative integers'}), 400
+    if bool(repo) != bool(diff_range):
+        return jsonify({'error': 'repo and range go together'}), 400
+    if repo:
+        if not os.path.isdir(repo):
+            return jsonify({'error': f'Repository not found: {repo}'}), 404
         try:
-            failed_clones = clone_repositories(repo_urls)
-            if failed_clones:
-                return jsonify({'error': 'Failed to clone some repositories', 'details': failed_clones}), 500
-            _, _, _, _, json_data = process_modules('./index/repos')
-            generate_individual_user_jsons(json_data)
-            generate_root_level_json(json_data)
-            return jsonify(json_data), 200
-        except Exception as e:
-            return jsonify({'error': str(e)}), 500
-    return jsonify({'error': 'Repo URLs are required'}), 400
+            paths = list(paths) + changed_files(repo, diff_range)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    if not paths:
+        return jsonify({'error': 'Changed files are required, as paths or as a repo and a range'}), 400
+
+    index = current_impact_index()
+    if index is None:
+        return jsonify({'error': 'Impact index not found, index some repositories first'}), 404
+    start = time.perf_counter()
+    result = index.affected(paths, max_depth=depth, limit=limit)
+    return jsonify({**result, 'took_ms': round((time.perf_counter() - start) * 1000, 3)}), 200
+
+@app.route('/metrics')
+def metrics():
+    """Indexing stage timings, pipeline queues and job counts in the Prometheus text format."""
+    job_states = [job.state for job in jobs.list()]
+    for state in (QUEUED, RUNNING, DONE, JOB_FAILED):
+        gauges.set('jobs', job_states.count(state), 'Jobs known to the server by state.', state=state)
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/get-last-modified/<json_file_name>')
 def get_last_modified(json_file_name):
@@ -135,26 +605,11 @@ def get_last_modified(json_file_name):
     except OSError:
         return jsonify({'error': 'File not found'}), 404
 
-def clone_repositories(repo_urls):
-    base_path = './index/repos'
-    os.makedirs(base_path, exist_ok=True)
-    failed_clones = []
-
-    for repo_url in repo_urls:
-        repo_name = repo_url.split('/')[-1].replace('.git', '')
-        repo_path = os.path.join(base_path, repo_name)
-        if not os.path.exists(repo_path):
-            clone_command = f"git clone {repo_url} {repo_path}"
-            result = subprocess.run(clone_command, shell=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
-            if result.returncode != 0:
-                print(f"Failed to clone {repo_url}")
-                failed_clones.append(repo_url)
-            else:
-                print(f"Successfully cloned {repo_url}")
-        else:
-            print(f"Repository {repo_name} already exists at {repo_path}")
-
-    return failed_clones
+@app.route('/assets/<path:asset_path>')
+def get_asset(asset_path):
+    """Serve generated graph assets, both the JSON files and their compact `.bin` encodings."""
+    mimetype = 'application/octet-stream' if asset_path.endswith('.bin') else None
+    return send_from_directory(os.path.join(app.root_path, 'assets'), asset_path, mimetype=mimetype)
 
 def main():
     print("Do you want to link a local path or clone repositories? If your repositories are already in './index/repos/', press Enter twice to proceed with them.")
@@ -181,7 +636,8 @@ def main():
             else:
                 break
         if repo_urls:
-            missing_or_failed = clone_repositories(repo_urls)
+            clone_results = clone_repositories(repo_urls, sparse_patterns=sparse_checkout_patterns(EXTENSION_LANGUAGES))
+            missing_or_failed = [result['url'] for result in clone_results if result['status'] == FAILED]
             if missing_or_failed:
                 print("Some repositories failed to clone:", missing_or_failed)
         _,_,_,_,json_data = process_modules('./index/repos')
@@ -193,7 +649,7 @@ def main():
         print("Invalid option selected. Please try again.")
 
     generate_individual_user_jsons(json_data)
-    generate_root_level_json(json_data)
+    generate_root_level_json(json_data, positions=load_positions(REPOS_VIEW))
     
 
 def run_npm_start():
@@ -9,7 +9,7 @@ import {
 import {
   appState, cmdLineApi, updateTerminalOutput, sendUserInputToApi, loadFileTrees, fetchFileContent,
 } from '../components/api/api.js';
-import { allowOrbit, getOrbitAllowed, getResizing, linkCounts, setResizing, reverseFlowAndColorize } from '../utils.js'
+import { allowOrbit, getOrbitAllowed, getResizing, linkCounts, setResizing, reverseFlowAndColorize, decodeBinaryGraph } from '../utils.js'
 import { fetchFileSummary } from '../components/llama/llama.js';
 
 // Define graph levels as constants for better control
@@ -49,13 +49,15 @@ const cameraDistance = 40;
 function formatNodeLabel(node) {
   const MAX_DISPLAY_LENGTH = 50;
   const fullPath = node.id;
+  // Degrees, fan-in/out and import cycle computed by the server's graph analytics
+  const details = node.description ? `<div><span class='label'>${node.description}</span></div>` : '';
   if (fullPath.length > MAX_DISPLAY_LENGTH) {
     const pathParts = fullPath.split('/');
     const lastPart = pathParts.pop();
     const secondLastPart = pathParts.pop();
-    return `<div><span class='label'>Name: .../${secondLastPart}/${lastPart}</span></div>`;
+    return `<div><span class='label'>Name: .../${secondLastPart}/${lastPart}</span></div>${details}`;
   }
-  return `<div><span class='label'>Name: ${fullPath}</span></div>`;
+  return `<div><span class='label'>Name: ${fullPath}</span></div>${details}`;
 }
 
 function calculateNodeSize(node, minSize, maxSize) {
@@ -221,29 +223,72 @@ function toggleRepoVisibility(repo, isVisible) {
 }
 
 
+// Server-side graph views, capped so that large indexes are never loaded whole
+const GRAPH_API = 'http://127.0.0.1:8000/graph';
+const GRAPH_VIEW_LIMIT = 2000;
+
 // Fetch data for graphs based on level and initialize the graph
 // Function to fetch graph data and initialize graph at a specific node level
 async function fetchAndInitializeGraph(level, nodeId = null) {
   let filePath;
+  let viewUrl = null;
   let basePath = "../../assets/";
   switch (level) {
     case GRAPH_LEVELS.INSANITY:
       filePath = 'full_graph.json';
+      viewUrl = `${GRAPH_API}?level=file&limit=${GRAPH_VIEW_LIMIT}`;
       break;
     case GRAPH_LEVELS.MODULES:
       filePath = 'repos_graph.json';
       break;
     case GRAPH_LEVELS.FILES:
       filePath = `files/${nodeId}.json`;
+      viewUrl = `${GRAPH_API}?level=file&repo=${encodeURIComponent(nodeId)}&limit=${GRAPH_VIEW_LIMIT}`;
       break;
   }
+  // The static assets remain the fallback when the server is not running
+  if (viewUrl && await fetchGraphView(viewUrl, level, nodeId)) {
+    return;
+  }
   await fetchJson(basePath + filePath, level, nodeId);
 }
 
-async function fetchJson(filePath, level, nodeId) {
+async function fetchGraphView(url, level, nodeId) {
   try {
-    const response = await fetch(filePath);
+    const response = await fetch(url);
+    if (!response.ok) {
+      return false;
+    }
     const graphData = await response.json();
+    if (graphData.next_offset !== null) {
+      console.info(`Showing the ${graphData.nodes.length} most connected of ${graphData.total} nodes`);
+    }
+    reverseFlowAndColorize(graphData);
+    initializeGraph(graphData, level, nodeId);
+    return true;
+  } catch (error) {
+    console.warn(`Graph view unavailable at ${url}, loading the static graph`, error);
+    return false;
+  }
+}
+
+// Prefer the compact binary encoding of a graph asset and fall back to its JSON file
+async function fetchGraphData(filePath) {
+  try {
+    const response = await fetch(filePath.replace(/\.json$/, '.bin'));
+    if (response.ok) {
+      return decodeBinaryGraph(await response.arrayBuffer());
+    }
+  } catch (error) {
+    console.warn(`Binary graph unavailable for ${filePath}, loading JSON`, error);
+  }
+  const response = await fetch(filePath);
+  return response.json();
+}
+
+async function fetchJson(filePath, level, nodeId) {
+  try {
+    const graphData = await fetchGraphData(filePath);
     // Reverse the link directions right after fetching the data.
     reverseFlowAndColorize(graphData);
     initializeGraph(graphData, level, nodeId);
@@ -275,8 +320,8 @@ export async function clusterIsolatedNodes() {
   const radiusBase = 200; // Base radius for small graphs
   const radiusMultiplier = Math.max(1, Math.floor(totalElements / 1000)); // Increase radius based on size
 
-  // Identify isolated nodes
-  const isolatedNodes = graphData.nodes.filter(node => !linkedNodes.has(node.id));
+  // Identify isolated nodes, leaving the ones placed by the server's layout where they are
+  const isolatedNodes = graphData.nodes.filter(node => !linkedNodes.has(node.id) && node.fx === undefined);
 
   if (isolatedNodes.length > 0) {
     // Group the isolated nodes by 'user'
@@ -554,43 +599,78 @@ function handleFullscreenChange() {
 document.addEventListener('fullscreenchange', handleFullscreenChange);
 
 
-let percent = 0;
-let interval;
+// Share of the progress bar reached when each job stage starts, in the order process_modules reports them:
+// parse, write, links, write, analytics, layout, write, then generate
+const JOB_STAGE_PERCENT = { clone: 0, parse: 10, links: 82, analytics: 88, layout: 90, generate: 97 };
+// The outputs are written after parsing, linking and layout; each write follows the latest of them reached
+const JOB_WRITE_PERCENT = [['layout', 95], ['links', 86], ['parse', 80]];
 
 
 function toggleProcessing(start) {
-  ;
   loadingSpinner.hidden = !start;
   userInputField.hidden = start;
+  percentComplete.textContent = '0%';
+}
 
-  if (start) {
-    percent = 0;
-    interval = setInterval(() => {
-      if (percent < 90) {
-        percent += 1;
-        percentComplete.textContent = percent + '%';
-      }
-    }, 2000);
-  } else {
-    clearInterval(interval);
+// Estimate overall completion from the stage and file counters reported by an indexing job
+function jobPercent(job) {
+  const { stage, progress } = job;
+  if (stage === 'parse' && progress.files_discovered) {
+    const done = (progress.files_parsed || 0) + (progress.files_reused || 0);
+    return JOB_STAGE_PERCENT.parse + Math.floor(70 * Math.min(1, done / progress.files_discovered));
+  }
+  if (stage === 'write') {
+    const previous = JOB_WRITE_PERCENT.find(([name]) => name in (job.stage_timings || {}));
+    return previous ? previous[1] : JOB_WRITE_PERCENT[JOB_WRITE_PERCENT.length - 1][1];
   }
+  return JOB_STAGE_PERCENT[stage] ?? 0;
 }
 
-function hideOverlay() {
-  // elem.style.visibility = "visible";
-  overlay.style.bottom = '-100%'; // Move overlay out of view
+function showJobProgress(job) {
+  const { progress } = job;
+  let text = `${jobPercent(job)}%`;
+  if (job.stage === 'parse') {
+    text += ` parsing ${progress.files_parsed || 0}/${progress.files_discovered || 0} files`;
+  } else if (job.stage) {
+    text += ` ${job.stage}`;
+  }
+  percentComplete.textContent = text;
 }
 
-function handleResponse(response) {
-  if (response.ok) {
-    response.json().then(data => {
-      console.log(data);
-      alert('Processing completed successfully.');
-      finishLoading();
-    });
-  } else {
+// Follow a queued indexing job through its server-sent progress events
+function followJob(response) {
+  if (!response.ok) {
     throw new Error('Failed to process.');
   }
+  response.json().then(({ job_id, events_url }) => {
+    console.log(`Following job ${job_id}`);
+    const events = new EventSource(`http://127.0.0.1:8000${events_url}`);
+    events.onmessage = (event) => {
+      const job = JSON.parse(event.data);
+      showJobProgress(job);
+      if (job.state === 'done') {
+        events.close();
+        console.log(job);
+        const failedClones = job.result.failed_clones || [];
+        alert(failedClones.length
+          ? `Processing completed, but these repositories failed to clone:\n${failedClones.join('\n')}`
+          : 'Processing completed successfully.');
+        finishLoading();
+      } else if (job.state === 'failed') {
+        events.close();
+        handleError(new Error(job.error));
+      }
+    };
+    events.onerror = (error) => {
+      events.close();
+      handleError(error);
+    };
+  }).catch(handleError);
+}
+
+function hideOverlay() {
+  // elem.style.visibility = "visible";
+  overlay.style.bottom = '-100%'; // Move overlay out of view
 }
 
 function handleError(error) {
@@ -600,12 +680,10 @@ function handleError(error) {
 }
 
 function finishLoading() {
-  clearInterval(interval);
   percentComplete.textContent = '100%';
   setTimeout(() => {
     loadingSpinner.hidden = true;
     inputForm.hidden = false;
-    percent = 0;
     percentComplete.textContent = '0%';
     hideOverlay(); // Hide the overlay after processing is complete
   }, 500);
@@ -622,7 +700,7 @@ export async function processLocalPath() {
       body: JSON.stringify({ path: localPath })
     });
 
-    handleResponse(response);
+    followJob(response);
   } catch (error) {
     handleError(error);
   }
@@ -639,7 +717,7 @@ export async function cloneAndProcessRepos() {
       body: JSON.stringify({ repo_urls: repoUrls })
     });
 
-    handleResponse(response);
+    followJob(response);
   } catch (error) {
     handleError(error);
   }
@@ -0,0 +1,119 @@
+"""
+Concurrent repository cloning for the indexer.
+
+`clone_repositories` runs a bounded number of `git clone` processes at once and yields each result
+as soon as its clone finishes, so callers can start parsing a repository while the others are still
+being cloned. Clones are shallow and partial by default, and a sparse checkout limits the working
+tree to the files the indexer reads. Any URL git understands works, including `file://` URLs of
+local bare repositories.
+"""
+
+import os
+import time
+import shutil
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+DEFAULT_CLONE_WORKERS = 4
+
+CLONED = "cloned"
+EXISTS = "exists"
+FAILED = "failed"
+
+
+def sparse_checkout_patterns(extensions):
+    """Non-cone sparse-checkout patterns for source files with `extensions`, READMEs and `.gitignore` files."""
+    return [f"*{ext}" for ext in extensions] + ["/*[Rr][Ee][Aa][Dd][Mm][Ee]*", ".gitignore"]
+
+
+def repository_path(repo_url, base_path):
+    repo_name = repo_url.rstrip("/").split("/")[-1].replace(".git", "")
+    return os.path.join(base_path, repo_name)
+
+
+def clone_repository(repo_url, base_path, depth=1, blob_filter=True, sparse_patterns=None):
+    """
+    Clone one repository into `base_path`, unless it already exists there.
+
+    Args:
+        repo_url (str): URL of the repository.
+        base_path (str): Directory holding one clone per repository.
+        depth (int): History depth passed to `--depth`, or `None` for the full history.
+        blob_filter (bool): Make a partial clone with `--filter=blob:none`, fetching file contents
+            only for the files that are checked out.
+        sparse_patterns (list): Non-cone sparse-checkout patterns restricting the working tree,
+            or `None` to check out every file.
+
+    Returns:
+        dict: `url`, `path`, `status` (`cloned`, `exists` or `failed`), `seconds` and `error`.
+    """
+    repo_path = repository_path(repo_url, base_path)
+    result = {"url": repo_url, "path": repo_path, "status": EXISTS, "seconds": 0.0, "error": None}
+    if os.path.exists(repo_path):
+        logging.info(f"Repository {repo_url} already exists at {repo_path}")
+        return result
+
+    command = ["git", "clone", "--quiet"]
+    if depth:
+        command += ["--depth", str(depth)]
+    if blob_filter:
+        command.append("--filter=blob:none")
+    if sparse_patterns:
+        command.append("--no-checkout")
+    # `--` keeps a URL such as `--upload-pack=...` from being read as an option
+    commands = [command + ["--", repo_url, repo_path]]
+    if sparse_patterns:
+        commands.append(["git", "-C", repo_path, "sparse-checkout", "set", "--no-cone", *sparse_patterns])
+        commands.append(["git", "-C", repo_path, "checkout", "--quiet"])
+
+    start = time.perf_counter()
+    for command in commands:
+        completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if completed.returncode != 0:
+            # Remove the partial clone so the next attempt does not mistake it for an existing repository
+            shutil.rmtree(repo_path, ignore_errors=True)
+            result.update(status=FAILED, error=completed.stderr.strip())
+            break
+    else:
+        result["status"] = CLONED
+    result["seconds"] = time.perf_counter() - start
+
+    if result["status"] == FAILED:
+        logging.error(f"Failed to clone {repo_url} after {result['seconds']:.2f}s: {result['error']}")
+    else:
+        logging.info(f"Cloned {repo_url} in {result['seconds']:.2f}s")
+    return result
+
+
+def clone_repositories(
+    repo_urls, base_path="./index/repos", max_workers=DEFAULT_CLONE_WORKERS, depth=1, blob_filter=True,
+    sparse_patterns=None
+):
+    """
+    Clone `repo_urls` with at most `max_workers` clones running at once.
+
+    Results are yielded in completion order, see `clone_repository` for their fields and the
+    remaining arguments.
+    """
+    os.makedirs(base_path, exist_ok=True)
+
+    # URLs naming the same repository share one clone, which is reported for each of them
+    urls_by_path = {}
+    for repo_url in repo_urls:
+        repo_url = repo_url.strip()
+        if repo_url:
+            urls_by_path.setdefault(repository_path(repo_url, base_path), []).append(repo_url)
+    if not urls_by_path:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls_by_path)))) as executor:
+        futures = [
+            executor.submit(clone_repository, repo_urls[0], base_path, depth, blob_filter, sparse_patterns)
+            for repo_urls in urls_by_path.values()
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            yield result
+            for repo_url in urls_by_path[result["path"]][1:]:
+                yield dict(result, url=repo_url, status=EXISTS if result["status"] == CLONED else result["status"])
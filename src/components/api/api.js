@@ -206,6 +206,29 @@ export async function fetchFileContent(filePath) {
     }
 }
 
+// Retrieve the indexed functions and file outlines most relevant to a chat question
+export async function fetchCodeContext(question, budget = 2000) {
+    try {
+        const response = await fetch('http://127.0.0.1:8000/context', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ question, budget }),
+        });
+
+        if (!response.ok) {
+            return '';
+        }
+
+        const { context } = await response.json();
+        return context;
+    } catch (error) {
+        console.error('Error fetching code context:', error);
+        return '';
+    }
+}
+
 // Store last known modification times for each file
 let lastModificationTimes = {
     'repos_graph.json': 0,
@@ -258,7 +281,11 @@ export async function sendUserInputToApi() {
         addUserMessageToChatbox(userInput);
         userInputField.value = '';  // Clear input field
 
-        const prompt = getChatContextAsString();
+        let prompt = getChatContextAsString();
+        const codeContext = await fetchCodeContext(userInput);
+        if (codeContext) {
+            prompt = "Relevant code from the indexed repositories:\n\n" + codeContext + "\n\n" + prompt;
+        }
 
         const responseElement = document.createElement('div');
         responseElement.className = 'message message-response';
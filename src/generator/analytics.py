@@ -0,0 +1,379 @@
+"""
+Analytics of the file dependency graph: degrees, PageRank, import cycles and transitive fan-in/out.
+
+`analyze_graph` runs over the links of `process_modules`, where a link goes from the importing file
+to the imported one, and adds to every node record:
+
+    inDegree    files importing it
+    outDegree   files it imports
+    pageRank    PageRank along the imports, high for files many important files depend on
+    fanIn       files depending on it, directly or transitively
+    fanOut      files it depends on, directly or transitively
+    cycleSize   number of files in its import cycle, 0 if it is not part of one
+
+and a `description` summing them up. The graph is stored as CSR adjacency arrays, duplicate links
+and self-imports removed. Cycles are the strongly connected components found by an iterative
+Tarjan's algorithm. Transitive fan-in and fan-out are memoized on the condensation of the
+components, which is acyclic: the files reachable from a component are the union of those
+reachable from its successors, kept as bitsets and freed as soon as every predecessor used them.
+
+Run it on an existing graph with
+
+    python -m src.generator.analytics [assets/full_graph.json] [--top 20]
+"""
+
+import sys
+import json
+import argparse
+from array import array
+from bisect import bisect_left
+from itertools import chain, repeat
+from operator import add, itemgetter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from src.generator.dillude import FULL_GRAPH_PATH
+
+DAMPING = 0.85
+# Sum of the absolute rank changes below which PageRank has converged
+TOLERANCE = 1e-6
+MAX_ITERATIONS = 100
+# Files per pass of the reachability bitsets, bounding each bitset to REACH_BATCH bits
+REACH_BATCH = 1 << 16
+
+
+class CSRGraph:
+    """
+    Directed graph over the nodes `0 .. count - 1` in compressed sparse row form.
+
+    Attributes:
+        offsets (array): `count + 1` offsets, the successors of `node` are `targets[offsets[node]:offsets[node + 1]]`.
+        targets (array): Successors of every node, in increasing order.
+    """
+
+    def __init__(self, count, offsets, targets):
+        self.count = count
+        self.offsets = offsets
+        self.targets = targets
+
+    @classmethod
+    def from_edges(cls, count, sources, targets):
+        """Build the graph from the edges `sources[i]` -> `targets[i]`, dropping duplicates and self-loops."""
+        keys = set(map(add, map(count.__mul__, sources), targets))
+        keys.difference_update(range(0, count * count, count + 1))
+        return cls._from_keys(count, sorted(keys))
+
+    @classmethod
+    def _from_keys(cls, count, keys):
+        # Each edge is the key `source * count + target`, `keys` are sorted and unique
+        targets = array("I", map(count.__rmod__, keys))
+        offsets = array("I", [bisect_left(keys, node * count) for node in range(count + 1)])
+        return cls(count, offsets, targets)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def neighbors(self, node):
+        return self.targets[self.offsets[node] : self.offsets[node + 1]]
+
+    def degrees(self):
+        offsets = self.offsets
+        return [offsets[node + 1] - offsets[node] for node in range(self.count)]
+
+    def sources(self):
+        """Source of every edge, in the order of `targets`."""
+        return chain.from_iterable(map(repeat, range(self.count), self.degrees()))
+
+    def reverse(self):
+        """Return the graph with every edge reversed."""
+        count = self.count
+        return CSRGraph._from_keys(count, sorted(map(add, map(count.__mul__, self.targets), self.sources())))
+
+
+def strongly_connected_components(graph):
+    """
+    Tarjan's algorithm, with an explicit stack so deep import chains do not hit the recursion limit.
+
+    Returns:
+        tuple: (`component` of every node, number of components). Components are numbered in
+        reverse topological order: every edge leads to a component numbered lower or the same.
+    """
+    offsets = graph.offsets
+    targets = graph.targets
+    index = [-1] * graph.count
+    low = [0] * graph.count
+    component = [-1] * graph.count
+    stack = []
+    visited = 0
+    component_count = 0
+
+    for root in range(graph.count):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = visited
+        visited += 1
+        stack.append(root)
+        # (node, position of its next edge to follow)
+        work = [(root, offsets[root])]
+        while work:
+            node, position = work[-1]
+            end = offsets[node + 1]
+            while position < end:
+                successor = targets[position]
+                position += 1
+                if index[successor] == -1:
+                    work[-1] = (node, position)
+                    index[successor] = low[successor] = visited
+                    visited += 1
+                    stack.append(successor)
+                    work.append((successor, offsets[successor]))
+                    break
+                # Visited but without a component yet means still on the stack
+                if component[successor] == -1 and index[successor] < low[node]:
+                    low[node] = index[successor]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[node] < low[parent]:
+                        low[parent] = low[node]
+                if low[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        component[member] = component_count
+                        if member == node:
+                            break
+                    component_count += 1
+    return component, component_count
+
+
+def pagerank(graph, reverse=None, damping=DAMPING, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Return the PageRank of every node of `graph`, summing to 1.
+
+    Each node's rank is pulled from its predecessors in `reverse`, the reversed graph. The rank of
+    nodes without successors is spread over every node. Iterations run on NumPy arrays when it is
+    installed and on lists otherwise.
+    """
+    count = graph.count
+    if count == 0:
+        return []
+    reverse = reverse or graph.reverse()
+    out_degrees = graph.degrees()
+    if np is not None:
+        return _pagerank_arrays(reverse, out_degrees, damping, tolerance, max_iterations)
+
+    dangling = [node for node in range(count) if not out_degrees[node]]
+    reverse_offsets = reverse.offsets
+    predecessors = [reverse.targets[reverse_offsets[node] : reverse_offsets[node + 1]] for node in range(count)]
+    ranks = [1.0 / count] * count
+    for _ in range(max_iterations):
+        shares = [rank / degree if degree else 0.0 for rank, degree in zip(ranks, out_degrees)]
+        base = (1.0 - damping) / count + damping * sum(ranks[node] for node in dangling) / count
+        get_share = shares.__getitem__
+        new_ranks = [base + damping * sum(map(get_share, sources)) for sources in predecessors]
+        change = sum(abs(new - old) for new, old in zip(new_ranks, ranks))
+        ranks = new_ranks
+        if change < tolerance:
+            break
+    return ranks
+
+
+def _pagerank_arrays(reverse, out_degrees, damping, tolerance, max_iterations):
+    count = reverse.count
+    degrees = np.array(out_degrees, dtype=np.float64)
+    dangling = degrees == 0
+    inverse_degrees = np.divide(1.0, degrees, out=np.zeros(count), where=~dangling)
+    sources = np.frombuffer(reverse.targets, dtype=np.uint32)
+    # Target of every reversed edge, in the same order as `sources`
+    targets = np.repeat(np.arange(count), np.diff(np.frombuffer(reverse.offsets, dtype=np.uint32)))
+    ranks = np.full(count, 1.0 / count)
+    for _ in range(max_iterations):
+        base = (1.0 - damping) / count + damping * ranks[dangling].sum() / count
+        new_ranks = base + damping * np.bincount(targets, weights=(ranks * inverse_degrees)[sources], minlength=count)
+        change = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if change < tolerance:
+            break
+    return ranks.tolist()
+
+
+def _reach_counts(dag, readers, order, starts, sizes, node_count):
+    """
+    Count the nodes reachable from every component of `dag`, its own nodes included.
+
+    `order` visits every component after all of its successors, and `readers` counts the
+    predecessors of every component, after which its bitset is dropped. The nodes of component `c`
+    are numbered `starts[c] .. starts[c] + sizes[c] - 1`, so its own bits are a single run. Bitsets
+    only cover REACH_BATCH nodes at a time, one pass over the components per batch.
+    """
+    counts = [0] * dag.count
+    first = 0
+    for low in range(0, node_count, REACH_BATCH):
+        high = low + REACH_BATCH
+        # Components are numbered like their nodes, the ones in this batch follow each other
+        own_bits = {}
+        while first < dag.count and starts[first] < high:
+            start = max(starts[first], low)
+            end = min(starts[first] + sizes[first], high)
+            if start < end:
+                own_bits[first] = ((1 << (end - start)) - 1) << (start - low)
+            if starts[first] + sizes[first] > high:
+                break
+            first += 1
+        reach = [0] * dag.count
+        uses = list(readers)
+        for component in order:
+            bits = own_bits.get(component, 0)
+            for successor in dag.neighbors(component):
+                bits |= reach[successor]
+                uses[successor] -= 1
+                if not uses[successor]:
+                    reach[successor] = 0
+            counts[component] += bits.bit_count()
+            if uses[component]:
+                reach[component] = bits
+    return counts
+
+
+class GraphAnalytics:
+    """
+    Metrics of a file graph, every list indexed like `node_ids`.
+
+    Attributes:
+        graph (CSRGraph): Import edges, from the importing file to the imported file.
+        component (list): Strongly connected component of every node.
+        cycles (list): Node indices of every component with more than one file, largest first.
+    """
+
+    def __init__(self, node_ids, links):
+        self.node_ids = node_ids
+        indices = {node_id: index for index, node_id in enumerate(node_ids)}
+        count = len(node_ids)
+        self.graph = CSRGraph.from_edges(
+            count, map(indices.__getitem__, map(itemgetter("source"), links)),
+            map(indices.__getitem__, map(itemgetter("target"), links))
+        )
+        self.reverse = self.graph.reverse()
+        self.out_degrees = self.graph.degrees()
+        self.in_degrees = self.reverse.degrees()
+        self.ranks = pagerank(self.graph, self.reverse)
+
+        self.component, component_count = strongly_connected_components(self.graph)
+        sizes = [0] * component_count
+        for component in self.component:
+            sizes[component] += 1
+        self.component_sizes = sizes
+        members = [[] for _ in range(component_count)]
+        for node, component in enumerate(self.component):
+            members[component].append(node)
+        self.cycles = sorted((nodes for nodes in members if len(nodes) > 1), key=lambda nodes: (-len(nodes), nodes[0]))
+
+        component_of = self.component.__getitem__
+        condensation = CSRGraph.from_edges(
+            component_count, map(component_of, self.graph.sources()), map(component_of, self.graph.targets)
+        )
+        reverse_condensation = condensation.reverse()
+        starts = [0] * component_count
+        for component in range(1, component_count):
+            starts[component] = starts[component - 1] + sizes[component - 1]
+        # Successors are numbered lower, predecessors higher
+        fan_out = _reach_counts(
+            condensation, reverse_condensation.degrees(), range(component_count), starts, sizes, count
+        )
+        fan_in = _reach_counts(
+            reverse_condensation, condensation.degrees(), range(component_count - 1, -1, -1), starts, sizes, count
+        )
+        self.fan_out = [fan_out[component] - 1 for component in self.component]
+        self.fan_in = [fan_in[component] - 1 for component in self.component]
+
+    def cycle_size(self, node):
+        size = self.component_sizes[self.component[node]]
+        return size if size > 1 else 0
+
+    def metrics(self, node):
+        return {
+            "inDegree": self.in_degrees[node],
+            "outDegree": self.out_degrees[node],
+            "pageRank": round(self.ranks[node], 8),
+            "fanIn": self.fan_in[node],
+            "fanOut": self.fan_out[node],
+            "cycleSize": self.cycle_size(node),
+        }
+
+    def hottest(self, limit):
+        """Indices of the `limit` nodes with the highest PageRank, then fan-in."""
+        return sorted(range(len(self.node_ids)), key=lambda node: (-self.ranks[node], -self.fan_in[node], node))[:limit]
+
+
+def _files(count):
+    return f"{count} file" if count == 1 else f"{count} files"
+
+
+def describe(metrics):
+    description = (
+        f"Imported by {_files(metrics['inDegree'])}, {metrics['fanIn']} transitively; "
+        f"imports {_files(metrics['outDegree'])}, {metrics['fanOut']} transitively; "
+        f"PageRank {metrics['pageRank']:.2e}"
+    )
+    if metrics["cycleSize"]:
+        description += f"; in an import cycle of {metrics['cycleSize']} files"
+    return description
+
+
+def analyze_graph(json_data):
+    """
+    Add the metrics and a `description` to every node of a `{"nodes", "links"}` file graph.
+
+    Returns:
+        GraphAnalytics: The computed metrics, with the import cycles.
+    """
+    nodes = json_data["nodes"]
+    analytics = GraphAnalytics([node["id"] for node in nodes], json_data["links"])
+    for index, node in enumerate(nodes):
+        metrics = analytics.metrics(index)
+        node.update(metrics)
+        node["description"] = describe(metrics)
+    return analytics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("graph_path", nargs="?", default=FULL_GRAPH_PATH)
+    parser.add_argument("--top", type=int, default=20, help="number of hot files and cycles to print")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.graph_path, "r") as f:
+            json_data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Cannot read {args.graph_path}: {e}", file=sys.stderr)
+        return 1
+    analytics = analyze_graph(json_data)
+    print(
+        f"{len(analytics.node_ids)} files, {analytics.graph.edge_count} imports, "
+        f"{len(analytics.cycles)} import cycles\n"
+    )
+    print(f"{'pageRank':>10} {'in':>6} {'fanIn':>7} {'out':>6} {'fanOut':>7}  file")
+    for node in analytics.hottest(args.top):
+        metrics = analytics.metrics(node)
+        print(
+            f"{metrics['pageRank']:>10.2e} {metrics['inDegree']:>6} {metrics['fanIn']:>7} "
+            f"{metrics['outDegree']:>6} {metrics['fanOut']:>7}  {analytics.node_ids[node]}"
+        )
+    for cycle in analytics.cycles[: args.top]:
+        print(f"\nImport cycle of {len(cycle)} files:")
+        for node in cycle:
+            print(f"    {analytics.node_ids[node]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+Compact binary encoding of the graph assets, written next to each graph JSON file.
+
+Layout (little-endian, every section starts on an 8-byte boundary):
+
+    magic        4 bytes  b"CVGB"
+    header       uint32 x 5: version, string count, node count, link count, column count
+    columns      uint32 x 3 per column: name string index, column type, optional flag
+    offsets      uint32 x (string count + 1): byte offsets of each string in the string blob
+    strings      UTF-8 blob holding every interned string once
+    node columns per column, a presence bitmap of node count bits when the column is optional
+                 (bit i of byte i // 8 set when node i has the field), then one array of node count
+                 values: uint32 string indices (COLUMN_STRING), float64 values (COLUMN_FLOAT),
+                 int64 values (COLUMN_INT) or uint32 indices of JSON encoded values (COLUMN_JSON)
+    links        int32 x link count source node indices, then int32 x link count target node indices
+
+Node ids, packages and users are interned in the string table, and links refer to nodes by their
+position in the node columns instead of repeating the full file paths.
+"""
+
+import sys
+import json
+import struct
+from array import array
+
+MAGIC = b"CVGB"
+FORMAT_VERSION = 3
+
+COLUMN_STRING = 0
+COLUMN_FLOAT = 1
+COLUMN_INT = 2
+# Columns mixing types, or holding booleans, nulls, lists or objects
+COLUMN_JSON = 3
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+ALIGNMENT = 8
+
+
+def _pad(buffer):
+    buffer.extend(b"\0" * (-len(buffer) % ALIGNMENT))
+
+
+def _little_endian(values):
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _column_type(values):
+    types = {type(value) for value in values}
+    if types <= {str}:
+        return COLUMN_STRING
+    if types == {float}:
+        return COLUMN_FLOAT
+    if types == {int} and all(INT64_MIN <= value <= INT64_MAX for value in values):
+        return COLUMN_INT
+    return COLUMN_JSON
+
+
+def encode_graph(graph):
+    """
+    Encode a `{"nodes": [...], "links": [...]}` graph into the binary format.
+
+    Columns holding only strings, only floats or only integers are stored as interned strings,
+    float64 or int64 values, any other column as interned JSON, so decoding gives back the same
+    values and types. Columns missing from some nodes are optional: a presence bitmap marks the
+    nodes that have the field, and the placeholder stored for the others is dropped when decoding.
+    """
+    nodes = graph["nodes"]
+    links = graph["links"]
+
+    # Columns are sorted by name, like the keys of the JSON files, so the encoding is canonical
+    column_names = sorted({key for node in nodes for key in node})
+    column_types = [_column_type([node[name] for node in nodes if name in node]) for name in column_names]
+
+    strings = {}
+
+    def intern(value):
+        return strings.setdefault(value, len(strings))
+
+    column_name_indices = [intern(name) for name in column_names]
+    column_optional = []
+    column_bitmaps = []
+    column_data = []
+    for name, column_type in zip(column_names, column_types):
+        optional = any(name not in node for node in nodes)
+        bitmap = bytearray((len(nodes) + 7) // 8 if optional else 0)
+        if optional:
+            for index, node in enumerate(nodes):
+                if name in node:
+                    bitmap[index >> 3] |= 1 << (index & 7)
+        column_optional.append(optional)
+        column_bitmaps.append(bytes(bitmap))
+        if column_type == COLUMN_FLOAT:
+            column_data.append(array("d", (node.get(name, 0.0) for node in nodes)))
+        elif column_type == COLUMN_INT:
+            column_data.append(array("q", (node.get(name, 0) for node in nodes)))
+        elif column_type == COLUMN_STRING:
+            column_data.append(array("I", (intern(node.get(name, "")) for node in nodes)))
+        else:
+            column_data.append(
+                array("I", (intern(json.dumps(node[name], sort_keys=True)) if name in node else 0 for node in nodes))
+            )
+
+    node_index = {node["id"]: index for index, node in enumerate(nodes)}
+    sources = array("i", (node_index[link["source"]] for link in links))
+    targets = array("i", (node_index[link["target"]] for link in links))
+
+    encoded_strings = [value.encode("utf-8") for value in strings]
+    offsets = array("I", [0])
+    for encoded in encoded_strings:
+        offsets.append(offsets[-1] + len(encoded))
+
+    buffer = bytearray(MAGIC)
+    buffer += struct.pack("<5I", FORMAT_VERSION, len(strings), len(nodes), len(links), len(column_names))
+    for name_index, column_type, optional in zip(column_name_indices, column_types, column_optional):
+        buffer += struct.pack("<3I", name_index, column_type, optional)
+    _pad(buffer)
+    buffer += _little_endian(offsets)
+    buffer += b"".join(encoded_strings)
+    _pad(buffer)
+    for bitmap, values in zip(column_bitmaps, column_data):
+        buffer += bitmap
+        _pad(buffer)
+        buffer += _little_endian(values)
+        _pad(buffer)
+    buffer += _little_endian(sources)
+    _pad(buffer)
+    buffer += _little_endian(targets)
+    return bytes(buffer)
+
+
+def decode_graph(data):
+    """Decode bytes produced by `encode_graph` back into a `{"nodes": [...], "links": [...]}` graph."""
+    if data[:4] != MAGIC:
+        raise ValueError("Not a binary graph file")
+    version, string_count, node_count, link_count, column_count = struct.unpack_from("<5I", data, 4)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported binary graph version: {version}")
+
+    position = 24
+    columns = [struct.unpack_from("<3I", data, position + 12 * i) for i in range(column_count)]
+    position += 12 * column_count
+    position += -position % ALIGNMENT
+
+    def read_array(typecode, count):
+        nonlocal position
+        values = array(typecode)
+        values.frombytes(data[position : position + count * values.itemsize])
+        if sys.byteorder != "little":
+            values.byteswap()
+        position += count * values.itemsize
+        return values
+
+    offsets = read_array("I", string_count + 1)
+    blob = data[position : position + offsets[-1]]
+    strings = [blob[offsets[i] : offsets[i + 1]].decode("utf-8") for i in range(string_count)]
+    position += offsets[-1]
+    position += -position % ALIGNMENT
+
+    nodes = [{} for _ in range(node_count)]
+    for name_index, column_type, optional in columns:
+        name = strings[name_index]
+        present = range(node_count)
+        if optional:
+            bitmap = data[position : position + (node_count + 7) // 8]
+            present = [index for index in range(node_count) if bitmap[index >> 3] >> (index & 7) & 1]
+            position += len(bitmap)
+            position += -position % ALIGNMENT
+        if column_type in (COLUMN_FLOAT, COLUMN_INT):
+            values = read_array("d" if column_type == COLUMN_FLOAT else "q", node_count)
+            for index in present:
+                nodes[index][name] = values[index]
+        elif column_type == COLUMN_STRING:
+            values = read_array("I", node_count)
+            for index in present:
+                nodes[index][name] = strings[values[index]]
+        else:
+            values = read_array("I", node_count)
+            for index in present:
+                nodes[index][name] = json.loads(strings[values[index]])
+        position += -position % ALIGNMENT
+
+    sources = read_array("i", link_count)
+    position += -position % ALIGNMENT
+    targets = read_array("i", link_count)
+    links = [
+        {"source": nodes[source]["id"], "target": nodes[target]["id"]} for source, target in zip(sources, targets)
+    ]
+    return {"nodes": nodes, "links": links}
+
+
+def binary_graph_path(json_path):
+    """Return the path of the binary file stored next to a graph JSON file."""
+    return str(json_path)[: -len(".json")] + ".bin"
+
+
+def write_binary_graph(graph, json_path):
+    """Write the binary encoding of `graph` next to its JSON file, e.g. `full_graph.json` -> `full_graph.bin`."""
+    binary_path = binary_graph_path(json_path)
+    with open(binary_path, "wb") as f:
+        f.write(encode_graph(graph))
+    return binary_path
@@ -3,20 +3,89 @@
 """
 import json
 import pathlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from src.metrics import timings
+from src.parser.json_stream import write_json_object_of_arrays
+from src.generator.binary_graph import binary_graph_path, encode_graph, write_binary_graph
+
+FULL_GRAPH_PATH = pathlib.Path(__file__).parent.parent.parent / "assets" / "full_graph.json"
+
+
+def write_if_changed(file_path, data):
+    """
+    Write `data` bytes to `file_path` unless the file already holds exactly those bytes.
+
+    Leaving unchanged files untouched keeps their mtime, which the front end polls to detect updates.
+
+    Returns:
+        bool: Whether the file was written.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    with open(file_path, 'wb') as f:
+        f.write(data)
+    return True
+
+
+def write_graph_files(graph, file_path):
+    """Write `graph` as indented JSON plus its binary encoding, skipping files whose contents are unchanged."""
+    json_bytes = json.dumps(graph, indent=4, sort_keys=True).encode('utf-8')
+    written = write_if_changed(file_path, json_bytes)
+    written |= write_if_changed(binary_graph_path(file_path), encode_graph(graph))
+    return written
+
+
+def save_full_graph(json_data, compact=False, file_path=FULL_GRAPH_PATH):
+    """Write the file-level graph to `full_graph.json`, streaming one node and link at a time, plus its binary encoding."""
+    with open(file_path, "w") as outfile:
+        write_json_object_of_arrays(
+            outfile, [("links", json_data["links"]), ("nodes", json_data["nodes"])], indent=None if compact else 4,
+            sort_keys=True
+        )
+    write_binary_graph(json_data, file_path)
+
+
+def partition_user_graphs(json_data):
+    """
+    Split the full graph into one graph per user, keeping only the links between that user's files.
+
+    Nodes and links are each visited once; an id -> user map assigns every link to the user owning
+    both of its endpoints. Nodes and links keep their order from `json_data`.
+    """
+    user_graphs = {}
+    node_users = {}
+    for node in json_data['nodes']:
+        user = node['user']
+        node_users[node['id']] = user
+        if user not in user_graphs:
+            user_graphs[user] = {'nodes': [], 'links': []}
+        user_graphs[user]['nodes'].append(node)
 
-def generate_individual_user_jsons(json_data):
-    print("generate_individual_user_jsons ...")
-    # Extract nodes and links from the data
-    nodes = json_data['nodes']
-    links = json_data['links']
+    for link in json_data['links']:
+        source_user = node_users.get(link['source'])
+        if source_user is not None and source_user == node_users.get(link['target']):
+            user_graphs[source_user]['links'].append(link)
 
-    # Create a dictionary to hold nodes for each user
-    user_nodes_dict = {}
-    for node in nodes:
-        user = node['user']
-        if user not in user_nodes_dict:
-            user_nodes_dict[user] = []
-        user_nodes_dict[user].append(node)
+    return user_graphs
+
+
+def generate_individual_user_jsons(json_data, workers=None):
+    """
+    Write the graph of every user to `assets/files/<user>.json`, plus its binary encoding, with
+    `workers` threads. Files whose contents are unchanged are left untouched.
+
+    Returns:
+        dict: The `{"nodes": [...], "links": [...]}` graph of every user, by user in first-seen order,
+        as built by `partition_user_graphs`. Before the graphs were partitioned in one pass, only the
+        last user's graph was returned; it is the last value of the dict.
+    """
+    user_graphs = partition_user_graphs(json_data)
 
     # Get the absolute path of the current script
     script_location = pathlib.Path(__file__).parent.absolute()
@@ -25,67 +94,57 @@ def generate_individual_user_jsons(json_data):
     # Make sure the directory exists
     assets_dir.mkdir(parents=True, exist_ok=True)
 
-    # Initialize an empty dictionary to hold any output data
-    file_json = {}
-
-    # For each user, extract the relevant links and save the nodes and links in a separate JSON file
-    for user, user_nodes in user_nodes_dict.items():
-        user_links = [link for link in links if link['source'] in [node['id'] for node in user_nodes] and link['target'] in [node['id'] for node in user_nodes]]
-        file_json = {
-            'nodes': user_nodes,
-            'links': user_links
-        }
-
-        file_path = assets_dir / f'{user}.json'
-        print(f"Saving file tree: {file_path}")
-
-        with open(file_path, 'w') as outfile:
-            json.dump(file_json, outfile, indent=4, sort_keys=True)
+    # Save the nodes and links of each user in a separate JSON file, one user per thread
+    file_paths = [assets_dir / f'{user}.json' for user in user_graphs]
+    with timings.span("write", output="user_graphs"):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            written = list(executor.map(write_graph_files, user_graphs.values(), file_paths))
 
-    print("Individual user JSONs generated successfully!")
-    return file_json
+    logging.info(f"Saved {sum(written)} of {len(file_paths)} user graphs, the others were unchanged")
+    return user_graphs
 
 
-def generate_root_level_json(json_data):
+def build_root_level_graph(json_data):
+    """
+    Aggregate the file-level graph into one node per user and the unique links between users.
 
-    print(f"generate_root_level_json...")
-
-    # Create a set of unique users
-    users = {node['user'] for node in json_data['nodes']}
-
-    # Initialize new nodes data structure
-    new_nodes = [
-        {
-            'id': user,
-            'description': user,
-            'fileSize': sum(node['fileSize'] for node in json_data['nodes'] if node['user'] == user),
-            'fileCount': sum(1 for node in json_data['nodes'] if node['user'] == user)  # Counting the files
-        }
-        for user in users
-    ]
-
-    # Initialize a set to store unique user-to-user links
-    links = set()
-
-    # Loop through the original links
+    Nodes and links are each visited once: an id -> user map resolves link endpoints and per-user
+    accumulators collect `fileSize` and `fileCount`. Users and links keep their first-seen order.
+    """
+    node_users = {}
+    user_nodes = {}
+    for node in json_data['nodes']:
+        user = node['user']
+        node_users[node['id']] = user
+        user_node = user_nodes.get(user)
+        if user_node is None:
+            user_node = user_nodes[user] = {'id': user, 'description': user, 'fileSize': 0, 'fileCount': 0}
+        user_node['fileSize'] += node['fileSize']
+        user_node['fileCount'] += 1  # Counting the files
+
+    # Unique user-to-user links, skipping links within a single user
+    links = {}
     for link in json_data['links']:
-        # Find the corresponding users for the source and target
-        source_user = next(node['user'] for node in json_data['nodes'] if node['id'] == link['source'])
-        target_user = next(node['user'] for node in json_data['nodes'] if node['id'] == link['target'])
-
-        # Add the link to the set, if the source and target users are not the same
+        source_user = node_users[link['source']]
+        target_user = node_users[link['target']]
         if source_user != target_user:
-            links.add((source_user, target_user))
-
-    # Convert the set of links to the desired format
-    new_links = [{'source': link[0], 'target': link[1]} for link in links]
+            links[(source_user, target_user)] = None
 
-    # Combine the new nodes and links into a new JSON object
-    repo_json = {
-        'nodes': new_nodes,
-        'links': new_links
+    return {
+        'nodes': list(user_nodes.values()),
+        'links': [{'source': source, 'target': target} for source, target in links]
     }
 
+
+def generate_root_level_json(json_data, positions=None):
+    repo_json = build_root_level_graph(json_data)
+    if positions:
+        # Precomputed layout, by `src.generator.layout`
+        for node in repo_json['nodes']:
+            position = positions.get(node['id'])
+            if position is not None:
+                node['fx'], node['fy'], node['fz'] = position
+
     # Get the absolute path of the current script
     script_location = pathlib.Path(__file__).parent.absolute()
 
@@ -97,9 +156,7 @@ def generate_root_level_json(json_data):
 
     file_path = assets_dir / 'repos_graph.json'
 
-    print("".format(file_path))
-    with open(file_path, 'w') as outfile:
-        print(f"{repo_json}")
-        json.dump(repo_json, outfile, indent=4, sort_keys=True)
+    with timings.span("write", output="repos_graph"):
+        write_graph_files(repo_json, file_path)
 
     return repo_json
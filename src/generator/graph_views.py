@@ -0,0 +1,177 @@
+"""
+Level-of-detail views of the dependency graph, served by the `/graph` endpoint.
+
+`GraphViews` aggregates the file graph of `full_graph.json` at three levels: `repo`, one node per
+user like `repos_graph.json`, `package`, one node per package directory, and `file`. Aggregated
+nodes carry the number and total size of their files and links carry the number of file links
+they stand for. Each level is built once, on first use, with its nodes ranked by degree.
+
+`view` pages through one level, optionally restricted to one repository or package directory:
+either the k-hop neighbourhood of a focus node, nearest nodes first, or the whole level, highest
+degree first. A page holds at most `limit` nodes and only the links between them, so a client
+never has to load more of the graph than it can lay out.
+"""
+
+import json
+from collections import defaultdict
+
+REPO = "repo"
+PACKAGE = "package"
+FILE = "file"
+LEVELS = (REPO, PACKAGE, FILE)
+
+DEFAULT_VIEW_LIMIT = 500
+MAX_HOPS = 5
+
+
+class LevelGraph:
+    """
+    The graph at one level of detail.
+
+    Attributes:
+        nodes (dict): Node dict by ID, with `fileCount` and `fileSize` of the files it groups.
+        links (dict): Source ID -> target ID -> number of file links between them.
+        neighbors (dict): ID -> IDs linked to it in either direction.
+        order (list): Node IDs by decreasing degree, then ID.
+    """
+
+    def __init__(self, level, json_data):
+        self.level = level
+        self.nodes = {}
+        groups = {}
+        for node in json_data["nodes"]:
+            if level == FILE:
+                key = node["id"]
+                self.nodes[key] = {**node, "fileCount": 1}
+            else:
+                key = node["user"] if level == REPO else node["package"]
+                group = self.nodes.get(key)
+                if group is None:
+                    group = self.nodes[key] = {"id": key, "user": node["user"], "fileCount": 0, "fileSize": 0}
+                    if level == PACKAGE:
+                        group["package"] = key
+                group["fileCount"] += 1
+                group["fileSize"] += node["fileSize"]
+            groups[node["id"]] = key
+
+        self.links = defaultdict(dict)
+        self.neighbors = defaultdict(set)
+        for link in json_data["links"]:
+            source = groups.get(link["source"])
+            target = groups.get(link["target"])
+            if source is None or target is None or (source == target and level != FILE):
+                continue
+            targets = self.links[source]
+            targets[target] = targets.get(target, 0) + 1
+            self.neighbors[source].add(target)
+            self.neighbors[target].add(source)
+
+        self.degrees = {key: len(self.neighbors.get(key, ())) for key in self.nodes}
+        self.order = sorted(self.nodes, key=lambda key: (-self.degrees[key], key))
+        self.ranks = {key: rank for rank, key in enumerate(self.order)}
+
+    def hops_from(self, focus, hops, allowed):
+        """Distance of every allowed node at most `hops` links away from `focus`, in either direction."""
+        distances = {focus: 0}
+        frontier = [focus]
+        for distance in range(1, hops + 1):
+            next_frontier = []
+            for key in frontier:
+                for neighbor in self.neighbors.get(key, ()):
+                    if neighbor not in distances and allowed(neighbor):
+                        distances[neighbor] = distance
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        return distances
+
+
+class GraphViews:
+    """Aggregated views of one `full_graph.json`, each level built on first use."""
+
+    def __init__(self, json_data):
+        self.json_data = json_data
+        self._levels = {}
+
+    @classmethod
+    def load(cls, path):
+        """Load the graph at `path`, or return `None` if it is missing or unreadable."""
+        try:
+            with open(path, "r") as f:
+                return cls(json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def level(self, level):
+        if level not in LEVELS:
+            raise ValueError(f"Unknown level: {level}, expected one of {', '.join(LEVELS)}")
+        graph = self._levels.get(level)
+        if graph is None:
+            # Levels may be built by concurrent requests, the last one built wins
+            graph = self._levels[level] = LevelGraph(level, self.json_data)
+        return graph
+
+    def view(self, level=REPO, repo=None, package=None, focus=None, hops=1, limit=DEFAULT_VIEW_LIMIT, offset=0):
+        """
+        Return a page of the graph at `level`.
+
+        Args:
+            level (str): `repo`, `package` or `file`.
+            repo (str): Only include nodes of this user/repository.
+            package (str): Only include packages or files in this package directory or below it.
+            focus (str): Node ID at `level` to centre the view on. Raises `KeyError` if unknown.
+            hops (int): Links to follow from `focus`, in either direction, at least 0.
+            limit (int): Maximum number of nodes returned, at least 1.
+            offset (int): Number of nodes to skip, to fetch the pages after the first.
+
+        Returns:
+            dict: `nodes`, each with its `degree` and, around a focus, its `hops`; the `links` between
+            them with their `weight`; the `total` number of nodes in the view and the `next_offset`,
+            or `None` on the last page.
+        """
+        if limit < 1 or hops < 0 or offset < 0:
+            raise ValueError("limit must be positive, hops and offset non-negative")
+        graph = self.level(level)
+
+        def allowed(key):
+            node = graph.nodes[key]
+            if repo is not None and node["user"] != repo:
+                return False
+            if package is not None and level != REPO:
+                node_package = node["package"]
+                if node_package != package and not node_package.startswith(package + "/"):
+                    return False
+            return True
+
+        distances = None
+        if focus is not None:
+            if focus not in graph.nodes:
+                raise KeyError(focus)
+            distances = graph.hops_from(focus, min(hops, MAX_HOPS), allowed)
+            candidates = sorted(distances, key=lambda key: (distances[key], graph.ranks[key]))
+        elif repo is None and package is None:
+            candidates = graph.order
+        else:
+            candidates = [key for key in graph.order if allowed(key)]
+
+        page = candidates[offset : offset + limit]
+        selected = set(page)
+        nodes = []
+        links = []
+        for key in page:
+            node = {**graph.nodes[key], "degree": graph.degrees[key]}
+            if distances is not None:
+                node["hops"] = distances[key]
+            nodes.append(node)
+            for target, weight in graph.links.get(key, {}).items():
+                if target in selected:
+                    links.append({"source": key, "target": target, "weight": weight})
+
+        end = offset + len(page)
+        return {
+            "level": level,
+            "nodes": nodes,
+            "links": links,
+            "total": len(candidates),
+            "offset": offset,
+            "next_offset": end if end < len(candidates) else None,
+        }
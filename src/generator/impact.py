@@ -0,0 +1,229 @@
+"""
+Change impact queries: the files depending, directly or transitively, on a set of changed files.
+
+`process_modules` saves the reversed import graph built by `analyze_graph` to `index/impact.bin`:
+
+    header      magic, version, node count, edge count and length of the node ID list
+    offsets     node count + 1 uint32, the importers of node `i` are `sources[offsets[i]:offsets[i + 1]]`
+    sources     edge count uint32
+    node IDs    JSON array of the file paths, in node order
+
+Loading it reads two arrays and one JSON list, without parsing `full_graph.json`, and a query is a
+breadth-first search from the changed files over their importers, visiting only the affected files.
+
+Changed files are given as graph paths, or as the files of a git diff range in a local repository:
+
+    python -m src.generator.impact [--depth N] [--limit N] PATH...
+    python -m src.generator.impact --repo index/repos/alpha --range main...HEAD
+"""
+
+import os
+import sys
+import json
+import struct
+import pathlib
+import argparse
+import subprocess
+from array import array
+
+from src.parser.manifest import INDEX_DIR
+
+IMPACT_INDEX_VERSION = 1
+IMPACT_INDEX_PATH = INDEX_DIR / "impact.bin"
+
+MAGIC = b"CVRI"
+# Magic, version, node count, edge count, node ID list length
+HEADER = struct.Struct("<4sIIII")
+
+DEFAULT_IMPACT_LIMIT = 1000
+
+
+def _little_endian(values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def save_impact_index(node_ids, reverse, path=IMPACT_INDEX_PATH):
+    """Write the importers of every node, `reverse` being the reversed `CSRGraph` over `node_ids`."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    encoded_ids = json.dumps(node_ids, separators=(",", ":")).encode("utf-8")
+    temporary_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(temporary_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, IMPACT_INDEX_VERSION, len(node_ids), len(reverse.targets), len(encoded_ids)))
+        f.write(_little_endian(reverse.offsets))
+        f.write(_little_endian(reverse.targets))
+        f.write(encoded_ids)
+    os.replace(temporary_path, path)
+
+
+def changed_files(repo_path, diff_range):
+    """
+    Return the files changed in `diff_range` of the git repository at `repo_path`, e.g. `main...HEAD`,
+    as paths under `repo_path`. Raises `ValueError` if `diff_range` is not a revision range or git fails.
+    """
+    # The range may come from a client, it must never be read as an option of git diff
+    if not isinstance(diff_range, str) or not diff_range or diff_range.startswith("-"):
+        raise ValueError(f"Invalid revision range: {diff_range!r}")
+    completed = subprocess.run(
+        ["git", "-C", repo_path, "diff", "--name-only", "--relative", "--end-of-options", diff_range, "--"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    if completed.returncode != 0:
+        raise ValueError(completed.stderr.strip() or f"git diff {diff_range} failed in {repo_path}")
+    return [os.path.join(repo_path, name) for name in completed.stdout.splitlines() if name]
+
+
+class ImpactIndex:
+    """
+    Importers of every file of the graph, for reverse reachability queries.
+
+    Args:
+        node_ids (list): File path of every node.
+        offsets (array): Start of the importers of every node in `sources`, plus the end of the last.
+        sources (array): Importing node of every link, grouped by imported node.
+    """
+
+    def __init__(self, node_ids, offsets, sources):
+        self.node_ids = node_ids
+        self.offsets = offsets
+        self.sources = sources
+        self.indices = {node_id: index for index, node_id in enumerate(node_ids)}
+        self._absolute_indices = None
+
+    @classmethod
+    def load(cls, path=IMPACT_INDEX_PATH):
+        """Load the index at `path`, or return `None` if it is missing, unreadable or from another version."""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            magic, version, count, edge_count, ids_length = HEADER.unpack_from(data)
+        except (OSError, struct.error):
+            return None
+        if magic != MAGIC or version != IMPACT_INDEX_VERSION:
+            return None
+        position = HEADER.size
+        offsets = array("I")
+        offsets.frombytes(data[position : position + 4 * (count + 1)])
+        position += 4 * (count + 1)
+        sources = array("I")
+        sources.frombytes(data[position : position + 4 * edge_count])
+        position += 4 * edge_count
+        if sys.byteorder != "little":
+            offsets.byteswap()
+            sources.byteswap()
+        try:
+            node_ids = json.loads(data[position : position + ids_length])
+        except ValueError:
+            return None
+        if len(node_ids) != count or len(offsets) != count + 1 or len(sources) != edge_count:
+            return None
+        return cls(node_ids, offsets, sources)
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def resolve(self, paths):
+        """
+        Map `paths` to node indices, as graph paths or as any path to the same file.
+
+        Returns:
+            tuple: (sorted node indices, `paths` that are not in the graph)
+        """
+        nodes = set()
+        unknown = []
+        for path in paths:
+            index = self.indices.get(path)
+            if index is None:
+                if self._absolute_indices is None:
+                    self._absolute_indices = {os.path.abspath(node_id): index for node_id, index in self.indices.items()}
+                index = self._absolute_indices.get(os.path.abspath(path))
+            if index is None:
+                unknown.append(path)
+            else:
+                nodes.add(index)
+        return sorted(nodes), unknown
+
+    def affected(self, paths, max_depth=None, limit=DEFAULT_IMPACT_LIMIT):
+        """
+        Return the files importing any of `paths`, directly or through other files.
+
+        Args:
+            paths (list): Changed files.
+            max_depth (int): Only follow this many imports back from the changed files, or `None` for all.
+            limit (int): Maximum number of affected files returned, nearest first.
+
+        Returns:
+            dict: The `changed` files found in the graph, the `unknown` ones, the `affected` files
+            with their `depth`, the number of imports between them and the nearest changed file,
+            their `total` number and whether the list was `truncated`.
+        """
+        seeds, unknown = self.resolve(paths)
+        offsets = self.offsets
+        sources = self.sources
+        depths = dict.fromkeys(seeds, 0)
+        affected = []
+        frontier = seeds
+        depth = 0
+        while frontier and (max_depth is None or depth < max_depth):
+            depth += 1
+            next_frontier = []
+            for node in frontier:
+                for source in sources[offsets[node] : offsets[node + 1]]:
+                    if source not in depths:
+                        depths[source] = depth
+                        next_frontier.append(source)
+            # Nearest files first, then by path
+            next_frontier.sort(key=self.node_ids.__getitem__)
+            affected += next_frontier
+            frontier = next_frontier
+
+        return {
+            "changed": [self.node_ids[node] for node in seeds],
+            "unknown": unknown,
+            "affected": [{"file": self.node_ids[node], "depth": depths[node]} for node in affected[:limit]],
+            "total": len(affected),
+            "truncated": len(affected) > limit,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="changed files, as paths in the graph")
+    parser.add_argument("--repo", help="local git repository to take the changed files from")
+    parser.add_argument("--range", dest="diff_range", help="git diff range of --repo, e.g. main...HEAD")
+    parser.add_argument("--depth", type=int, help="maximum number of imports to follow back")
+    parser.add_argument("--limit", type=int, default=DEFAULT_IMPACT_LIMIT)
+    parser.add_argument("--index", default=str(IMPACT_INDEX_PATH))
+    args = parser.parse_args(argv)
+
+    paths = list(args.paths)
+    if args.repo or args.diff_range:
+        if not (args.repo and args.diff_range):
+            parser.error("--repo and --range go together")
+        try:
+            paths += changed_files(args.repo, args.diff_range)
+        except (OSError, ValueError) as e:
+            print(e, file=sys.stderr)
+            return 1
+    if not paths:
+        parser.error("no changed files given")
+
+    index = ImpactIndex.load(pathlib.Path(args.index))
+    if index is None:
+        print(f"No impact index at {args.index}, index some repositories first", file=sys.stderr)
+        return 1
+    result = index.affected(paths, max_depth=args.depth, limit=args.limit)
+    for path in result["unknown"]:
+        print(f"Not in the graph: {path}", file=sys.stderr)
+    print(f"{result['total']} files affected by {len(result['changed'])} changed files")
+    for item in result["affected"]:
+        print(f"{item['depth']:>4}  {item['file']}")
+    if result["truncated"]:
+        print(f"... and {result['total'] - len(result['affected'])} more")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+"""
+Force-directed 3D layout of the graph assets, computed on the server before the graphs are written.
+
+`process_modules` calls `generate_layouts` to lay out the file graph and the repository graph before
+it writes `full_graph.json`, and every node's position is stored as `fx`, `fy` and `fz` in
+`full_graph.json`, `files/<user>.json` and `repos_graph.json`, which the 3D force engine treats as
+fixed positions, so the client renders the final layout without simulating it. The per-repository
+graphs reuse the positions of the full file graph.
+
+The layout is a force-directed simulation vectorized with NumPy, an optional dependency: if it is
+not installed the assets are left without positions and the client lays them out as before.
+Repulsion is computed pairwise for small graphs. For large graphs, the nodes are binned on a grid
+and the repulsion field is the convolution of the grid with the force kernel, computed with FFTs,
+so an iteration costs O(n + cells log cells) instead of O(n²).
+
+Positions are kept in `index/layout.json` with a signature of each node's neighbours. The next run
+keeps the nodes whose links are unchanged in place and only simulates the new and changed nodes
+and their neighbours, unless more than a quarter of the graph changed. The field of the nodes kept
+in place is computed once, so each step costs in the number of simulated nodes and their links
+rather than in the size of the graph.
+"""
+
+import json
+import math
+import zlib
+import logging
+from collections import defaultdict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from src.metrics import timings
+from src.parser.manifest import INDEX_DIR
+from src.generator.dillude import build_root_level_graph
+
+LAYOUT_PATH = INDEX_DIR / "layout.json"
+LAYOUT_VERSION = 1
+
+FILES_VIEW = "files"
+REPOS_VIEW = "repos"
+
+# Ideal link length, the link distance of the client's own simulation
+LINK_DISTANCE = 100.0
+# Pull towards the origin per unit of distance, the graph settles in a ball of radius about
+# LINK_DISTANCE * cbrt(n / GRAVITY)
+GRAVITY = 1.0
+ITERATIONS = 150
+INCREMENTAL_ITERATIONS = 50
+# Above this share of new or changed nodes, the whole graph is simulated again
+INCREMENTAL_MAX_CHANGED = 0.25
+# Graphs up to this many nodes get exact pairwise repulsion
+EXACT_REPULSION_MAX_NODES = 500
+GRID_MIN_CELLS = 16
+GRID_MAX_CELLS = 48
+# Nodes of the same grid cell repel each other exactly, each one with up to this many cell mates
+CELL_NEIGHBORS = 8
+SEED = 0
+
+
+def layout_available():
+    return np is not None
+
+
+def _scatter_add(displacement, index, values):
+    for axis in range(3):
+        displacement[:, axis] += np.bincount(index, weights=values[:, axis], minlength=len(displacement))
+
+
+def _inverse_cube(distance2, strength):
+    # Coincident nodes are pushed apart by the jitter of their initial positions
+    np.maximum(distance2, 1e-2, out=distance2)
+    return strength / (distance2 * np.sqrt(distance2))
+
+
+def _exact_repulsion(positions, strength):
+    squares = np.einsum("ij,ij->i", positions, positions)
+    weights = _inverse_cube(squares[:, None] + squares[None, :] - 2 * positions @ positions.T, strength)
+    np.fill_diagonal(weights, 0.0)
+    # Sum over j of w_ij * (x_i - x_j)
+    return positions * weights.sum(axis=1)[:, None] - weights @ positions
+
+
+class _Grid:
+    """
+    Repulsion between grid cells as the convolution of the cell counts with the force kernel.
+
+    The kernel of a `cells`³ grid is transformed once and zero-padded to twice the size, so the
+    FFT convolution does not wrap around. Each node gets the force at the centre of its cell, plus
+    the exact repulsion of the nodes in the same cell, which the grid leaves out.
+    """
+
+    def __init__(self, cells):
+        self.cells = cells
+        offsets = np.fft.fftfreq(2 * cells, 1.0 / (2 * cells))  # 0, 1, ..., cells - 1, -cells, ..., -1
+        dx, dy, dz = np.meshgrid(offsets, offsets, offsets, indexing="ij")
+        distance2 = dx * dx + dy * dy + dz * dz
+        distance2[0, 0, 0] = np.inf
+        weights = 1.0 / (distance2 * np.sqrt(distance2))
+        self.kernels = [np.fft.rfftn(component * weights) for component in (dx, dy, dz)]
+
+    @classmethod
+    def for_nodes(cls, count):
+        return cls(min(GRID_MAX_CELLS, max(GRID_MIN_CELLS, math.ceil(count ** (1 / 3)))))
+
+    def bounds(self, positions):
+        """Return the corner and cell size of a grid spanning `positions`."""
+        low = positions.min(axis=0)
+        return low, max(float((positions.max(axis=0) - low).max()), 1e-9) / (self.cells - 1e-6)
+
+    def cell_of(self, positions, low, cell_size):
+        """Flat index of the cell holding each position, positions outside the grid in its border cells."""
+        cells = self.cells
+        cell_index = np.clip(((positions - low) / cell_size).astype(np.int64), 0, cells - 1)
+        return (cell_index[:, 0] * cells + cell_index[:, 1]) * cells + cell_index[:, 2]
+
+    def field(self, flat, strength, cell_size):
+        """Repulsion at the centre of every cell of the nodes in cells `flat`, as a `(cells³, 3)` array."""
+        cells = self.cells
+        density = np.zeros((2 * cells,) * 3)
+        density[:cells, :cells, :cells] = np.bincount(flat, minlength=cells ** 3).reshape((cells,) * 3)
+        density = np.fft.rfftn(density)
+        field = np.empty((cells ** 3, 3))
+        for axis, kernel in enumerate(self.kernels):
+            convolved = np.fft.irfftn(density * kernel, s=(2 * cells,) * 3, axes=(0, 1, 2))
+            field[:, axis] = convolved[:cells, :cells, :cells].ravel()
+        # The kernel is in cell units
+        return field * (strength / (cell_size * cell_size))
+
+    def repulsion(self, positions, strength):
+        low, cell_size = self.bounds(positions)
+        flat = self.cell_of(positions, low, cell_size)
+        forces = self.field(flat, strength, cell_size)[flat]
+
+        # Pairs of the same cell, found as neighbours in the order of their cells
+        order = np.argsort(flat, kind="stable")
+        ordered_cells = flat[order]
+        for offset in range(1, CELL_NEIGHBORS + 1):
+            same = ordered_cells[offset:] == ordered_cells[:-offset]
+            if not same.any():
+                break
+            first = order[:-offset][same]
+            second = order[offset:][same]
+            delta = positions[first] - positions[second]
+            push = delta * _inverse_cube(np.einsum("ij,ij->i", delta, delta), strength)[:, None]
+            _scatter_add(forces, first, push)
+            _scatter_add(forces, second, -push)
+        return forces
+
+
+class _FixedRepulsion:
+    """
+    Repulsion of nodes held in place, on any set of points.
+
+    The nodes never move, so for large graphs their grid field is computed once and each lookup
+    costs the cell of every point plus the exact repulsion of up to `CELL_NEIGHBORS` nodes of that
+    cell. Up to `EXACT_REPULSION_MAX_NODES` nodes repel every point exactly.
+    """
+
+    def __init__(self, positions, strength):
+        self.positions = positions
+        self.strength = strength
+        self.grid = None
+        if len(positions) > EXACT_REPULSION_MAX_NODES:
+            self.grid = _Grid.for_nodes(len(positions))
+            self.low, cell_size = self.grid.bounds(positions)
+            self.cell_size = cell_size
+            flat = self.grid.cell_of(positions, self.low, cell_size)
+            self.field = self.grid.field(flat, strength, cell_size)
+            self.order = np.argsort(flat, kind="stable")
+            cell_ids = np.arange(self.grid.cells ** 3)
+            self.starts = np.searchsorted(flat[self.order], cell_ids)
+            self.ends = np.searchsorted(flat[self.order], cell_ids, side="right")
+
+    def at(self, points):
+        if self.grid is None:
+            squares = np.einsum("ij,ij->i", points, points)
+            fixed_squares = np.einsum("ij,ij->i", self.positions, self.positions)
+            weights = _inverse_cube(
+                squares[:, None] + fixed_squares[None, :] - 2 * points @ self.positions.T, self.strength
+            )
+            return points * weights.sum(axis=1)[:, None] - weights @ self.positions
+
+        flat = self.grid.cell_of(points, self.low, self.cell_size)
+        forces = self.field[flat]
+        starts = self.starts[flat]
+        ends = self.ends[flat]
+        for offset in range(CELL_NEIGHBORS):
+            near = starts + offset < ends
+            if not near.any():
+                break
+            delta = points[near] - self.positions[self.order[starts[near] + offset]]
+            forces[near] += delta * _inverse_cube(np.einsum("ij,ij->i", delta, delta), self.strength)[:, None]
+        return forces
+
+
+def force_layout(count, sources, targets, positions, movable=None, iterations=ITERATIONS, temperature=None):
+    """
+    Run a force-directed simulation of `count` nodes linked by `sources[i]` -> `targets[i]`.
+
+    Links pull their ends together with a force of d² / k, nodes repel each other with a force of
+    k³ / d², and a linear pull towards the origin keeps the graph and its isolated nodes together.
+
+    When only some nodes are `movable`, the repulsion of the others is computed once, and each
+    step only simulates the movable nodes and the links touching them.
+
+    Args:
+        positions (numpy.ndarray): Initial `(count, 3)` positions, updated in place.
+        movable (numpy.ndarray): Boolean mask of the nodes allowed to move, all of them by default.
+        iterations (int): Simulation steps, with the temperature cooling linearly to zero.
+        temperature (float): Largest displacement of a node in the first step.
+
+    Returns:
+        numpy.ndarray: `positions`.
+    """
+    if count == 0:
+        return positions
+    k = LINK_DISTANCE
+    strength = k ** 3
+    if temperature is None:
+        temperature = k * max(1.0, count ** (1 / 3))
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+
+    moving = np.arange(count) if movable is None else np.flatnonzero(movable)
+    fixed_repulsion = None
+    if len(moving) < count:
+        fixed_repulsion = _FixedRepulsion(positions[np.flatnonzero(~movable)], strength)
+        touching = movable[sources] | movable[targets]
+        sources = sources[touching]
+        targets = targets[touching]
+    # Index of each node among the moving nodes, -1 for the fixed ones
+    local = np.full(count, -1, dtype=np.int64)
+    local[moving] = np.arange(len(moving))
+    local_sources = local[sources]
+    local_targets = local[targets]
+    moving_sources = local_sources >= 0
+    moving_targets = local_targets >= 0
+    grid = _Grid.for_nodes(len(moving)) if len(moving) > EXACT_REPULSION_MAX_NODES else None
+
+    for step in range(iterations):
+        points = positions[moving]
+        if grid is None:
+            displacement = _exact_repulsion(points, strength)
+        else:
+            displacement = grid.repulsion(points, strength)
+        if fixed_repulsion is not None:
+            displacement += fixed_repulsion.at(points)
+        if len(sources):
+            delta = positions[sources] - positions[targets]
+            pull = delta * (np.sqrt(np.einsum("ij,ij->i", delta, delta)) / k)[:, None]
+            _scatter_add(displacement, local_targets[moving_targets], pull[moving_targets])
+            _scatter_add(displacement, local_sources[moving_sources], -pull[moving_sources])
+        displacement -= GRAVITY * points
+
+        length = np.sqrt(np.einsum("ij,ij->i", displacement, displacement))
+        limit = temperature * (1 - step / iterations)
+        scale = np.minimum(length, limit) / np.maximum(length, 1e-9)
+        positions[moving] = points + displacement * scale[:, None]
+    return positions
+
+
+def _neighbor_signatures(node_ids, links):
+    neighbors = defaultdict(set)
+    for link in links:
+        neighbors[link["source"]].add(link["target"])
+        neighbors[link["target"]].add(link["source"])
+    signatures = [zlib.crc32("\n".join(sorted(neighbors.get(node_id, ()))).encode("utf-8")) for node_id in node_ids]
+    return signatures, neighbors
+
+
+def layout_graph(graph, previous=None):
+    """
+    Lay out a `{"nodes", "links"}` graph, starting from the `previous` state of the same view.
+
+    Returns:
+        dict: The new state, mapping `positions` and neighbour `signatures` by node ID.
+    """
+    node_ids = [node["id"] for node in graph["nodes"]]
+    index = {node_id: position for position, node_id in enumerate(node_ids)}
+    links = [link for link in graph["links"] if link["source"] in index and link["target"] in index]
+    signatures, neighbors = _neighbor_signatures(node_ids, links)
+    previous = previous or {"positions": {}, "signatures": {}}
+    old_positions = previous["positions"]
+
+    changed = [
+        node_id for node_id, signature in zip(node_ids, signatures)
+        if node_id not in old_positions or previous["signatures"].get(node_id) != signature
+    ]
+    count = len(node_ids)
+    rng = np.random.default_rng(SEED)
+    radius = LINK_DISTANCE * (max(count, 1) / GRAVITY) ** (1 / 3)
+    positions = np.empty((count, 3))
+    placed = np.zeros(count, dtype=bool)
+    for position, node_id in enumerate(node_ids):
+        if node_id in old_positions:
+            positions[position] = old_positions[node_id]
+            placed[position] = True
+    # New nodes start next to their placed neighbours, or anywhere in the graph's sphere
+    for node_id in changed:
+        position = index[node_id]
+        if placed[position]:
+            continue
+        anchors = [index[neighbor] for neighbor in neighbors.get(node_id, ()) if placed[index[neighbor]]]
+        if anchors:
+            positions[position] = positions[anchors].mean(axis=0) + rng.normal(scale=LINK_DISTANCE / 2, size=3)
+        else:
+            positions[position] = rng.normal(scale=radius / 2, size=3)
+
+    sources = [index[link["source"]] for link in links]
+    targets = [index[link["target"]] for link in links]
+    if not changed:
+        logging.info(f"Layout of {count} nodes is unchanged")
+    elif len(changed) <= INCREMENTAL_MAX_CHANGED * count and placed.any():
+        movable = np.zeros(count, dtype=bool)
+        for node_id in changed:
+            movable[index[node_id]] = True
+            for neighbor in neighbors.get(node_id, ()):
+                movable[index[neighbor]] = True
+        force_layout(
+            count, sources, targets, positions, movable=movable, iterations=INCREMENTAL_ITERATIONS,
+            temperature=LINK_DISTANCE * 2
+        )
+        logging.info(f"Updated the layout of {int(movable.sum())} of {count} nodes, {len(changed)} changed")
+    else:
+        force_layout(count, sources, targets, positions)
+        logging.info(f"Laid out {count} nodes and {len(links)} links")
+
+    positions = np.round(positions, 2)
+    return {
+        "positions": {node_id: positions[position].tolist() for position, node_id in enumerate(node_ids)},
+        "signatures": dict(zip(node_ids, signatures)),
+    }
+
+
+def apply_positions(graph, positions):
+    """Pin every node of `graph` found in `positions` at its position."""
+    for node in graph["nodes"]:
+        position = positions.get(node["id"])
+        if position is not None:
+            node["fx"], node["fy"], node["fz"] = position
+
+
+def load_layouts(path=LAYOUT_PATH):
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data["views"] if data.get("version") == LAYOUT_VERSION else {}
+
+
+def save_layouts(views, path=LAYOUT_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"version": LAYOUT_VERSION, "views": views}, f, separators=(",", ":"))
+
+
+def load_positions(view):
+    """Return the node positions of `view` from the last layout, or `None` if it was never laid out."""
+    layout = load_layouts().get(view)
+    return layout["positions"] if layout is not None else None
+
+
+def generate_layouts(json_data):
+    """
+    Lay out the file and repository graphs and pin the file nodes of `json_data` at their positions,
+    for `save_full_graph` and the user graphs written from `json_data` afterwards.
+
+    Returns:
+        dict: Positions of the repository graph nodes by ID, for `generate_root_level_json`, or
+        `None` if NumPy is not installed.
+    """
+    if not layout_available():
+        logging.info("NumPy is not installed, leaving the graph layout to the client")
+        return None
+
+    views = load_layouts()
+    with timings.span("layout", view=FILES_VIEW):
+        views[FILES_VIEW] = layout_graph(json_data, views.get(FILES_VIEW))
+    with timings.span("layout", view=REPOS_VIEW):
+        views[REPOS_VIEW] = layout_graph(build_root_level_graph(json_data), views.get(REPOS_VIEW))
+    save_layouts(views)
+
+    apply_positions(json_data, views[FILES_VIEW]["positions"])
+    return views[REPOS_VIEW]["positions"]
@@ -0,0 +1,211 @@
+"""
+Background indexing jobs for the Flask API.
+
+`JobManager.submit` queues a function on a background executor and returns its `Job` right away.
+The function receives `job.report` and calls it with the current stage and counters such as
+`files_discovered`, `files_parsed` and `links_resolved`. The job records per-stage timings and
+wakes up any client streaming its progress. Submitting work under the key of a job that is still
+queued or running returns that job instead of starting a duplicate. A job can also be run under a
+profiler, see `src.profiling`.
+"""
+
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.profiling import ProfileSession
+
+# Finished jobs kept around so clients can still fetch their final status
+MAX_FINISHED_JOBS = 100
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """
+    State and progress of one background job.
+
+    Attributes:
+        id (str): Unique job ID returned to the client.
+        kind (str): Kind of work, e.g. `local` or `clone`.
+        root (str): Directory being indexed.
+        state (str): One of `queued`, `running`, `done` or `failed`.
+        stage (str): Current pipeline stage, e.g. `clone`, `parse`, `links`, `analytics`, `write`, `layout` or `generate`.
+        progress (dict): Counters reported by the running stages.
+        stage_timings (dict): Seconds spent in every finished stage.
+        result (dict): Summary returned by the job function once it is done.
+        error (str): Error message if the job failed.
+        profiler (str): `cprofile` or `pyinstrument` if the job is profiled.
+        profile_path (pathlib.Path): Profile written once a profiled job finished.
+    """
+
+    def __init__(self, kind, root, key, profiler=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.root = root
+        self.key = key
+        self.state = QUEUED
+        self.stage = None
+        self.progress = {}
+        self.stage_timings = {}
+        self.result = None
+        self.error = None
+        self.profiler = profiler
+        self.profile_path = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._stage_started_at = None
+        self._version = 0
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.state in (DONE, FAILED)
+
+    def _changed(self):
+        self._version += 1
+        self._condition.notify_all()
+
+    def _end_stage(self, now):
+        if self.stage is not None:
+            self.stage_timings[self.stage] = self.stage_timings.get(self.stage, 0.0) + now - self._stage_started_at
+
+    def report(self, stage=None, **counters):
+        """Record that the job is in `stage`, or still in its current stage, and update its progress counters."""
+        with self._condition:
+            if stage is not None and stage != self.stage:
+                now = time.perf_counter()
+                self._end_stage(now)
+                self.stage = stage
+                self._stage_started_at = now
+            self.progress.update(counters)
+            self._changed()
+
+    def start(self):
+        with self._condition:
+            self.state = RUNNING
+            self.started_at = time.time()
+            self._changed()
+
+    def finish(self, result=None, error=None):
+        with self._condition:
+            self._end_stage(time.perf_counter())
+            self.stage = None
+            self.state = FAILED if error is not None else DONE
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self._changed()
+
+    def wait_for_update(self, version, timeout):
+        """Block until the job changes after `version` or `timeout` seconds pass; return the new version."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._version != version or self.finished, timeout)
+            return self._version
+
+    def to_dict(self):
+        with self._condition:
+            stage_timings = dict(self.stage_timings)
+            if self.stage is not None:
+                stage_timings[self.stage] = (
+                    stage_timings.get(self.stage, 0.0) + time.perf_counter() - self._stage_started_at
+                )
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "root": self.root,
+                "state": self.state,
+                "stage": self.stage,
+                "progress": dict(self.progress),
+                "stage_timings": {stage: round(seconds, 3) for stage, seconds in stage_timings.items()},
+                "result": self.result,
+                "error": self.error,
+                "profile": str(self.profile_path) if self.profile_path is not None else None,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobManager:
+    """
+    Runs jobs on a background executor and keeps their status for the API.
+
+    Args:
+        max_workers (int): Jobs run at the same time. Indexing jobs all write the same asset
+            files, so the default runs them one after the other.
+    """
+
+    def __init__(self, max_workers=1):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="index-job")
+        self._jobs = {}
+        self._active_jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, root, function, key=None, profiler=None):
+        """
+        Queue `function(report)` as a job, unless a queued or running job has the same key.
+
+        Args:
+            kind (str): Kind of work, stored on the job.
+            root (str): Directory being indexed.
+            function (callable): Called with the job's `report` method; its return value becomes `job.result`.
+            key (hashable): Deduplication key, `(kind, root)` by default.
+            profiler (str): Profile the job with `cprofile` or `pyinstrument`.
+
+        Returns:
+            tuple: (`Job`, `True` if it was created by this call or `False` if it already existed)
+        """
+        key = key if key is not None else (kind, root)
+        with self._lock:
+            job = self._active_jobs.get(key)
+            if job is not None:
+                return job, False
+            job = Job(kind, root, key, profiler)
+            self._jobs[job.id] = job
+            self._active_jobs[key] = job
+            self._forget_finished_jobs()
+
+        self._executor.submit(self._run, job, function)
+        return job, True
+
+    def _run(self, job, function):
+        job.start()
+        try:
+            if job.profiler is None:
+                result = function(job.report)
+            else:
+                session = ProfileSession(job.profiler, job.id)
+                try:
+                    with session:
+                        result = function(job.report)
+                finally:
+                    job.profile_path = session.path
+        except Exception as e:
+            logging.error(f"Job {job.id} failed", exc_info=True)
+            job.finish(error=str(e))
+        else:
+            job.finish(result=result)
+        finally:
+            with self._lock:
+                if self._active_jobs.get(job.key) is job:
+                    del self._active_jobs[job.key]
+
+    def _forget_finished_jobs(self):
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
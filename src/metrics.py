@@ -0,0 +1,118 @@
+"""
+Process-wide timing spans and gauges for the indexer, exposed by the `/metrics` endpoint.
+
+`timings.span(stage, **labels)` times a block of code and `timings.record` adds a duration
+measured elsewhere, e.g. by a parse worker process. Spans with the same stage and labels are
+aggregated into a count, a sum and a maximum, so the indexer records one span per file labelled
+with its language and module and the totals stay small. `render_prometheus` formats everything in
+the Prometheus text exposition format.
+"""
+
+import re
+import time
+import threading
+from contextlib import contextmanager
+
+METRIC_PREFIX = "codeview"
+
+_LABEL_ESCAPES = str.maketrans({"\\": "\\\\", "\"": "\\\"", "\n": "\\n"})
+_INVALID_NAME_CHARACTERS = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class Timings:
+    """Aggregated durations keyed by stage and labels. Safe to use from several threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = {}
+
+    def record(self, stage, seconds, **labels):
+        key = (stage, tuple(sorted(labels.items())))
+        with self._lock:
+            span = self._spans.get(key)
+            if span is None:
+                self._spans[key] = [1, seconds, seconds]
+            else:
+                span[0] += 1
+                span[1] += seconds
+                span[2] = max(span[2], seconds)
+
+    @contextmanager
+    def span(self, stage, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """Return every span as a dict of its `stage`, `labels`, `count`, `seconds` and `max_seconds`."""
+        with self._lock:
+            return [
+                {"stage": stage, "labels": dict(labels), "count": count, "seconds": seconds, "max_seconds": maximum}
+                for (stage, labels), (count, seconds, maximum) in self._spans.items()
+            ]
+
+
+class Gauges:
+    """Last reported value of every gauge, keyed by name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._help = {}
+
+    def set(self, name, value, help_text="", **labels):
+        with self._lock:
+            self._values[(name, tuple(sorted(labels.items())))] = value
+            self._help.setdefault(name, help_text)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values), dict(self._help)
+
+
+timings = Timings()
+gauges = Gauges()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{str(value).translate(_LABEL_ESCAPES)}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+def _metric_name(name):
+    return f"{METRIC_PREFIX}_{_INVALID_NAME_CHARACTERS.sub('_', name)}"
+
+
+def render_prometheus():
+    """Render all spans and gauges in the Prometheus text exposition format."""
+    lines = [
+        f"# HELP {METRIC_PREFIX}_stage_seconds Time spent in each indexing stage.",
+        f"# TYPE {METRIC_PREFIX}_stage_seconds summary",
+    ]
+    spans = sorted(timings.snapshot(), key=lambda span: (span["stage"], sorted(span["labels"].items())))
+    for span in spans:
+        labels = _format_labels([("stage", span["stage"])] + sorted(span["labels"].items()))
+        lines.append(f"{METRIC_PREFIX}_stage_seconds_count{labels} {span['count']}")
+        lines.append(f"{METRIC_PREFIX}_stage_seconds_sum{labels} {span['seconds']:.6f}")
+    lines += [
+        f"# HELP {METRIC_PREFIX}_stage_seconds_max Longest single span of each indexing stage.",
+        f"# TYPE {METRIC_PREFIX}_stage_seconds_max gauge",
+    ]
+    for span in spans:
+        labels = _format_labels([("stage", span["stage"])] + sorted(span["labels"].items()))
+        lines.append(f"{METRIC_PREFIX}_stage_seconds_max{labels} {span['max_seconds']:.6f}")
+
+    values, help_texts = gauges.snapshot()
+    names = sorted({name for name, _ in values})
+    for name in names:
+        metric = _metric_name(name)
+        lines.append(f"# HELP {metric} {help_texts.get(name) or name}")
+        lines.append(f"# TYPE {metric} gauge")
+        for (value_name, labels), value in sorted(values.items(), key=lambda item: item[0]):
+            if value_name == name:
+                lines.append(f"{metric}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
@@ -1,3 +1,29 @@
+"""
+Parsed representation of a source file and its functions.
+
+Both classes use `__slots__`, and the identifiers repeated across thousands of functions (names,
+return types, parameters, class and package names) are interned so equal strings are stored once.
+
+A function body can be a `(source, start_byte, end_byte)` span of UTF-8 bytes instead of a string,
+and is then only decoded when it is read, e.g. by `to_dict`. The parsers hand out spans of the
+file's source, which `TreeNode.pack_bodies` copies into one buffer holding just the bodies of the
+file, so that the source itself is not kept alive by its functions.
+"""
+
+import sys
+import json
+
+
+def _intern(value):
+    """Intern a string, or every string of a list, leaving anything else untouched."""
+    if type(value) is str:
+        return sys.intern(value)
+    if type(value) is list and all(type(item) is str for item in value):
+        # Through a tuple the list is sized exactly, lists built by appending are over-allocated
+        return list(tuple(map(sys.intern, value)))
+    return value
+
+
 class TreeNode:
     """
     Represents a node in the abstract syntax tree (AST).
@@ -11,8 +37,14 @@ class TreeNode:
         functions (list): A list of `FunctionNode` objects representing the functions defined in the file.
         property_declarations (list): A list of property declarations in the file.
         exports (list): A list of exported symbols from the file.
+        is_interface (bool): Whether the file declares an interface, set by the Kotlin parser.
     """
 
+    __slots__ = (
+        "file_path", "class_names", "package_import_paths", "package", "imports", "exports",
+        "property_declarations", "functions", "is_interface",
+    )
+
     def __init__(
         self,
         file_path=None,
@@ -32,6 +64,27 @@ class TreeNode:
         self.exports = exports or []  # Initialize exports list if not provided
         self.property_declarations = property_declarations or []
         self.functions = functions or []
+        self.is_interface = False
+
+    def pack_bodies(self):
+        """
+        Copy the function bodies into a single UTF-8 buffer and make every function a span of it.
+
+        Bodies that are spans of the file's source are copied without being decoded, after which
+        the functions no longer keep the whole source alive.
+        """
+        bodies = []
+        position = 0
+        packed = []
+        for function in self.functions:
+            body = function.body_bytes()
+            if body:
+                bodies.append(body)
+                packed.append((function, position, position + len(body)))
+                position += len(body)
+        buffer = b"".join(bodies)
+        for function, start, end in packed:
+            function.body = (buffer, start, end)
 
     def to_dict(self):
         return {
@@ -45,6 +98,22 @@ class TreeNode:
             "functions": [func.to_dict() for func in self.functions]
         }
 
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a `TreeNode` from the dictionary produced by `to_dict`."""
+        node_tree = cls(
+            file_path=data["file_path"],
+            class_names=_intern(data["class_names"]),
+            package_import_paths=data["package_import_paths"],
+            package=_intern(data["package"]),
+            functions=[FunctionNode.from_dict(func) for func in data["functions"]],
+            property_declarations=data["property_declarations"],
+            exports=data["exports"],
+        )
+        # Imports are stored joined into a single string once the file has been processed
+        node_tree.imports = data["imports"]
+        return node_tree
+
     def __repr__(self):
         functions = "\n\n".join([str(func) for func in self.functions])
         return (
@@ -55,6 +124,24 @@ class TreeNode:
 
 
 class FunctionNode:
+    """
+    A function or method of a parsed file.
+
+    Attributes:
+        name (str): The function name.
+        parameters (list or str): The parameters, as the language parser extracted them.
+        return_type (str): The declared return type, if any.
+        body (str): The function body, decoded from the source span on access.
+        is_abstract (bool): Whether the function has no body of its own.
+        class_name (str): The names of the classes declared before the function, space-separated.
+        annotations (list): The annotations or decorators of the function.
+    """
+
+    __slots__ = (
+        "name", "parameters", "return_type", "_body", "_source", "_start", "_end", "is_abstract", "class_name",
+        "annotations",
+    )
+
     def __init__(
         self,
         name,
@@ -65,30 +152,62 @@ class FunctionNode:
         class_names=None,
         annotations=None,
     ):
-        self.name = name
-        self.parameters = parameters or []
-        self.return_type = return_type
+        self.name = _intern(name)
+        self.parameters = _intern(parameters) or []
+        self.return_type = _intern(return_type)
         self.body = body
         self.is_abstract = is_abstract
-        self.class_name = " ".join(class_names) if class_names else ""
+        self.class_name = sys.intern(" ".join(class_names)) if class_names else ""
         self.annotations = annotations or []
 
-    def to_dict(self):
-        # Convert body to string assuming it's bytes, you might not need this depending on the actual type of `body`
-        if isinstance(self.body, bytes):
-            body = self.body.decode("utf-8")
+    @property
+    def body(self):
+        if self._source is not None:
+            return self._source[self._start:self._end].decode("utf-8")
+        return self._body
+
+    @body.setter
+    def body(self, body):
+        # A string, UTF-8 bytes or a `(source, start_byte, end_byte)` span of UTF-8 bytes
+        if isinstance(body, tuple):
+            self._body = None
+            self._source, self._start, self._end = body
         else:
-            body = self.body
+            self._body = body.decode("utf-8") if isinstance(body, bytes) else body
+            self._source = None
+            self._start = self._end = 0
+
+    def body_bytes(self):
+        """Return the body as UTF-8 bytes, sliced out of its span without decoding it, or `None`."""
+        if self._source is not None:
+            return self._source[self._start:self._end]
+        return self._body.encode("utf-8") if self._body is not None else None
+
+    def to_dict(self):
         return {
             "name": self.name,
             "parameters": self.parameters,
             "return_type": self.return_type,
-            "body": body,
+            "body": self.body,
             "is_abstract": self.is_abstract,
             "class_name": self.class_name,
             "annotations": self.annotations,
         }
 
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a `FunctionNode` from the dictionary produced by `to_dict`."""
+        function = cls(
+            data["name"],
+            data["parameters"],
+            data["return_type"],
+            data["body"],
+            is_abstract=data["is_abstract"],
+            annotations=data["annotations"],
+        )
+        function.class_name = _intern(data["class_name"])
+        return function
+
     def __repr__(self):
         parameter_str = ", ".join(self.parameters)
         return (
@@ -99,6 +218,4 @@ class FunctionNode:
         )
 
     def to_json(self):
-        if isinstance(self.body, bytes):
-            self.body = self.body.decode("utf-8")
-        return json.dumps(self.__dict__, indent=4)
+        return json.dumps(self.to_dict(), indent=4)
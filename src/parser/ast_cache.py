@@ -0,0 +1,120 @@
+"""
+Persistent cache of the `TreeNode` data extracted from parsed files.
+
+Entries are keyed by language, grammar version and content hash, so identical files are only parsed
+once no matter where they live: across branches, vendored copies, or repeated indexing runs. Every
+entry is a small JSON file under `index/ast_cache/`. Reading an entry bumps its mtime, and `evict`
+deletes the least recently used entries once the cache grows past its size cap.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+
+from src.parser.TreeNode import TreeNode
+from src.parser.manifest import INDEX_DIR, hash_file
+
+# Bump whenever the language traversers change the extracted data so stale entries are ignored
+CACHE_VERSION = 1
+
+CACHE_DIR = INDEX_DIR / "ast_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+COMPACT_SEPARATORS = (",", ":")
+
+
+def grammar_version(library_path):
+    """Fingerprint the compiled grammar library, so rebuilding the grammars invalidates the cache."""
+    return hash_file(library_path)
+
+
+class ParseCache:
+    """
+    On-disk LRU cache mapping (language, grammar version, content hash) to extracted `TreeNode` data.
+    Lookups may run on several threads at once.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that found no entry.
+        evictions (int): Entries deleted to keep the cache under `max_bytes`.
+    """
+
+    def __init__(self, grammar_version, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.grammar_version = grammar_version
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._counter_lock = threading.Lock()
+
+    def _entry_path(self, lang, content_hash):
+        key = hashlib.sha256(f"{CACHE_VERSION}:{lang}:{self.grammar_version}:{content_hash}".encode()).hexdigest()
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, lang, content_hash, file_path):
+        """Return the cached `TreeNode` for a file's contents, or `None` on a miss."""
+        entry_path = self._entry_path(lang, content_hash)
+        try:
+            with open(entry_path, "r") as f:
+                data = json.load(f)
+            os.utime(entry_path)  # Mark the entry as recently used
+        except (OSError, ValueError):
+            with self._counter_lock:
+                self.misses += 1
+            return None
+
+        with self._counter_lock:
+            self.hits += 1
+        data["file_path"] = file_path
+        return TreeNode.from_dict(data)
+
+    def put(self, lang, content_hash, node_tree):
+        """Store the data extracted from a file's contents."""
+        data = node_tree.to_dict()
+        data["file_path"] = None  # Entries are shared by every file with the same contents
+        entry_path = self._entry_path(lang, content_hash)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first so concurrent runs never read a partial entry
+        temporary_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temporary_path, "w") as f:
+            json.dump(data, f, separators=COMPACT_SEPARATORS)
+        os.replace(temporary_path, entry_path)
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits in `max_bytes`."""
+        entries = []
+        total_bytes = 0
+        for shard in os.scandir(self.cache_dir) if self.cache_dir.is_dir() else ():
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_bytes += stat.st_size
+
+        if total_bytes <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_bytes -= size
+            self.evictions += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def log_stats(self):
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups * 100 if lookups else 0.0
+        logging.info(
+            f"AST cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), {self.evictions} evictions"
+        )
@@ -0,0 +1,219 @@
+"""
+Resolves file-to-file dependency links from parsed `TreeNode`s.
+
+A file depends on another when one of its `package_import_paths` appears in the other file's
+imports. Instead of comparing every pair of files, `resolve_dependencies` indexes every exported
+symbol path by its defining files and looks up the dotted names found in each file's import
+statements, which keeps link generation close to linear in the number of imports.
+`StreamingLinker` builds the same index incrementally, while files are still being parsed.
+"""
+
+import re
+import logging
+from collections import Counter, defaultdict
+
+# Characters stripped from both ends of a symbol path by `append_to_package_import_paths`
+SYMBOL_PATH_STRIP_CHARS = "package "
+
+DOTTED_NAME_PATTERN = re.compile(r"[\w$]+(?:\.[\w$]+)*")
+
+# `update_dependencies` falls back to a full resolution once more than 1/N of the files changed
+INCREMENTAL_CHANGE_RATIO = 10
+
+
+def build_symbol_index(file_trees):
+    """Map each exported symbol path to the files that define it, in `file_trees` order."""
+    symbol_index = defaultdict(list)
+    for file_path, node_tree in file_trees.items():
+        for path in node_tree.package_import_paths:
+            symbol_index[path].append(file_path)
+    return symbol_index
+
+
+def import_symbol_candidates(imports):
+    """
+    Yield every symbol path an import string can refer to.
+
+    Each dotted name in `imports` contributes all of its contiguous segment runs, normalized the
+    same way exported symbol paths are, e.g. `import static com.acme.Util.run;` yields the
+    normalized forms of `com.acme.Util`, `acme.Util.run`, `com.acme.Util.run` and so on.
+    """
+    for dotted_name in DOTTED_NAME_PATTERN.findall(imports):
+        segments = dotted_name.split(".")
+        for start in range(len(segments)):
+            for end in range(start + 1, len(segments) + 1):
+                candidate = ".".join(segments[start:end]).strip(SYMBOL_PATH_STRIP_CHARS)
+                if candidate:
+                    yield candidate
+
+
+class StreamingLinker:
+    """
+    Resolve dependencies incrementally while files are still being parsed.
+
+    Files are added one at a time in any order. Each new file looks up its import candidates in
+    the symbol paths of the files added before it, and its own symbol paths in their import
+    candidates, so every matching pair is found once, when its second file arrives. `finish`
+    orders the links exactly like `resolve_dependencies`.
+    """
+
+    def __init__(self):
+        self.symbol_index = defaultdict(list)
+        # import candidate -> files whose imports contain it
+        self.candidate_index = defaultdict(list)
+        # target file -> importing file -> symbol paths of the target found in the importer
+        self.matches = defaultdict(lambda: defaultdict(set))
+
+    def add(self, file_path, node_tree):
+        for candidate in set(import_symbol_candidates(node_tree.imports)):
+            for target_path in self.symbol_index.get(candidate, ()):
+                self.matches[target_path][file_path].add(candidate)
+            self.candidate_index[candidate].append(file_path)
+        for path in node_tree.package_import_paths:
+            for importer_path in self.candidate_index.get(path, ()):
+                if importer_path != file_path:
+                    self.matches[file_path][importer_path].add(path)
+            self.symbol_index[path].append(file_path)
+
+    def finish(self, file_trees):
+        """
+        Return the dependencies and links of the added files, ordered by `file_trees`.
+
+        Returns:
+            tuple: (`dependencies` mapping each file to the files importing it, `links` list)
+        """
+        file_order = {file_path: index for index, file_path in enumerate(file_trees)}
+        dependencies = {}
+        links = []
+        for file_path, node_tree in file_trees.items():
+            file_matches = self.matches.get(file_path, {})
+            for other_file_path in sorted(file_matches, key=file_order.__getitem__):
+                matched_paths = file_matches[other_file_path]
+                for path in node_tree.package_import_paths:
+                    if path in matched_paths:
+                        links.append({"source": other_file_path, "target": file_path})
+            dependencies[file_path] = list(set(file_matches))
+        return dependencies, links
+
+
+def resolve_dependencies(file_trees):
+    """
+    Build dependencies and links using the symbol index.
+
+    Links are emitted in the same order as the pairwise matcher: grouped by target file, then by
+    importing file, with one link per matched symbol path of the target.
+
+    Returns:
+        tuple: (`dependencies` mapping each file to the files importing it, `links` list)
+    """
+    linker = StreamingLinker()
+    for file_path, node_tree in file_trees.items():
+        linker.add(file_path, node_tree)
+    return linker.finish(file_trees)
+
+
+def update_dependencies(file_trees, previous_links, changed_paths):
+    """
+    Recompute only the links touching `changed_paths`, reusing `previous_links` for the rest.
+
+    `changed_paths` holds every added, modified and deleted file. Unchanged importers are only
+    re-resolved when one of the changed files' symbol paths occurs in their imports. The result is
+    identical to `resolve_dependencies` on the same `file_trees`.
+
+    Returns:
+        tuple: (`dependencies` mapping each file to the files importing it, `links` list)
+    """
+    if len(changed_paths) * INCREMENTAL_CHANGE_RATIO > len(file_trees):
+        return resolve_dependencies(file_trees)
+
+    symbol_index = build_symbol_index(file_trees)
+    file_order = {file_path: index for index, file_path in enumerate(file_trees)}
+    changed_symbols = [
+        path
+        for file_path in changed_paths
+        if file_path in file_trees
+        for path in file_trees[file_path].package_import_paths
+    ]
+
+    links = [
+        link
+        for link in previous_links
+        if link["source"] not in changed_paths
+        and link["target"] not in changed_paths
+        and link["source"] in file_order
+        and link["target"] in file_order
+    ]
+
+    matches = defaultdict(lambda: defaultdict(set))
+    for other_file_path, other_node_tree in file_trees.items():
+        other_changed = other_file_path in changed_paths
+        if not other_changed and not any(path in other_node_tree.imports for path in changed_symbols):
+            continue
+        for candidate in set(import_symbol_candidates(other_node_tree.imports)):
+            for file_path in symbol_index.get(candidate, ()):
+                if file_path != other_file_path and (other_changed or file_path in changed_paths):
+                    matches[file_path][other_file_path].add(candidate)
+
+    for file_path, file_matches in matches.items():
+        for other_file_path, matched_paths in file_matches.items():
+            for path in file_trees[file_path].package_import_paths:
+                if path in matched_paths:
+                    links.append({"source": other_file_path, "target": file_path})
+    links.sort(key=lambda link: (file_order[link["target"]], file_order[link["source"]]))
+
+    importers = {file_path: set() for file_path in file_trees}
+    for link in links:
+        importers[link["target"]].add(link["source"])
+    dependencies = {file_path: list(sources) for file_path, sources in importers.items()}
+
+    return dependencies, links
+
+
+def legacy_resolve_dependencies(file_trees):
+    """Pairwise substring matcher that `resolve_dependencies` replaces, kept for verification."""
+    dependencies = {}
+    links = []
+
+    for file_path, node_tree in file_trees.items():
+        file_dependencies = []
+        for other_file_path, other_node_tree in file_trees.items():
+            if file_path == other_file_path:
+                continue
+
+            other_imports = other_node_tree.imports
+
+            # Check if the file package + each of the function names is in the other file's import list
+            for path in node_tree.package_import_paths:
+                if path in other_imports:
+                    file_dependencies.append(other_file_path)
+                    links.append({"source": other_file_path, "target": file_path})
+
+        dependencies[file_path] = list(set(file_dependencies))
+
+    return dependencies, links
+
+
+def compare_with_legacy(file_trees, links):
+    """
+    Report links that differ from the legacy substring matcher.
+
+    Links are compared as multisets, so a pair linked once per matched symbol path is also
+    reported when only the number of matched paths differs.
+
+    Returns:
+        dict: `missing` links only the legacy matcher produced and `extra` links only `links` has,
+        each as a sorted list of (source, target) pairs.
+    """
+    _, legacy_links = legacy_resolve_dependencies(file_trees)
+    legacy_pairs = Counter((link["source"], link["target"]) for link in legacy_links)
+    pairs = Counter((link["source"], link["target"]) for link in links)
+
+    report = {
+        "missing": sorted((legacy_pairs - pairs).elements()),
+        "extra": sorted((pairs - legacy_pairs).elements()),
+    }
+    for source, target in report["missing"]:
+        logging.warning(f"Link only found by legacy matcher: {source} -> {target}")
+    for source, target in report["extra"]:
+        logging.warning(f"Link not found by legacy matcher: {source} -> {target}")
+    return report
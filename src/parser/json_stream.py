@@ -0,0 +1,60 @@
+"""
+Streaming JSON writers for the index and graph files.
+
+Elements are serialized and written one at a time, so the full document is never held in memory.
+With an indent the output is byte-identical to `json.dump(..., indent=indent)`; the compact mode
+drops all whitespace and lets `json.dumps` use its C encoder for each element.
+"""
+
+import json
+
+COMPACT_SEPARATORS = (",", ":")
+
+
+def _newline(indent, level):
+    return "" if indent is None else "\n" + " " * (indent * level)
+
+
+def _dump_element(element, indent, level, sort_keys):
+    if indent is None:
+        return json.dumps(element, separators=COMPACT_SEPARATORS, sort_keys=sort_keys)
+    # Encoded JSON strings never contain raw newlines, so every newline starts a nested line
+    return json.dumps(element, indent=indent, sort_keys=sort_keys).replace("\n", _newline(indent, level))
+
+
+def write_json_array(file, elements, indent=None, level=0, sort_keys=False):
+    """
+    Write an iterable as a JSON array, serializing one element at a time.
+
+    Args:
+        file: Text file object to write to.
+        elements (iterable): JSON-serializable elements, consumed lazily.
+        indent (int): Indentation width, or `None` for compact output.
+        level (int): Nesting depth of the array inside the enclosing document.
+        sort_keys (bool): Sort the keys of every element.
+    """
+    empty = True
+    for element in elements:
+        file.write(("[" if empty else ",") + _newline(indent, level + 1))
+        file.write(_dump_element(element, indent, level + 1, sort_keys))
+        empty = False
+    file.write("[]" if empty else _newline(indent, level) + "]")
+
+
+def write_json_object_of_arrays(file, arrays, indent=None, sort_keys=False):
+    """
+    Write a JSON object whose values are arrays streamed with `write_json_array`.
+
+    Args:
+        file: Text file object to write to.
+        arrays (list): `(key, elements)` pairs, written in the given order.
+        indent (int): Indentation width, or `None` for compact output.
+        sort_keys (bool): Sort the keys of every array element.
+    """
+    key_separator = ":" if indent is None else ": "
+    file.write("{")
+    for position, (key, elements) in enumerate(arrays):
+        file.write(("" if position == 0 else ",") + _newline(indent, 1))
+        file.write(json.dumps(key) + key_separator)
+        write_json_array(file, elements, indent=indent, level=1, sort_keys=sort_keys)
+    file.write(_newline(indent, 0) + "}" if arrays else "}")
@@ -1,45 +1,45 @@
 import re
 
 from src.parser.TreeNode import FunctionNode
+from src.parser.parsers import match_span
+from src.parser.queries import get_query, register_query
 
 
 """
-This function recursively traverses the Abstract Syntax Tree (AST) for a C++ code,
+This function traverses the Abstract Syntax Tree (AST) for a C++ code,
 capturing information about includes, namespaces, classes/structs, functions, and field
 declarations. The captured information is stored in the provided `node_tree` object for
 easy property recall/retrieval.
 
 Args:
-    node (tree-sitter.Node): The current AST node being processed.
+    node (tree-sitter.Node): The root AST node of the parsed file.
     code (bytes): The source code corresponding to the AST.
     node_tree (NodeTree): An object to store the extracted code structure information.
     language (tree-sitter.Language): The programming language of the code being parsed.
 """
 
 
+C_QUERY = """
+(preproc_include) @include
+(function_definition) @function
+(declaration) @variable
+(struct_specifier) @struct
+"""
+
+register_query("c", C_QUERY)
+
+
 def traverse_tree_c(node, code, node_tree, language):
     c_function = None
-    query_string = """
-    (preproc_include) @include
-    (function_definition) @function
-    (declaration) @variable
-    (struct_specifier) @struct
-    """
-    query = language.query(query_string)
-    captures = query.captures(node)
-
-    should_traverse_children = True
-    for capture_node, capture_name in captures:
-        if capture_node == node:
-            should_traverse_children = False
+    captures = get_query(language).captures(node)
 
     for capture_node, capture_index in captures:
-        text = code[capture_node.start_byte : capture_node.end_byte].decode("utf-8").strip()
+        text = code[capture_node.start_byte:capture_node.end_byte].decode("utf-8").strip()
 
         if capture_index == "include":
             node_tree.imports.append(text)
         elif capture_index == "function":
-            function_details = extract_function_details_c(text)
+            function_details = extract_function_details_c(text, code, capture_node.start_byte)
             if function_details and not any(f.name == function_details.name for f in node_tree.functions):
                 node_tree.functions.append(function_details)
         elif capture_index == "variable":
@@ -51,11 +51,8 @@ def traverse_tree_c(node, code, node_tree, language):
             if struct_name_match:
                 node_tree.class_names.append(struct_name_match.group(1))
 
-    if should_traverse_children:
-        for child in node.children:
-            traverse_tree_c(child, code, node_tree, language)
 
-def extract_function_details_c(text):
+def extract_function_details_c(text, code, start_byte):
     func_name_match = re.search(r'(\w+)\s*\(', text)
     func_name = func_name_match.group(1) if func_name_match else "anonymous"
     parameters_match = re.search(r'\((.*?)\)', text)
@@ -63,7 +60,7 @@ def extract_function_details_c(text):
     return_type_match = re.search(r'^(\w+)\s+', text)
     return_type = return_type_match.group(1).strip() if return_type_match else "int"  # Default return type in C is int
     func_body_match = re.search(r'\{\s*(.*?)\s*\}', text, re.DOTALL)
-    func_body = func_body_match.group(1).strip() if func_body_match else ""
+    func_body = match_span(code, start_byte, text, func_body_match)
 
     return FunctionNode(
         name=func_name,
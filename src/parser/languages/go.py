@@ -1,41 +1,41 @@
 import re
 
 from src.parser.TreeNode import FunctionNode
+from src.parser.parsers import match_span
+from src.parser.queries import get_query, register_query
 
 """
-This function recursively traverses the Abstract Syntax Tree (AST) for a C++ code,
+This function traverses the Abstract Syntax Tree (AST) for a C++ code,
 capturing information about includes, namespaces, classes/structs, functions, and field
 declarations. The captured information is stored in the provided `node_tree` object for
 easy property recall/retrieval.
 
 Args:
-    node (tree-sitter.Node): The current AST node being processed.
+    node (tree-sitter.Node): The root AST node of the parsed file.
     code (bytes): The source code corresponding to the AST.
     node_tree (NodeTree): An object to store the extracted code structure information.
     language (tree-sitter.Language): The programming language of the code being parsed.
 """
 
 
+GO_QUERY = """
+(import_declaration) @import
+(package_clause) @package
+(function_declaration) @function
+(method_declaration) @method
+(type_declaration) @type
+(var_declaration) @var
+"""
+
+register_query("go", GO_QUERY)
+
+
 def traverse_tree_go(node, code, node_tree, language):
     go_function = None
-    query_string = """
-    (import_declaration) @import
-    (package_clause) @package
-    (function_declaration) @function
-    (method_declaration) @method
-    (type_declaration) @type
-    (var_declaration) @var
-    """
-    query = language.query(query_string)
-    captures = query.captures(node)
-
-    should_traverse_children = True
-    for capture_node, capture_name in captures:
-        if capture_node == node:
-            should_traverse_children = False
+    captures = get_query(language).captures(node)
 
     for capture_node, capture_index in captures:
-        text = code[capture_node.start_byte : capture_node.end_byte].decode("utf-8").strip()
+        text = code[capture_node.start_byte:capture_node.end_byte].decode("utf-8").strip()
 
         if capture_index == "import":
             node_tree.imports.append(text)
@@ -44,7 +44,7 @@ def traverse_tree_go(node, code, node_tree, language):
             if package_name_match:
                 node_tree.package = package_name_match.group(1)
         elif capture_index in ["function", "method"]:
-            function_details = extract_function_details_go(text)
+            function_details = extract_function_details_go(text, code, capture_node.start_byte)
             if function_details and not any(f.name == function_details.name for f in node_tree.functions):
                 node_tree.functions.append(function_details)
         elif capture_index == "type":
@@ -54,11 +54,8 @@ def traverse_tree_go(node, code, node_tree, language):
         elif capture_index == "var":
             node_tree.property_declarations.append(text)
 
-    if should_traverse_children:
-        for child in node.children:
-            traverse_tree_go(child, code, node_tree, language)
 
-def extract_function_details_go(text):
+def extract_function_details_go(text, code, start_byte):
     func_name_match = re.search(r'func\s+(\w+)\s*\(', text)
     if not func_name_match:  # Handle methods
         func_name_match = re.search(r'func\s*\(\s*\w+\s+\*\w+\s*\)\s+(\w+)\s*\(', text)
@@ -66,7 +63,7 @@ def extract_function_details_go(text):
     parameters_match = re.search(r'\((.*?)\)', text)
     parameters = parameters_match.group(1).strip() if parameters_match else ""
     func_body_match = re.search(r'\{(.*)\}', text, re.DOTALL)
-    func_body = func_body_match.group(1).strip() if func_body_match else ""
+    func_body = match_span(code, start_byte, text, func_body_match)
 
     return FunctionNode(
         name=func_name,
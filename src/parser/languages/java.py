@@ -1,6 +1,8 @@
 import re
 
 from src.parser.TreeNode import FunctionNode
+from src.parser.parsers import match_span
+from src.parser.queries import get_query, register_query
 
 """
 Traverses AST for Java code and extracts relevant information
@@ -8,77 +10,56 @@ such as imports, package, class/interface names, function name/parameters/body,
 The captured information is stored in the provided `node_tree` object for easy property recall/retrieval.
 
 Args:
-    node (tree-sitter.Node): The current AST node being processed.
+    node (tree-sitter.Node): The root AST node of the parsed file.
     code (bytes): The source code corresponding to the AST.
     node_tree (NodeTree): An object to store the extracted information from the AST.
     language (tree-sitter.Language): The programming language of the code being parsed.
 """
 
+JAVA_QUERY = """
+(import_declaration) @import
+(package_declaration) @package
+(class_declaration name: (identifier) @name) @class
+(annotation) @annotation
+(interface_declaration name: (identifier) @name) @interface
+(field_declaration) @field
+(method_declaration) @method
+"""
+
+register_query("java", JAVA_QUERY)
+
+
 def traverse_tree_java(node, code, node_tree, language):
     java_function = None
-    query_string = """
-    (import_declaration) @import
-    (package_declaration) @package
-    (class_declaration name: (identifier) @name) @class
-    (annotation) @annotation
-    (interface_declaration name: (identifier) @name) @interface
-    (field_declaration) @field
-    (method_declaration) @method
-    """
-
-    query = language.query(query_string)
-    captures = query.captures(node)
-
-    should_traverse_children = True
-    for capture_node, capture_name in captures:
-        if capture_node == node:
-            should_traverse_children = False
+    captures = get_query(language).captures(node)
 
     for capture_node, capture_index in captures:
         if capture_index == "import":
-            node_tree.imports.append(
-                code[capture_node.start_byte : capture_node.end_byte]
-                .decode("utf-8")
-                .strip()
-            )
+            node_tree.imports.append(code[capture_node.start_byte:capture_node.end_byte].decode("utf-8").strip())
 
         elif capture_index == "package":
-            node_tree.package = (
-                code[capture_node.start_byte : capture_node.end_byte]
-                .decode("utf-8")
-                .strip()
-            )
+            node_tree.package = code[capture_node.start_byte:capture_node.end_byte].decode("utf-8").strip()
 
         elif capture_index in ["class", "class_public", "class_abstract"]:
             class_name_match = re.search(
                 r"\b(?:class|interface)\s+([a-zA-Z_]\w*)",
-                code[capture_node.start_byte : capture_node.end_byte].decode("utf-8"),
+                code[capture_node.start_byte:capture_node.end_byte].decode("utf-8"),
             )
             if class_name_match:
                 class_name = class_name_match.group(1)
                 node_tree.class_names.append(class_name)
 
         elif capture_index == "field":
-            property_declaration = (
-                code[capture_node.start_byte : capture_node.end_byte]
-                .decode("utf-8")
-                .strip()
-            )
+            property_declaration = code[capture_node.start_byte:capture_node.end_byte].decode("utf-8").strip()
             node_tree.property_declarations.append(property_declaration)
 
         elif capture_index == "annotation":
-            annotation_text = (
-                code[capture_node.start_byte : capture_node.end_byte]
-                .decode("utf-8")
-                .strip()
-            )
+            annotation_text = code[capture_node.start_byte:capture_node.end_byte].decode("utf-8").strip()
             if java_function:  # Add this line
                 java_function.annotations.append(annotation_text)
 
         elif capture_index == "method":
-            method_code = code[capture_node.start_byte : capture_node.end_byte].decode(
-                "utf-8"
-            )
+            method_code = code[capture_node.start_byte:capture_node.end_byte].decode("utf-8")
             # Update the regex to exclude the annotations
             func_name_match = re.search(
                 r"\b(?:public|protected|private|static|final|abstract|synchronized|native|strictfp)?\s*(\w+)\s*\(",
@@ -98,7 +79,7 @@ def traverse_tree_java(node, code, node_tree, language):
                 )
 
                 func_body_match = re.search(r"\{(.*)\}", method_code, re.DOTALL)
-                func_body = func_body_match.group(1).strip() if func_body_match else ""
+                func_body = match_span(code, capture_node.start_byte, method_code, func_body_match)
 
                 java_function = FunctionNode(
                     func_name,
@@ -119,28 +100,24 @@ def traverse_tree_java(node, code, node_tree, language):
                 if not duplicate_found:
                     node_tree.functions.append(java_function)
 
-    if should_traverse_children:
-        for child_node in node.children:
-            traverse_tree_java(child_node, code, node_tree, language)
-    else:
-        # Append class names, function names, and property names to package_import_paths
-        if node_tree.package:
-            package_name = node_tree.package.replace(";", "").strip()
-            if node_tree.class_names:
-                for class_name in node_tree.class_names:
-                    append_to_package_import_paths(package_name, class_name, node_tree)
-            if node_tree.functions:
-                for function in node_tree.functions:
+    # Append class names, function names, and property names to package_import_paths
+    if node_tree.package:
+        package_name = node_tree.package.replace(";", "").strip()
+        if node_tree.class_names:
+            for class_name in node_tree.class_names:
+                append_to_package_import_paths(package_name, class_name, node_tree)
+        if node_tree.functions:
+            for function in node_tree.functions:
+                append_to_package_import_paths(
+                    package_name, function.name, node_tree
+                )
+        if node_tree.property_declarations:
+            for property_declaration in node_tree.property_declarations:
+                property_name = extract_property_name(property_declaration)
+                if property_name:
                     append_to_package_import_paths(
-                        package_name, function.name, node_tree
+                        package_name, property_name, node_tree
                     )
-            if node_tree.property_declarations:
-                for property_declaration in node_tree.property_declarations:
-                    property_name = extract_property_name(property_declaration)
-                    if property_name:
-                        append_to_package_import_paths(
-                            package_name, property_name, node_tree
-                        )
 
 
 def append_to_package_import_paths(package, name, node_tree):
@@ -1,6 +1,8 @@
 import re
 
 from src.parser.TreeNode import FunctionNode
+from src.parser.parsers import match_span
+from src.parser.queries import get_query, register_query
 
 """
 Traverses AST for Javascript code and extracts relevant information
@@ -8,33 +10,31 @@ such as imports, package, class/interface names, function name/parameters/body,
 The captured information is stored in the provided `node_tree` object for easy property recall/retrieval.
 
 Args:
-    node (tree-sitter.Node): The current AST node being processed.
+    node (tree-sitter.Node): The root AST node of the parsed file.
     code (bytes): The source code corresponding to the AST.
     node_tree (NodeTree): An object to store the extracted information from the AST.
     language (tree-sitter.Language): The programming language of the code being parsed.
 """
 
+JAVASCRIPT_QUERY = """
+(import_statement) @import
+(class_declaration) @class
+(function_declaration) @function
+(arrow_function) @arrow_function
+(method_definition) @method
+(variable_declarator) @variable
+(export_statement) @export
+"""
+
+register_query("javascript", JAVASCRIPT_QUERY)
+
+
 def traverse_tree_js(node, code, node_tree, language):
     js_function = None
-    query_string = """
-    (import_statement) @import
-    (class_declaration) @class
-    (function_declaration) @function
-    (arrow_function) @arrow_function
-    (method_definition) @method
-    (variable_declarator) @variable
-    (export_statement) @export
-    """
-    query = language.query(query_string)
-    captures = query.captures(node)
-
-    should_traverse_children = True
-    for capture_node, capture_name in captures:
-        if capture_node == node:
-            should_traverse_children = False
+    captures = get_query(language).captures(node)
 
     for capture_node, capture_index in captures:
-        text = code[capture_node.start_byte : capture_node.end_byte].decode("utf-8").strip()
+        text = code[capture_node.start_byte:capture_node.end_byte].decode("utf-8").strip()
 
         if capture_index == "import":
             node_tree.imports.append(text)
@@ -43,7 +43,7 @@ def traverse_tree_js(node, code, node_tree, language):
             if class_name_match:
                 node_tree.class_names.append(class_name_match.group(1))
         elif capture_index in ["function", "arrow_function", "method"]:
-            function_details = extract_function_details_js(text)
+            function_details = extract_function_details_js(text, code, capture_node.start_byte)
             if function_details and not any(f.name == function_details.name for f in node_tree.functions):
                 node_tree.functions.append(function_details)
         elif capture_index == "variable":
@@ -51,11 +51,8 @@ def traverse_tree_js(node, code, node_tree, language):
         elif capture_index == "export":
             node_tree.exports.append(text)  # Assuming you might want to track exports similarly
 
-    if should_traverse_children:
-        for child in node.children:
-            traverse_tree_js(child, code, node_tree, language)
 
-def extract_function_details_js(text):
+def extract_function_details_js(text, code, start_byte):
     func_name_match = re.search(r'function\s+(\w+)\s*\(', text)
     if not func_name_match:  # Check for arrow functions or anonymous functions
         func_name_match = re.search(r'(\w+)\s*=\s*\(', text)
@@ -63,7 +60,7 @@ def extract_function_details_js(text):
     parameters_match = re.search(r'\((.*?)\)', text)
     parameters = parameters_match.group(1).strip() if parameters_match else ""
     func_body_match = re.search(r'\{(.*)\}', text, re.DOTALL)
-    func_body = func_body_match.group(1).strip() if func_body_match else ""
+    func_body = match_span(code, start_byte, text, func_body_match)
 
     return FunctionNode(
         name=func_name,
@@ -1,6 +1,8 @@
 import re
 
 from src.parser.TreeNode import FunctionNode
+from src.parser.parsers import match_span
+from src.parser.queries import get_query, register_query
 
 """
 Traverses AST for Kotlin code and extracts relevant information
@@ -8,52 +10,41 @@ such as imports, package, class/interface names, function name/parameters/body,
 The captured information is stored in the provided `node_tree` object for easy property recall/retrieval.
 
 Args:
-    node (tree-sitter.Node): The current AST node being processed.
+    node (tree-sitter.Node): The root AST node of the parsed file.
     code (bytes): The source code corresponding to the AST.
     node_tree (NodeTree): An object to store the extracted information from the AST.
     language (tree-sitter.Language): The programming language of the code being parsed.
 """
 
+KOTLIN_QUERY = """
+(import) @import
+(package_header) @package
+(class_declaration) @class_or_interface
+(annotation) @annotation
+(object_declaration) @object_declaration
+(property_declaration) @field
+(function_declaration) @function
+"""
+
+register_query("kotlin", KOTLIN_QUERY)
+
+
 def traverse_tree_kt(node, code, node_tree, language):
     kotlin_function = None
-    query_string = """
-    (import_list) @import
-    (package_header) @package
-    (class_declaration) @class_or_interface
-    (annotation) @annotation
-    (object_declaration) @object_declaration
-    (property_declaration) @field
-    (function_declaration) @function
-    """
-
-    query = language.query(query_string)
-    captures = query.captures(node)
-
-    should_traverse_children = True
-    for capture_node, capture_name in captures:
-        if capture_node == node:
-            should_traverse_children = False
+    captures = get_query(language).captures(node)
 
     is_data_class = False
+    data_class_end_byte = 0
+    replaced_properties = []
     for capture_node, capture_index in captures:
         if capture_index == "import":
-            node_tree.imports = (
-                code[capture_node.start_byte : capture_node.end_byte]
-                .decode("utf-8")
-                .strip()
-            ).split("\n")
+            node_tree.imports.append(code[capture_node.start_byte:capture_node.end_byte].decode("utf-8").strip())
 
         elif capture_index == "package":
-            node_tree.package = (
-                code[capture_node.start_byte : capture_node.end_byte]
-                .decode("utf-8")
-                .strip()
-            )
+            node_tree.package = code[capture_node.start_byte:capture_node.end_byte].decode("utf-8").strip()
 
         elif capture_index == "class_or_interface":
-            class_code = code[capture_node.start_byte : capture_node.end_byte].decode(
-                "utf-8"
-            )
+            class_code = code[capture_node.start_byte:capture_node.end_byte].decode("utf-8")
             class_name_match = re.search(
                 r"\b(?:sealed\s+class|data\s+class|class|interface)\s+([a-zA-Z_]\w*)",
                 class_code,
@@ -61,6 +52,7 @@ def traverse_tree_kt(node, code, node_tree, language):
             if class_name_match:
                 class_name = class_name_match.group(1)
                 is_data_class = "data class" in class_code
+                data_class_end_byte = capture_node.end_byte
                 node_tree.class_names.append(f"{class_name}")
                 node_tree.is_interface = "interface" in class_code
 
@@ -71,16 +63,13 @@ def traverse_tree_kt(node, code, node_tree, language):
                         r"\b(val|var)\s+([a-zA-Z_]\w*\s*:\s*[a-zA-Z_]\w*(\??)(<.*>)?(\??))",
                         class_code,
                     )
+                    replaced_properties.extend(node_tree.property_declarations)
                     node_tree.property_declarations = (
                         ",\n".join(" ".join(f) for f in fields)
                     ).split("\n")
 
         elif capture_index == "annotation":
-            annotation_text = (
-                code[capture_node.start_byte : capture_node.end_byte]
-                .decode("utf-8")
-                .strip()
-            )
+            annotation_text = code[capture_node.start_byte:capture_node.end_byte].decode("utf-8").strip()
             if kotlin_function:
                 kotlin_function.annotations.append(annotation_text)
 
@@ -88,24 +77,21 @@ def traverse_tree_kt(node, code, node_tree, language):
         elif capture_index == "object_declaration":
             object_name_match = re.search(
                 r"\b(?:object)\s+([a-zA-Z_]\w*)",
-                code[capture_node.start_byte : capture_node.end_byte].decode("utf-8"),
+                code[capture_node.start_byte:capture_node.end_byte].decode("utf-8"),
             )
             if object_name_match:
                 object_name = object_name_match.group(1)
                 node_tree.class_names.append(object_name)
 
-        elif capture_index == "field" and not is_data_class:
-            property_declaration = (
-                code[capture_node.start_byte : capture_node.end_byte]
-                .decode("utf-8")
-                .strip()
-            )
+        # Only fields declared inside the data class are covered by its extracted fields
+        elif capture_index == "field" and not (
+            is_data_class and capture_node.end_byte <= data_class_end_byte
+        ):
+            property_declaration = code[capture_node.start_byte:capture_node.end_byte].decode("utf-8").strip()
             node_tree.property_declarations.append(property_declaration)
 
         elif capture_index == "function":
-            function_code = code[
-                capture_node.start_byte : capture_node.end_byte
-            ].decode("utf-8")
+            function_code = code[capture_node.start_byte:capture_node.end_byte].decode("utf-8")
             func_name_match = re.search(
                 r"\b(?:fun)\s+(?:[a-zA-Z_]\w*\.)*([a-zA-Z_]\w*)", function_code
             )
@@ -120,7 +106,7 @@ def traverse_tree_kt(node, code, node_tree, language):
                     return_type_match.group(1).strip() if return_type_match else "Unit"
                 )
                 func_body_match = re.search(r"\{(.*)\}", function_code, re.DOTALL)
-                func_body = func_body_match.group(1).strip() if func_body_match else ""
+                func_body = match_span(code, capture_node.start_byte, function_code, func_body_match)
                 kotlin_function = FunctionNode(
                     func_name,
                     parameters.split(","),
@@ -138,28 +124,27 @@ def traverse_tree_kt(node, code, node_tree, language):
                 )
                 if not duplicate_found:
                     node_tree.functions.append(kotlin_function)
-    if should_traverse_children:
-        for child in node.children:
-            traverse_tree_kt(child, code, node_tree, language)
-    else:
-        # Append class names, function names, and property names to package_import_paths
-        if node_tree.package:
-            package_name = node_tree.package.replace(";", "").strip()
-            if node_tree.class_names:
-                for class_name in node_tree.class_names:
-                    append_to_package_import_paths(package_name, class_name, node_tree)
-            if node_tree.functions:
-                for function in node_tree.functions:
+
+    # Append class names, function names, and property names to package_import_paths
+    if node_tree.package:
+        package_name = node_tree.package.replace(";", "").strip()
+        if node_tree.class_names:
+            for class_name in node_tree.class_names:
+                append_to_package_import_paths(package_name, class_name, node_tree)
+        if node_tree.functions:
+            for function in node_tree.functions:
+                append_to_package_import_paths(
+                    package_name, function.name, node_tree
+                )
+        # Properties replaced by a later data class's fields are still importable
+        property_declarations = node_tree.property_declarations + replaced_properties
+        if property_declarations:
+            for property_declaration in property_declarations:
+                property_name = extract_property_name(property_declaration)
+                if property_name:
                     append_to_package_import_paths(
-                        package_name, function.name, node_tree
+                        package_name, property_name, node_tree
                     )
-            if node_tree.property_declarations:
-                for property_declaration in node_tree.property_declarations:
-                    property_name = extract_property_name(property_declaration)
-                    if property_name:
-                        append_to_package_import_paths(
-                            package_name, property_name, node_tree
-                        )
 
 
 def append_to_package_import_paths(package, name, node_tree):
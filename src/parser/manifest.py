@@ -0,0 +1,86 @@
+"""
+Per-file manifest used to re-index only the files that changed since the previous run.
+
+The manifest is stored next to `index/file_trees.json` and records the path, mtime, size and
+content hash of every parsed file. Files whose mtime and size are unchanged are trusted without
+being read; otherwise the content hash decides whether the cached `TreeNode` can be reused.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import pathlib
+
+from src.parser.TreeNode import TreeNode
+
+# Bump whenever the extracted `TreeNode` data changes so stale caches are rebuilt
+MANIFEST_VERSION = 1
+
+INDEX_DIR = pathlib.Path(__file__).parent.parent.parent / "index"
+MANIFEST_PATH = INDEX_DIR / "file_manifest.json"
+FILE_TREES_PATH = INDEX_DIR / "file_trees.json"
+FULL_GRAPH_PATH = INDEX_DIR.parent / "assets" / "full_graph.json"
+
+
+def hash_file(file_path):
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def fingerprint_file(file_path, previous_entry=None):
+    """
+    Return the manifest entry for `file_path` and whether it is unchanged since `previous_entry`.
+
+    The file is only hashed when there is no previous entry or its mtime or size differ.
+    """
+    stat = os.stat(file_path)
+    entry = {"path": file_path, "mtime": stat.st_mtime, "size": stat.st_size}
+    if previous_entry and previous_entry["mtime"] == entry["mtime"] and previous_entry["size"] == entry["size"]:
+        entry["hash"] = previous_entry["hash"]
+        return entry, True
+
+    entry["hash"] = hash_file(file_path)
+    return entry, bool(previous_entry) and previous_entry["hash"] == entry["hash"]
+
+
+def load_manifest(root_dir):
+    """Load the manifest entries of the previous run over `root_dir`, or `{}` if there are none."""
+    try:
+        with open(MANIFEST_PATH, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("root_dir") != os.path.abspath(root_dir):
+        logging.info("File manifest is stale, re-indexing every file")
+        return {}
+    return manifest["files"]
+
+
+def save_manifest(root_dir, entries):
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    manifest = {"version": MANIFEST_VERSION, "root_dir": os.path.abspath(root_dir), "files": entries}
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f)
+
+
+def load_cached_file_trees():
+    """Load the `TreeNode`s saved by the previous run, keyed by file path."""
+    try:
+        with open(FILE_TREES_PATH, "r") as f:
+            return {data["file_path"]: TreeNode.from_dict(data) for data in json.load(f)}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def load_cached_links():
+    """Load the links written to `full_graph.json` by the previous run, or `None` if unavailable."""
+    try:
+        with open(FULL_GRAPH_PATH, "r") as f:
+            return json.load(f)["links"]
+    except (OSError, ValueError, KeyError):
+        return None
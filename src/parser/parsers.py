@@ -0,0 +1,82 @@
+"""
+Long-lived tree-sitter languages and parsers shared by every indexing request.
+
+`Language` objects are loaded once per process and every thread keeps its own `Parser` per
+language, so parsing a file no longer pays for creating and configuring a parser. `match_span`
+locates a regex match of a capture's text back in the source, so function bodies can be kept as
+spans of it instead of copies.
+"""
+
+import threading
+
+from tree_sitter import Language, Parser
+
+
+# Compiled tree-sitter grammars for every supported language
+LANGUAGE_LIBRARY = "languages.so"
+
+_languages = {}
+_languages_lock = threading.Lock()
+_thread_parsers = threading.local()
+
+
+def get_languages(language_names):
+    """
+    Return the `Language` for each name, loading it on first use.
+
+    Queries are compiled by `get_query` when a language's first file is parsed, so a query that does
+    not compile against the grammar only affects the files of that language.
+    """
+    with _languages_lock:
+        for name in language_names:
+            if name not in _languages:
+                _languages[name] = Language(LANGUAGE_LIBRARY, name)
+        return {name: _languages[name] for name in language_names}
+
+
+def get_parser(language):
+    """Return the calling thread's `Parser` for `language`, creating it on first use."""
+    try:
+        return _thread_parsers.parsers[language.name]
+    except AttributeError:
+        _thread_parsers.parsers = {}
+    except KeyError:
+        pass
+    parser = Parser()
+    parser.set_language(language)
+    _thread_parsers.parsers[language.name] = parser
+    return parser
+
+
+def node_text(code, node):
+    """Decode the source text of `node` from the UTF-8 `code` bytes."""
+    return code[node.start_byte:node.end_byte].decode("utf-8")
+
+
+def match_span(code, start_byte, text, match, group=1):
+    """
+    Locate the stripped `group` of a regex `match` over `text` in the UTF-8 `code` bytes, `text`
+    having been decoded from `code` at `start_byte`.
+
+    Returns:
+        The `(code, start_byte, end_byte)` span of the group, or the group itself if whitespace
+        was stripped from the start of `text`, which moves it away from `start_byte`.
+        An empty string if there is no match or the group is blank.
+    """
+    if match is None:
+        return ""
+    value = match.group(group)
+    stripped = value.strip()
+    if not stripped:
+        return ""
+    # Stripping leaves `text` starting with a non-whitespace character where `code` has whitespace
+    if not code.startswith(text[0].encode("utf-8"), start_byte):
+        return stripped
+    begin = match.start(group) + len(value) - len(value.lstrip())
+    if text.isascii():
+        start = start_byte + begin
+        end = start + len(stripped)
+    else:
+        start = start_byte + len(text[:begin].encode("utf-8"))
+        end = start + len(stripped.encode("utf-8"))
+    return code, start, end
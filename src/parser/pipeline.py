@@ -0,0 +1,283 @@
+"""
+Bounded producer/consumer pipeline behind `process_modules`.
+
+Work flows through four stages connected by bounded queues:
+
+    discover  a thread pulling tasks from a (lazy) iterable, e.g. the file walker
+    read      a thread pool running the I/O step of each task: fingerprinting, cache lookups, reads
+    parse     a process pool, or one thread for a single worker, running the CPU step on what was read;
+              a forwarding thread passes the pool's results on, so its callbacks never block
+    consume   the caller, iterating over `Pipeline.run` and e.g. linking each result as it arrives
+
+A full queue blocks the stage feeding it, so memory is capped at roughly `queue_size` tasks per
+queue plus the parses in flight no matter how many files there are, while the read threads keep
+the parse workers supplied as long as the disk keeps up. Every stage records how many items it
+handled, the time it spent busy and the depth of the queue waiting for it, see `Pipeline.metrics`.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.profiling import profile_thread
+
+DEFAULT_IO_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 64
+
+# Seconds a blocked stage waits before checking whether the pipeline was stopped
+_POLL_INTERVAL = 0.1
+
+# Marks the end of a queue's items
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class StageMetrics:
+    """
+    Counters of one pipeline stage.
+
+    Attributes:
+        name (str): Stage name.
+        processed (int): Items the stage finished.
+        busy_seconds (float): Time spent working on items, summed over the stage's threads.
+        max_queue_depth (int): Most items ever seen waiting for the stage in its input queue.
+    """
+
+    def __init__(self, name, input_queue=None):
+        self.name = name
+        self.input_queue = input_queue
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self._started_at = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.processed += 1
+            self.busy_seconds += seconds
+            if self.input_queue is not None:
+                self.max_queue_depth = max(self.max_queue_depth, self.input_queue.qsize())
+
+    def to_dict(self):
+        with self._lock:
+            elapsed = time.perf_counter() - self._started_at
+            return {
+                "queue_depth": self.input_queue.qsize() if self.input_queue is not None else 0,
+                "max_queue_depth": self.max_queue_depth,
+                "processed": self.processed,
+                "busy_seconds": round(self.busy_seconds, 3),
+                "throughput": round(self.processed / elapsed, 1) if elapsed > 0 else 0.0,
+            }
+
+
+class Pipeline:
+    """
+    Run tasks through an I/O stage and a CPU stage with bounded queues in between.
+
+    Args:
+        read (callable): I/O step, called as `read(task)` on a read thread. Returns
+            `(payload, None)` to send `payload` to the parse stage, or `(None, result)`
+            when the task is already done, e.g. because it was found in a cache.
+        parse (callable): CPU step, called as `parse(payload)`. Must be a picklable module level
+            function when `cpu_workers` is more than one.
+        io_workers (int): Read threads.
+        cpu_workers (int): Parse processes; with one, tasks are parsed on a single thread of
+            this process instead.
+        queue_size (int): Capacity of every queue. Also caps the parses in flight at twice
+            `cpu_workers`.
+        initializer (callable): Run once in every parse process.
+    """
+
+    def __init__(
+        self, read, parse, io_workers=DEFAULT_IO_WORKERS, cpu_workers=1, queue_size=DEFAULT_QUEUE_SIZE,
+        initializer=None
+    ):
+        self.read = read
+        self.parse = parse
+        self.io_workers = max(1, io_workers)
+        self.cpu_workers = max(1, cpu_workers)
+        self.queue_size = max(1, queue_size)
+        self.initializer = initializer
+        self._stages = []
+
+    def metrics(self):
+        """Return the queue depth and throughput counters of every stage of the current or last run."""
+        return {stage.name: stage.to_dict() for stage in self._stages}
+
+    def run(self, tasks):
+        """
+        Feed `tasks` through the pipeline and yield `(task, result)` pairs in completion order.
+
+        An exception raised by any stage stops the pipeline and is re-raised here. Closing the
+        generator early stops every stage as well.
+        """
+        read_queue = queue.Queue(self.queue_size)
+        parse_queue = queue.Queue(self.queue_size)
+        result_queue = queue.Queue(self.queue_size)
+        discover_stage = StageMetrics("discover")
+        read_stage = StageMetrics("read", read_queue)
+        parse_stage = StageMetrics("parse", parse_queue)
+        consume_stage = StageMetrics("consume", result_queue)
+        self._stages = [discover_stage, read_stage, parse_stage, consume_stage]
+
+        stopped = threading.Event()
+        readers_left = [self.io_workers]
+        readers_lock = threading.Lock()
+
+        def put(target_queue, item):
+            # Block while the queue is full, which is what pushes back on the stages upstream
+            while not stopped.is_set():
+                try:
+                    target_queue.put(item, timeout=_POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def get(source_queue):
+            while not stopped.is_set():
+                try:
+                    return source_queue.get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    pass
+            return _DONE
+
+        def fail(error):
+            put(result_queue, _Failure(error))
+
+        def discover():
+            try:
+                task_iterator = iter(tasks)
+                while True:
+                    start = time.perf_counter()
+                    task = next(task_iterator, _DONE)
+                    if task is _DONE:
+                        break
+                    discover_stage.record(time.perf_counter() - start)
+                    if not put(read_queue, task):
+                        return
+            except BaseException as e:
+                fail(e)
+            finally:
+                for _ in range(self.io_workers):
+                    put(read_queue, _DONE)
+
+        def read():
+            try:
+                while True:
+                    task = get(read_queue)
+                    if task is _DONE:
+                        break
+                    start = time.perf_counter()
+                    payload, result = self.read(task)
+                    read_stage.record(time.perf_counter() - start)
+                    if payload is not None:
+                        put(parse_queue, (task, payload))
+                    else:
+                        put(result_queue, (task, result))
+            except BaseException as e:
+                fail(e)
+            finally:
+                # The last reader to finish closes the parse stage
+                with readers_lock:
+                    readers_left[0] -= 1
+                    last_reader = readers_left[0] == 0
+                if last_reader:
+                    put(parse_queue, _DONE)
+
+        def parse_serially():
+            while True:
+                item = get(parse_queue)
+                if item is _DONE:
+                    break
+                task, payload = item
+                start = time.perf_counter()
+                result = self.parse(payload)
+                parse_stage.record(time.perf_counter() - start)
+                put(result_queue, (task, result))
+
+        def parse_in_processes():
+            in_flight = threading.BoundedSemaphore(2 * self.cpu_workers)
+            # Finished parses, handed from the pool's callback thread to `forward`, which may block on a
+            # full result queue without holding up the pool. At most `in_flight` of them wait here.
+            finished = queue.SimpleQueue()
+
+            def forward():
+                while True:
+                    item = finished.get()
+                    if item is _DONE:
+                        break
+                    future, task, seconds = item
+                    error = future.exception()
+                    if error is not None:
+                        fail(error)
+                    else:
+                        parse_stage.record(seconds)
+                        put(result_queue, (task, future.result()))
+                    # Released only once forwarded, so a slow consumer also holds back new parses
+                    in_flight.release()
+
+            forwarder = threading.Thread(target=profile_thread(forward), name="pipeline-forward", daemon=True)
+            forwarder.start()
+            try:
+                with ProcessPoolExecutor(max_workers=self.cpu_workers, initializer=self.initializer) as executor:
+                    while True:
+                        item = get(parse_queue)
+                        if item is _DONE:
+                            break
+                        task, payload = item
+                        while not in_flight.acquire(timeout=_POLL_INTERVAL):
+                            if stopped.is_set():
+                                return
+                        future = executor.submit(self.parse, payload)
+                        future.add_done_callback(
+                            lambda future, task=task, start=time.perf_counter(): finished.put(
+                                (future, task, time.perf_counter() - start)
+                            )
+                        )
+            finally:
+                # Every callback has run once the pool is shut down
+                finished.put(_DONE)
+                forwarder.join()
+
+        def parse():
+            try:
+                if self.cpu_workers <= 1:
+                    parse_serially()
+                else:
+                    parse_in_processes()
+            except BaseException as e:
+                fail(e)
+            finally:
+                put(result_queue, _DONE)
+
+        # Stage threads are profiled along with the caller when a profiling session is active
+        threads = [threading.Thread(target=profile_thread(discover), name="pipeline-discover", daemon=True)]
+        threads += [
+            threading.Thread(target=profile_thread(read), name=f"pipeline-read-{i}", daemon=True)
+            for i in range(self.io_workers)
+        ]
+        threads.append(threading.Thread(target=profile_thread(parse), name="pipeline-parse", daemon=True))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = result_queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.error
+                start = time.perf_counter()
+                yield item
+                consume_stage.record(time.perf_counter() - start)
+        finally:
+            stopped.set()
+            for thread in threads:
+                thread.join()
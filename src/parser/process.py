@@ -1,12 +1,33 @@
 
 import re
 import os
-import glob
 import json
+import time
 import pathlib
 import logging
-from tree_sitter import Parser, Language
+from src.metrics import gauges, timings
 from src.parser.TreeNode import TreeNode
+from src.parser.parsers import LANGUAGE_LIBRARY, get_languages, get_parser
+from src.parser.queries import get_query
+from src.parser.ast_cache import ParseCache, grammar_version
+from src.parser.pipeline import DEFAULT_IO_WORKERS, DEFAULT_QUEUE_SIZE, Pipeline
+from src.parser.walker import SKIP_DIRECTORIES, walk_source_files
+from src.parser.search_index import build_symbol_index, save_symbol_index
+from src.parser.tree_store import save_file_tree_store
+from src.parser.trigram_index import MAX_DEAD_RATIO, TrigramIndex, TrigramIndexWriter, source_trigrams
+from src.parser.json_stream import write_json_array
+from src.generator.dillude import save_full_graph
+from src.generator.analytics import analyze_graph
+from src.generator.impact import save_impact_index
+from src.generator.layout import generate_layouts
+from src.parser.dependencies import StreamingLinker, compare_with_legacy, update_dependencies
+from src.parser.manifest import (
+    fingerprint_file,
+    load_cached_file_trees,
+    load_cached_links,
+    load_manifest,
+    save_manifest,
+)
 from src.parser.languages.c import traverse_tree_c
 from src.parser.languages.java import traverse_tree_java
 from src.parser.languages.kt import traverse_tree_kt
@@ -17,91 +38,210 @@ from src.parser.languages.cpp import traverse_tree_cpp
 
 logging.basicConfig(level=logging.DEBUG)
 
-def process_modules(root_dir):
-
-    # Updated language mapping to include lists of extensions
-    extension_to_language = {
-        "java": (Language("languages.so", "java"), [".java"]),
-        "kotlin": (Language("languages.so", "kotlin"), [".kt"]),
-        "javascript": (Language("languages.so", "javascript"), [".js", ".jsx"]),
-        "go": (Language("languages.so", "go"), [".go"]),
-        "python": (Language("languages.so", "python"), [".py"]),
-        "cpp": (Language("languages.so", "cpp"), [".cpp", ".cc", ".cxx"]),
-        "c": (Language("languages.so", "c"), [".c"])
-    }
+# Language mapping to the lists of extensions parsed with each grammar
+LANGUAGE_EXTENSIONS = {
+    "java": [".java"],
+    "kotlin": [".kt"],
+    "javascript": [".js", ".jsx"],
+    "go": [".go"],
+    "python": [".py"],
+    "cpp": [".cpp", ".cc", ".cxx"],
+    "c": [".c"]
+}
+EXTENSION_LANGUAGES = {ext: lang for lang, extensions in LANGUAGE_EXTENSIONS.items() for ext in extensions}
+
+# Results consumed between two reports of the pipeline's queue depths and throughput
+PIPELINE_REPORT_INTERVAL = 256
+
+
+def load_languages():
+    """Return the tree-sitter `Language` of every supported language, loaded once per process."""
+    return get_languages(LANGUAGE_EXTENSIONS)
+
+
+def process_modules(
+    root_dir, workers=1, verify_links=False, full_rebuild=False, compact=False, use_ast_cache=True, progress=None,
+    module_dirs=None, io_workers=DEFAULT_IO_WORKERS, queue_size=DEFAULT_QUEUE_SIZE, use_trigram_index=True
+):
+    """
+    Parse every supported source file under the module directories of `root_dir`
+    and write the dependency graph to `./assets/full_graph.json`.
+
+    Files stream through a `Pipeline`: the walk feeds a pool of read threads that fingerprint each
+    file, look it up in the caches and read the files left to parse, which are parsed by `workers`
+    processes while the next files are read. Dependencies are resolved by a `StreamingLinker` as the
+    parsed files arrive. `analyze_graph` then adds the degrees, PageRank, import cycle and transitive
+    fan-in and fan-out of every file to its node, and `generate_layouts` adds its position. Results
+    are put back in module and walk order, so the output does not depend on the number of workers.
+
+    Args:
+        root_dir (str): Directory containing one sub-directory per module/repository.
+        workers (int): Number of processes used to parse files, or 1 to parse on a single thread.
+        verify_links (bool): Also run the legacy pairwise substring matcher and log every link
+            that differs from the indexed dependency resolver.
+        full_rebuild (bool): Ignore the file manifest of the previous run and re-parse every file.
+            Otherwise only added and modified files are parsed, unchanged files reuse their cached
+            `TreeNode` and only the links touching changed or deleted files are recomputed.
+        compact (bool): Write `full_graph.json` and `file_trees.json` without indentation.
+        use_ast_cache (bool): Look up files to parse in the on-disk AST cache by content hash and
+            store newly parsed files in it. A full rebuild skips the lookups but still refreshes the cache.
+        progress (callable): Called as `progress(stage, **counters)` when a stage starts and as files are
+            discovered and parsed, links resolved and outputs written, e.g. by a background `Job`.
+        module_dirs (iterable): Module directories to index instead of every sub-directory of `root_dir`.
+            May be lazy, e.g. yielding repositories as their clones finish; each one is walked and
+            parsed as soon as it is produced. Files are ordered by module name either way.
+        io_workers (int): Threads fingerprinting and reading files ahead of the parser.
+        queue_size (int): Capacity of each pipeline queue, bounding the files read but not yet
+            parsed and the results not yet consumed.
+        use_trigram_index (bool): Update the trigram index searched by `/grep` with the trigrams of
+            every file whose contents are not indexed yet, extracted by the parse workers.
+
+    Returns:
+        tuple: (`modules` mapping each module to its parsed file paths, `file_sizes`, `package_names`,
+        `file_trees`, `json_data` graph of nodes and links)
+    """
+    report = progress or (lambda stage=None, **counters: None)
+    report("parse", files_discovered=0, files_parsed=0)
+    load_languages()
 
     modules = {}
     file_trees = {}
     file_sizes = {}
     package_names = {}
     readme_info_list = []
-    directories = [os.path.join(root_dir, d) for d in os.listdir(root_dir) if os.path.isdir(os.path.join(root_dir, d)) and not should_skip_path(os.path.join(root_dir, d))]
-    total_directories = len(directories)
-    processed_directories = 0
-    
-
-    for dir_name in directories:
-        module_dir = dir_name
-        processed_directories += 1
-        logging.info(f"Processing {dir_name}: {(processed_directories / total_directories) * 100:.2f}% complete")
-
-        readme_files = [name for name in os.listdir(module_dir) if "README" in name.upper()]
-        for readme_file in readme_files:
-            readme_path = os.path.join(module_dir, readme_file)
-            with open(readme_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-                readme_info_list.append({"id": os.path.basename(module_dir), "content": content})
-
-        module_files = {}
-        for lang, (language_obj, extensions) in extension_to_language.items():
-            for ext in extensions:
-                for file_path in glob.glob(os.path.join(module_dir, "**", f"*{ext}"), recursive=True):
-                    if should_skip_path(file_path):  # Use the function to check each file path
-                        continue
-                    with open(file_path, "r") as f:
-                        file_content = f.read()
-
-                    node_tree = process_code_string(file_content, language_obj, file_path)
-                    if isinstance(node_tree, TreeNode):
-                        file_trees[file_path] = node_tree
-                        package_names[file_path] = "/".join(pathlib.Path(file_path).parts[:-1])
-                        module_files[file_path] = file_content
-                        file_sizes[file_path] = len(file_content.encode("utf-8")).__float__()
-
-        if module_files:
-            modules[os.path.basename(module_dir)] = module_files
-
-    print("Calling save_file_trees()")
-    save_file_trees(file_trees)
-
-    dependencies = {}
-    links = [{"source": "target"}]
-
-    for file_path, node_tree in file_trees.items():
-        # print(f"file_trees type is: {type(file_trees[file_path])}")
-        if (
-            node_tree.class_names is None
-            and node_tree.functions is None
-            and node_tree.property_declarations is None
-        ):
-            continue
-        file_dependencies = []
-        for other_file_path, other_node_tree in file_trees.items():
-            if file_path == other_file_path:
-                continue
-
-            other_imports = other_node_tree.imports
-
-            if node_tree.class_names is None:
-                node_tree.class_names = os.path.basename(file_path)
-
-            # Check if the file package + each of the function names is in the other file's import list
-            for path in node_tree.package_import_paths:
-                if path in other_imports:
-                    file_dependencies.append(other_file_path)
-                    links.append({"source": other_file_path, "target": file_path})
-
-        dependencies[file_path] = list(set(file_dependencies))
+    file_tasks = []
+
+    previous_manifest = {} if full_rebuild else load_manifest(root_dir)
+    cached_trees = load_cached_file_trees() if previous_manifest else {}
+    previous_links = load_cached_links() if previous_manifest else None
+    ast_cache = ParseCache(grammar_version(LANGUAGE_LIBRARY)) if use_ast_cache else None
+    fingerprints = {}
+    changed_paths = set()
+    unparsed_paths = set()
+
+    trigram_index = None if full_rebuild or not use_trigram_index else TrigramIndex.open()
+    if trigram_index is not None and trigram_index.dead_ratio > MAX_DEAD_RATIO:
+        logging.info("Rebuilding the trigram index, most of its files are outdated")
+        trigram_index.close()
+        trigram_index = None
+    trigram_writer = TrigramIndexWriter(trigram_index) if use_trigram_index else None
+    trigram_hashes = trigram_index.live_hashes() if trigram_index is not None else {}
+    # Files only read for their trigrams, keeping their cached TreeNode until the parse stage returns
+    reused_trees = {}
+
+    def discovered_files():
+        start = time.perf_counter()
+        for file_task in discover_files(root_dir, readme_info_list, module_dirs):
+            timings.record("discover", time.perf_counter() - start, module=file_task[0])
+            file_tasks.append(file_task)
+            report("parse", files_discovered=len(file_tasks))
+            yield file_task
+            start = time.perf_counter()
+
+    def read_file(file_task):
+        # Runs on the pipeline's read threads, returns a source to parse or an already known TreeNode
+        module_name, file_path, lang = file_task
+        with timings.span("read", language=lang, module=module_name):
+            fingerprints[file_path], unchanged = fingerprint_file(file_path, previous_manifest.get(file_path))
+            content_hash = fingerprints[file_path]["hash"]
+            index_trigrams = trigram_writer is not None and trigram_hashes.get(file_path) != content_hash
+            node_tree = None
+            if unchanged and file_path in cached_trees:
+                node_tree = cached_trees[file_path]
+            else:
+                changed_paths.add(file_path)
+                if ast_cache is not None and not full_rebuild:
+                    node_tree = ast_cache.get(lang, content_hash, file_path)
+            if node_tree is None:
+                unparsed_paths.add(file_path)
+            elif index_trigrams:
+                reused_trees[file_path] = node_tree
+            else:
+                return None, node_tree
+            return (file_path, lang, read_source(file_path), node_tree is None, index_trigrams), None
+
+    # Without the previous links every link is resolved, which can start while files are still being parsed
+    linker = StreamingLinker() if previous_links is None else None
+    pipeline = Pipeline(
+        read_file, _parse_source, io_workers=io_workers, cpu_workers=workers, queue_size=queue_size,
+        initializer=_init_worker
+    )
+    found_trees = {}
+    parsed_count = 0
+    link_seconds = 0.0
+    for (module_name, file_path, lang), result in pipeline.run(discovered_files()):
+        if file_path in unparsed_paths or file_path in reused_trees:
+            node_tree, parse_seconds, traverse_seconds, trigrams = result
+            if trigrams is not None:
+                trigram_writer.add(file_path, fingerprints[file_path]["hash"], trigrams)
+            if node_tree is None:
+                node_tree = reused_trees.pop(file_path)
+            else:
+                timings.record("parse", parse_seconds, language=lang, module=module_name)
+                timings.record("traverse", traverse_seconds, language=lang, module=module_name)
+                parsed_count += 1
+                report("parse", files_parsed=parsed_count)
+                if ast_cache is not None:
+                    ast_cache.put(lang, fingerprints[file_path]["hash"], node_tree)
+        else:
+            node_tree = result
+        found_trees[file_path] = node_tree
+        if linker is not None and isinstance(node_tree, TreeNode):
+            start = time.perf_counter()
+            linker.add(file_path, node_tree)
+            link_seconds += time.perf_counter() - start
+        if len(found_trees) % PIPELINE_REPORT_INTERVAL == 0:
+            report(pipeline=publish_pipeline_metrics(pipeline))
+
+    pipeline_metrics = publish_pipeline_metrics(pipeline)
+    logging.info(f"Parsed {parsed_count} of {len(file_tasks)} files with {workers} worker(s)")
+    for stage, metrics in pipeline_metrics.items():
+        logging.info(
+            f"Pipeline stage {stage}: {metrics['processed']} items, {metrics['throughput']}/s, "
+            f"{metrics['busy_seconds']}s busy, max queue depth {metrics['max_queue_depth']}"
+        )
+    report("parse", files_reused=len(file_tasks) - parsed_count, pipeline=pipeline_metrics)
+    if ast_cache is not None:
+        if parsed_count:
+            ast_cache.evict()
+        ast_cache.log_stats()
+    changed_paths |= previous_manifest.keys() - fingerprints.keys()
+
+    # Modules may be discovered out of order, keep the output independent of that
+    file_tasks.sort(key=lambda file_task: file_task[0])
+    readme_info_list.sort(key=lambda readme_info: readme_info["id"])
+    manifest = {file_path: fingerprints[file_path] for _, file_path, _ in file_tasks}
+    for module_name, file_path, _ in file_tasks:
+        node_tree = found_trees[file_path]
+        if isinstance(node_tree, TreeNode):
+            file_trees[file_path] = node_tree
+            package_names[file_path] = "/".join(pathlib.Path(file_path).parts[:-1])
+            modules.setdefault(module_name, []).append(file_path)
+            file_sizes[file_path] = float(manifest[file_path]["size"])
+
+    report("write")
+    with timings.span("write", output="file_trees"):
+        save_file_trees(file_trees, compact=compact)
+    with timings.span("write", output="file_tree_store"):
+        save_file_tree_store(file_trees)
+    with timings.span("write", output="symbols"):
+        save_symbol_index(build_symbol_index(file_trees))
+    if trigram_writer is not None:
+        with timings.span("write", output="trigrams"):
+            trigram_writer.write(fingerprints.keys())
+        if trigram_index is not None:
+            trigram_index.close()
+
+    report("links")
+    start = time.perf_counter()
+    if linker is not None:
+        dependencies, links = linker.finish(file_trees)
+    else:
+        dependencies, links = update_dependencies(file_trees, previous_links, changed_paths)
+    timings.record("links", link_seconds + time.perf_counter() - start)
+    if verify_links:
+        compare_with_legacy(file_trees, links)
+    report("write", links_resolved=len(links))
 
     nodes = []
     for file_path, package_name in package_names.items():
@@ -116,64 +256,159 @@ def process_modules(root_dir):
         }
         nodes.append(node)
 
-    json_data = {"nodes": nodes, "links": links[1:]}
-
-
-    # Get the absolute path of the current script
-    script_location =  pathlib.Path(__file__).parent.absolute()
-
-    # # Make sure the directory exists (as before)
-    # assets_dir.mkdir(parents=True, exist_ok=True)
-
-    # Define the file path
-    file_path = "./assets/full_graph.json"
+    json_data = {"nodes": nodes, "links": links}
 
+    report("analytics")
+    with timings.span("analytics"):
+        analytics = analyze_graph(json_data)
+    logging.info(f"Found {len(analytics.cycles)} import cycles among {len(nodes)} files")
+    with timings.span("write", output="impact_index"):
+        save_impact_index(analytics.node_ids, analytics.reverse)
 
-    with open(file_path, "w") as outfile:
-        # print(f"{json_data}")
-        json.dump(json_data, outfile, indent=4, sort_keys=True)
+    report("layout")
+    generate_layouts(json_data)
+    report("write")
+    with timings.span("write", output="full_graph"):
+        save_full_graph(json_data, compact=compact)
 
     # Save the README information in a single JSON file
     readme_json_path = "./assets/repos_readme.json"
-    with open(readme_json_path, 'w', encoding='utf-8') as file:
-        json.dump(readme_info_list, file, ensure_ascii=False, indent=4)
+    with timings.span("write", output="repos_readme"):
+        with open(readme_json_path, 'w', encoding='utf-8') as file:
+            json.dump(readme_info_list, file, ensure_ascii=False, indent=4)
+
+    with timings.span("write", output="file_manifest"):
+        save_manifest(root_dir, manifest)
 
     return modules, file_sizes, package_names, file_trees, json_data
 
 
+def publish_pipeline_metrics(pipeline):
+    """Expose the pipeline's queue depths and throughput as gauges and return its metrics."""
+    pipeline_metrics = pipeline.metrics()
+    for stage, metrics in pipeline_metrics.items():
+        gauges.set(
+            "pipeline_queue_depth", metrics["queue_depth"], "Items waiting for each pipeline stage.", stage=stage
+        )
+        gauges.set(
+            "pipeline_throughput", metrics["throughput"], "Items per second handled by each pipeline stage.",
+            stage=stage
+        )
+    return pipeline_metrics
+
+
 def should_skip_path(path):
-    skip_directories = [
-        'node_modules', 'build', 'dist', 'out', 'bin', '.git', '.svn', '.vscode',
-        '__pycache__', '.idea', 'obj', 'lib', 'vendor', 'target', '.next', 'pkg',
-        'venv', '.tox', 'wheels', 'Debug', 'Release', 'deps'
-    ]
     # Ensure we check against complete directory names in the path
-    return any(skip_dir in path.split(os.path.sep) for skip_dir in skip_directories)
+    return any(part in SKIP_DIRECTORIES for part in path.split(os.path.sep))
+
+
+def discover_files(root_dir, readme_info_list, module_dirs=None):
+    """
+    Yield `(module_name, file_path, lang)` for every supported file under the module directories
+    of `root_dir`, or under `module_dirs` if given, walking each module once. README contents are
+    appended to `readme_info_list`.
+    """
+    if module_dirs is None:
+        module_dirs = [os.path.join(root_dir, d) for d in sorted(os.listdir(root_dir)) if os.path.isdir(os.path.join(root_dir, d))]
+        total_directories = len(module_dirs)
+    else:
+        total_directories = None
+
+    processed_directories = 0
+    for module_dir in module_dirs:
+        if should_skip_path(module_dir):
+            continue
+        processed_directories += 1
+        if total_directories:
+            logging.info(f"Processing {module_dir}: {(processed_directories / total_directories) * 100:.2f}% complete")
+        else:
+            logging.info(f"Processing {module_dir}: {processed_directories} module(s) so far")
+        module_name = os.path.basename(module_dir)
+
+        readme_files = [name for name in os.listdir(module_dir) if "README" in name.upper()]
+        for readme_file in readme_files:
+            readme_path = os.path.join(module_dir, readme_file)
+            with open(readme_path, 'r', encoding='utf-8') as file:
+                content = file.read()
+                readme_info_list.append({"id": module_name, "content": content})
+
+        for file_path, lang in walk_source_files(module_dir, EXTENSION_LANGUAGES):
+            yield module_name, file_path, lang
+
+
+def read_source(file_path):
+    """Read a source file as UTF-8 bytes, translating line endings like reading it in text mode would."""
+    with open(file_path, "rb") as f:
+        code = f.read()
+    if b"\r" in code:
+        code = code.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    return code
+
+
+def parse_file(file_path, language_obj):
+    return process_code_bytes(read_source(file_path), language_obj, file_path)
+
+
+def _init_worker():
+    load_languages()
+
+
+def _parse_source(source_task):
+    """
+    Parse stage of the pipeline, run in a pool worker or on the pipeline's parse thread.
+
+    Returns the `TreeNode`, or `None` for files only read for their trigrams, with the seconds spent
+    in tree-sitter and in the language traverser, which a worker process cannot record in the
+    parent's `timings` itself, and the file's trigrams if they were requested.
+    """
+    file_path, lang, code, parse, index_trigrams = source_task
+    node_tree = None
+    parse_seconds = traverse_seconds = 0.0
+    if parse:
+        language = load_languages()[lang]
+        start = time.perf_counter()
+        tree = get_parser(language).parse(code)
+        parsed = time.perf_counter()
+        node_tree = extract_tree_node(tree.root_node, code, language, file_path)
+        parse_seconds, traverse_seconds = parsed - start, time.perf_counter() - parsed
+    return node_tree, parse_seconds, traverse_seconds, source_trigrams(code) if index_trigrams else None
 
 
 def process_code_string(code_string, language, file_path):
-    parser = Parser()
-    parser.set_language(language)
-    tree = parser.parse(bytes(code_string, "utf8"))
-    root_node = tree.root_node
+    return process_code_bytes(code_string.encode("utf-8"), language, file_path)
+
+
+def process_code_bytes(code, language, file_path):
+    """
+    Parse UTF-8 `code` with the calling thread's pooled parser and extract its `TreeNode`.
+
+    `code` is read and encoded once; the parser and the traversers share the same buffer.
+    """
+    tree = get_parser(language).parse(code)
+    return extract_tree_node(tree.root_node, code, language, file_path)
+
 
+def extract_tree_node(root_node, code, language, file_path):
+    """Run the traverser of `language` over a parsed tree and return the extracted `TreeNode`."""
     node_tree = TreeNode()
 
     # Process each language with its corresponding function
-    if language.name == "java":
-        traverse_tree_java(root_node, bytes(code_string, "utf8"), node_tree, language)
+    if get_query(language) is None:
+        pass  # The language's query does not compile, the file is kept without its contents
+    elif language.name == "java":
+        traverse_tree_java(root_node, code, node_tree, language)
     elif language.name == "kotlin":
-        traverse_tree_kt(root_node, bytes(code_string, "utf8"), node_tree, language)
+        traverse_tree_kt(root_node, code, node_tree, language)
     elif language.name == "javascript":
-        traverse_tree_js(root_node, bytes(code_string, "utf8"), node_tree, language)
+        traverse_tree_js(root_node, code, node_tree, language)
     elif language.name == "go":
-        traverse_tree_go(root_node, bytes(code_string, "utf8"), node_tree, language)
+        traverse_tree_go(root_node, code, node_tree, language)
     elif language.name == "python":
-        traverse_tree_python(root_node, bytes(code_string, "utf8"), node_tree, language)
+        traverse_tree_python(root_node, code, node_tree, language)
     elif language.name == "cpp":
-        traverse_tree_cpp(root_node, bytes(code_string, "utf8"), node_tree, language)
+        traverse_tree_cpp(root_node, code, node_tree, language)
     elif language.name == "c":
-        traverse_tree_c(root_node, bytes(code_string, "utf8"), node_tree, language)
+        traverse_tree_c(root_node, code, node_tree, language)
     else:
         raise ValueError(f"Unsupported language: {language.name}")
 
@@ -185,12 +420,14 @@ def process_code_string(code_string, language, file_path):
     node_tree.file_path = file_path
     node_tree.class_names = list(class_name_set)
     node_tree.property_declarations = list(properties_set)
+    # Bodies are spans of `code` until here, keep only the bodies themselves
+    node_tree.pack_bodies()
 
     return node_tree
 
 
 
-def save_file_trees(file_trees) -> None:
+def save_file_trees(file_trees, compact=False) -> None:
 
     # Get the absolute path of the current script
     script_location = pathlib.Path(__file__).parent.absolute()
@@ -206,15 +443,10 @@ def save_file_trees(file_trees) -> None:
     # Define the file path
     file_path = assets_dir / "file_trees.json"
 
-    print(f"SAVING FILE TREES....")
+    logging.debug(f"Saving file trees to {file_path}")
     with open(file_path, "w") as file:
-        print(f"SAVING TREE FOR file_path: {file_path}")
-        # Serialize using the to_dict method to get proper dictionary representations of your objects
-        file_trees_as_dicts = []
-        for file_path, tree_node in file_trees.items():
-                # print(f"SAVING FILE-TREE:{type(tree_node)}")
-                file_trees_as_dicts.append(tree_node.to_dict())
-        json.dump(
-            file_trees_as_dicts, file, indent=4
-        )  # You might want to use indent for better formatting
+        # Serialize one tree at a time using the to_dict method so only a single dictionary is alive at once
+        write_json_array(
+            file, (tree_node.to_dict() for tree_node in file_trees.values()), indent=None if compact else 4
+        )
 
@@ -0,0 +1,51 @@
+"""
+Registry of compiled tree-sitter queries, one per language.
+
+Each module under `src/parser/languages/` registers its query source at import time.
+Compiling a query is much more expensive than running it, so the compiled `Query`
+is cached per language and shared by every file parsed afterwards. A query that does not
+compile against the loaded grammar is logged once, and its language is skipped.
+"""
+
+import logging
+
+_query_sources = {}
+_compiled_queries = {}
+_failed_queries = set()
+
+
+def register_query(language_name, query_string):
+    """Register the capture query used to extract a language's code structure."""
+    _query_sources[language_name] = query_string
+
+
+def get_query(language):
+    """
+    Return the compiled query for `language`, compiling it on first use.
+
+    Args:
+        language (tree-sitter.Language): The language whose registered query is requested.
+
+    Returns:
+        The `Query`, or `None` if the query does not compile against the grammar of `language`.
+    """
+    key = (language.name, language.language_id)
+    query = _compiled_queries.get(key)
+    if query is None and key not in _failed_queries:
+        if language.name not in _query_sources:
+            raise ValueError(f"Unsupported language: {language.name}")
+        try:
+            query = language.query(_query_sources[language.name])
+        except Exception as e:
+            # tree-sitter raises NameError for node types the grammar lacks and SyntaxError for the rest
+            logging.error(f"Skipping {language.name} files, their query does not compile: {e}")
+            _failed_queries.add(key)
+            return None
+        _compiled_queries[key] = query
+    return query
+
+
+def compile_queries(languages):
+    """Eagerly compile the registered queries for all `languages`."""
+    for language in languages:
+        get_query(language)
@@ -0,0 +1,240 @@
+"""
+Retrieval of code context for chat prompts.
+
+`RetrievalIndex` splits the parsed file trees into units: one per function, with its signature and
+body, and one outline per file listing its classes, properties and function signatures. A question
+is matched against the units with BM25 over the words of their identifiers and bodies, names
+counting several times. Graph proximity then adds to every file linked in `full_graph.json` to
+one of the best matching files a share of that file's score, so the outlines and matching
+functions of its dependencies and dependents rank above unrelated matches. `build_context` packs
+the best units into a prompt context within a token budget.
+
+The index is built in one pass over the file trees and kept by the server between chat turns.
+"""
+
+import re
+import math
+import pathlib
+from collections import Counter, defaultdict
+
+from src.parser.search_index import function_signature, identifier_words, property_name
+
+FUNCTION = "function"
+OUTLINE = "outline"
+
+# BM25 term frequency saturation and document length normalisation
+K1 = 1.2
+B = 0.75
+# Times the words of a unit's name are counted, on top of their occurrences in its text
+NAME_WEIGHT = 3
+
+# Share of a matching file's score given to the files one and two links away
+PROXIMITY_WEIGHT = 0.5
+PROXIMITY_DECAY = 0.5
+PROXIMITY_SEEDS = 10
+
+DEFAULT_TOKEN_BUDGET = 2000
+# Rough size of a token in characters, close enough for source code and identifiers
+CHARS_PER_TOKEN = 4
+# Below this many tokens left, a unit that does not fit is not cut to fit either
+MIN_TRUNCATED_TOKENS = 64
+
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+STOP_WORDS = (
+    "a an and are as at be by can do does for from how i in is it me of on or show the this to "
+    "what when where which who why with"
+).split()
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def stem(word):
+    """Strip common inflections so `parse`, `parses`, `parsed` and `parsing` share a term."""
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not word.endswith("ss"):
+            word = word[: -len(suffix)]
+            break
+    return word[:-1] if word.endswith("e") and len(word) > 3 else word
+
+
+# Stemmed like the terms they are compared to
+STOP_TERMS = frozenset(stem(word) for word in STOP_WORDS)
+
+
+def tokenize(text, words=None):
+    """
+    Split the identifiers of `text` into stemmed lowercase words, keeping compound identifiers whole
+    as well, e.g. `hash`, `map` and `hashmap` for `HashMap`. `words` memoizes each identifier's terms.
+    """
+    words = {} if words is None else words
+    terms = []
+    for identifier in IDENTIFIER_PATTERN.findall(text):
+        split = words.get(identifier)
+        if split is None:
+            split = identifier_words(identifier)
+            lowered = identifier.lower()
+            if len(split) != 1 and len(lowered) > 1:
+                split.append(lowered)
+            split = [stem(word) for word in split]
+            words[identifier] = split
+        terms += split
+    return terms
+
+
+class Unit:
+    __slots__ = ("file", "kind", "name", "text")
+
+    def __init__(self, file, kind, name, text):
+        self.file = file
+        self.kind = kind
+        self.name = name
+        self.text = text
+
+
+def file_units(file_path, node_tree):
+    """Yield the function and outline `Unit`s of a `TreeNode`."""
+    outline = []
+    if node_tree.class_names:
+        outline.append(f"classes: {', '.join(sorted(node_tree.class_names))}")
+    outline += [declaration.strip().split("\n", 1)[0] for declaration in node_tree.property_declarations]
+    for function in node_tree.functions:
+        signature = function_signature(function)
+        if function.class_name:
+            signature = f"{function.class_name}.{signature}"
+        outline.append(signature)
+        body = function.body or ""
+        yield Unit(file_path, FUNCTION, function.name, f"{signature}\n{body}")
+    if outline:
+        yield Unit(file_path, OUTLINE, pathlib.Path(file_path).name, "\n".join(outline))
+
+
+class RetrievalIndex:
+    """
+    BM25 index of the function and outline units of every parsed file, with the file graph.
+
+    Args:
+        file_trees (dict): `TreeNode` of every file, keyed by file path.
+        links (list): Graph links as `{"source": ..., "target": ...}` between file paths.
+    """
+
+    def __init__(self, file_trees, links=()):
+        self.units = []
+        self.postings = defaultdict(list)
+        self.lengths = []
+        # Identifiers repeat a lot across bodies, split each distinct one once
+        words = {}
+
+        for file_path, node_tree in file_trees.items():
+            for unit in file_units(file_path, node_tree):
+                names = [unit.name]
+                if unit.kind == OUTLINE:
+                    names += node_tree.class_names
+                    names += [name for name in map(property_name, node_tree.property_declarations) if name]
+                terms = Counter(tokenize(unit.text, words))
+                for name in names:
+                    for term in tokenize(name, words):
+                        terms[term] += NAME_WEIGHT
+                unit_id = len(self.units)
+                self.units.append(unit)
+                self.lengths.append(sum(terms.values()))
+                for term, frequency in terms.items():
+                    self.postings[term].append((unit_id, frequency))
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+        self.neighbors = defaultdict(set)
+        for link in links:
+            if link["source"] != link["target"]:
+                self.neighbors[link["source"]].add(link["target"])
+                self.neighbors[link["target"]].add(link["source"])
+        self.outlines = {unit.file: unit_id for unit_id, unit in enumerate(self.units) if unit.kind == OUTLINE}
+
+    def scores(self, question):
+        """Return the BM25 score of every unit matching a word of `question`, keyed by unit ID."""
+        terms = {term for term in tokenize(question) if term not in STOP_TERMS}
+        count = len(self.units)
+        scores = defaultdict(float)
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for unit_id, frequency in postings:
+                norm = K1 * (1 - B + B * self.lengths[unit_id] / self.average_length)
+                scores[unit_id] += idf * frequency * (K1 + 1) / (frequency + norm)
+        return scores
+
+    def rank(self, question):
+        """
+        Rank units for `question` by their BM25 score, normalised to the best match, plus graph proximity.
+
+        Returns:
+            list: `(score, unit_id)` pairs, best first. Outlines of files near the best matching files
+            are included even if they do not match `question` themselves.
+        """
+        scores = self.scores(question)
+        if not scores:
+            return []
+        best = max(scores.values())
+        file_scores = {}
+        for unit_id, score in scores.items():
+            file_path = self.units[unit_id].file
+            file_scores[file_path] = max(file_scores.get(file_path, 0.0), score / best)
+
+        # Spread the scores of the best files two links out through the graph
+        proximity = {}
+        seeds = sorted(file_scores, key=file_scores.get, reverse=True)[:PROXIMITY_SEEDS]
+        for seed in seeds:
+            frontier = {seed}
+            share = file_scores[seed]
+            for _ in range(2):
+                share *= PROXIMITY_DECAY
+                frontier = {neighbor for file_path in frontier for neighbor in self.neighbors.get(file_path, ())}
+                for file_path in frontier:
+                    if file_path != seed and share > proximity.get(file_path, 0.0):
+                        proximity[file_path] = share
+
+        ranked = {unit_id: score / best for unit_id, score in scores.items()}
+        for file_path, share in proximity.items():
+            outline = self.outlines.get(file_path)
+            if outline is not None:
+                ranked.setdefault(outline, 0.0)
+        for unit_id in ranked:
+            ranked[unit_id] += PROXIMITY_WEIGHT * proximity.get(self.units[unit_id].file, 0.0)
+        return sorted(((score, unit_id) for unit_id, score in ranked.items()), key=lambda item: (-item[0], item[1]))
+
+    def build_context(self, question, token_budget=DEFAULT_TOKEN_BUDGET):
+        """
+        Pack the best ranked units for `question` into a prompt context of at most `token_budget` tokens.
+
+        Returns:
+            dict: The `context` text, its estimated `tokens`, and the `items` it contains, each with
+            its `file`, `kind`, `name`, `score` and `tokens`.
+        """
+        if token_budget < 1:
+            raise ValueError("token_budget must be positive")
+        sections = []
+        items = []
+        remaining = token_budget
+        for score, unit_id in self.rank(question):
+            if remaining < MIN_TRUNCATED_TOKENS:
+                break
+            unit = self.units[unit_id]
+            fence = pathlib.Path(unit.file).suffix.lstrip(".")
+            header = f"{unit.file} ({unit.kind} {unit.name})"
+            section = f"{header}\n```{fence}\n{unit.text}\n```"
+            tokens = estimate_tokens(section)
+            if tokens > remaining:
+                if sections:
+                    continue
+                # Cut the best unit rather than return nothing
+                available = max(0, remaining - estimate_tokens(f"{header}\n```{fence}\n\n...\n```")) * CHARS_PER_TOKEN
+                section = f"{header}\n```{fence}\n{unit.text[:available]}\n...\n```"
+                tokens = estimate_tokens(section)
+            sections.append(section)
+            items.append({
+                "file": unit.file, "kind": unit.kind, "name": unit.name, "score": round(score, 4), "tokens": tokens
+            })
+            remaining -= tokens
+        return {"context": "\n\n".join(sections), "tokens": token_budget - remaining, "items": items}
@@ -0,0 +1,259 @@
+"""
+Symbol search over the parsed file trees.
+
+`build_symbol_index` collects every class, function and property of the parsed files into
+`index/symbols.json`, next to `file_trees.json` but without function bodies, imports or other
+per-file data. Symbols are kept sorted by lowercased name, so exact and prefix queries are binary
+searches. An inverted index maps every word of an identifier, e.g. `file` and `tree` for
+`save_file_trees` or `FileTree`, to its symbols, so prefix queries also match inside names. Fuzzy
+queries look up candidate names sharing trigrams with the query and rank them by edit distance.
+
+Every result carries the file ID used by the graph's nodes, so a client can focus the node.
+"""
+
+import re
+import json
+import bisect
+import logging
+from collections import Counter, defaultdict
+
+from src.parser.manifest import INDEX_DIR
+
+SYMBOL_INDEX_VERSION = 1
+SYMBOL_INDEX_PATH = INDEX_DIR / "symbols.json"
+
+CLASS = "class"
+FUNCTION = "function"
+PROPERTY = "property"
+SYMBOL_KINDS = (CLASS, FUNCTION, PROPERTY)
+
+EXACT = "exact"
+PREFIX = "prefix"
+FUZZY = "fuzzy"
+SEARCH_MODES = (EXACT, PREFIX, FUZZY)
+
+DEFAULT_LIMIT = 50
+
+# Placeholders the traversers store for languages without declared return types
+UNKNOWN_RETURN_TYPES = frozenset(["None", "undefined", "n/a"])
+
+# Property signatures keep the first line of the declaration, cut to this many characters
+MAX_SIGNATURE_LENGTH = 160
+
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_$][\w$]*")
+WORD_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+# Fields of a symbol entry in `symbols.json`
+NAME, KIND, FILE, CONTAINER, SIGNATURE = range(5)
+
+
+def identifier_words(name):
+    """Split an identifier into lowercase words at underscores, digits and camel case humps."""
+    return [word.lower() for word in WORD_PATTERN.findall(name) if len(word) > 1]
+
+
+def property_name(declaration):
+    """Best-effort name of a raw property declaration such as `private int count = 0;` or `val x: Int`."""
+    declaration = declaration.split("=", 1)[0].split(":", 1)[0].strip().rstrip(";")
+    identifiers = IDENTIFIER_PATTERN.findall(declaration)
+    return identifiers[-1] if identifiers else None
+
+
+def function_signature(function):
+    """`name(parameters): return_type` of a `FunctionNode`, without the placeholder return types."""
+    parameters = ", ".join(parameter for parameter in function.parameters if parameter)
+    signature = f"{function.name}({parameters})"
+    if function.return_type and function.return_type not in UNKNOWN_RETURN_TYPES:
+        signature += f": {function.return_type}"
+    return signature
+
+
+def file_symbols(node_tree):
+    """Yield `(name, kind, container, signature)` for every symbol defined in a `TreeNode`."""
+    for class_name in node_tree.class_names:
+        yield class_name, CLASS, "", ""
+    for function in node_tree.functions:
+        yield function.name, FUNCTION, function.class_name, function_signature(function)
+    for declaration in node_tree.property_declarations:
+        name = property_name(declaration)
+        if name:
+            yield name, PROPERTY, "", declaration.strip().split("\n", 1)[0][:MAX_SIGNATURE_LENGTH]
+
+
+def build_symbol_index(file_trees):
+    """
+    Build the symbol index data of `file_trees`, as saved by `save_symbol_index`.
+
+    Returns:
+        dict: `files`, the file IDs, `symbols`, the `[name, kind, file, container, signature]`
+        entries sorted by lowercased name, and `words`, mapping identifier words to entry indices.
+    """
+    files = list(file_trees)
+    symbols = []
+    for file_index, node_tree in enumerate(file_trees.values()):
+        seen = set()
+        for name, kind, container, signature in file_symbols(node_tree):
+            key = (name, kind, container, signature)
+            if key not in seen:
+                seen.add(key)
+                symbols.append([name, kind, file_index, container, signature])
+    # Signatures break ties between properties, whose declarations come out of a set in no fixed order
+    symbols.sort(
+        key=lambda symbol: (symbol[NAME].lower(), symbol[NAME], symbol[FILE], symbol[KIND], symbol[CONTAINER], symbol[SIGNATURE])
+    )
+
+    words = defaultdict(list)
+    for symbol_index, symbol in enumerate(symbols):
+        for word in dict.fromkeys(identifier_words(symbol[NAME])):
+            words[word].append(symbol_index)
+
+    return {"version": SYMBOL_INDEX_VERSION, "files": files, "symbols": symbols, "words": dict(words)}
+
+
+def save_symbol_index(data, path=SYMBOL_INDEX_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, max_distance):
+    """Levenshtein distance between `a` and `b`, or `max_distance + 1` once it is known to be larger."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, a_char in enumerate(a, 1):
+        current = [i]
+        for j, b_char in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a_char != b_char)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class SymbolIndex:
+    """
+    In-memory symbol index loaded from `symbols.json`.
+
+    Attributes:
+        files (list): File IDs, matching the IDs of the graph's nodes.
+        symbols (list): `[name, kind, file, container, signature]` entries sorted by lowercased name.
+    """
+
+    def __init__(self, data):
+        self.files = data["files"]
+        self.symbols = data["symbols"]
+        self.words = data["words"]
+        self._keys = [symbol[NAME].lower() for symbol in self.symbols]
+        self._sorted_words = sorted(self.words)
+        self._names = None
+        self._name_trigrams = None
+
+    @classmethod
+    def load(cls, path=SYMBOL_INDEX_PATH):
+        """Load the saved index, or return `None` if it is missing or was written by another version."""
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != SYMBOL_INDEX_VERSION:
+            logging.info("Symbol index is stale, re-index to rebuild it")
+            return None
+        return cls(data)
+
+    def _key_range(self, low, high):
+        return range(bisect.bisect_left(self._keys, low), bisect.bisect_left(self._keys, high))
+
+    def _exact(self, query):
+        return self._key_range(query, query + "\0")
+
+    def _prefix(self, query):
+        # Names starting with the query, then names containing a word starting with it
+        matches = dict.fromkeys(self._key_range(query, query + "\uffff"))
+        start = bisect.bisect_left(self._sorted_words, query)
+        for word in self._sorted_words[start:]:
+            if not word.startswith(query):
+                break
+            matches.update(dict.fromkeys(self.words[word]))
+        return matches
+
+    def _build_name_trigrams(self):
+        # Built on the first fuzzy query; published at the end since requests may run concurrently
+        names = list(dict.fromkeys(self._keys))
+        name_trigrams = defaultdict(list)
+        for name_index, name in enumerate(names):
+            for trigram in _trigrams(name):
+                name_trigrams[trigram].append(name_index)
+        self._names, self._name_trigrams = names, name_trigrams
+
+    def _fuzzy(self, query, max_distance):
+        if self._name_trigrams is None:
+            self._build_name_trigrams()
+        shared = Counter()
+        for trigram in _trigrams(query):
+            shared.update(self._name_trigrams.get(trigram, ()))
+        # Every edit destroys at most three trigrams of the query
+        min_shared = max(1, len(_trigrams(query)) - 3 * max_distance)
+        distances = {}
+        for name_index, count in shared.items():
+            if count >= min_shared:
+                name = self._names[name_index]
+                distance = edit_distance(query, name, max_distance)
+                if distance <= max_distance:
+                    distances[name] = distance
+        matches = {}
+        for name in sorted(distances, key=lambda name: (distances[name], name)):
+            matches.update(dict.fromkeys(self._exact(name)))
+        return matches
+
+    def search(self, query, mode=PREFIX, kinds=None, limit=DEFAULT_LIMIT, max_distance=None):
+        """
+        Find symbols by name, ignoring case.
+
+        Args:
+            query (str): Symbol name or the start of one.
+            mode (str): `exact` for whole names, `prefix` for names or identifier words starting with
+                `query`, `fuzzy` for names within `max_distance` edits of `query`.
+            kinds (iterable): Only return symbols of these kinds: `class`, `function` or `property`.
+            limit (int): Maximum number of results.
+            max_distance (int): Edits allowed in fuzzy mode, by default 1 for queries of up to
+                five characters and 2 for longer ones.
+
+        Returns:
+            list: Dicts with the symbol's `name`, `kind`, `file` ID, `container` class and `signature`,
+            best matches first: exact names, then names and then words starting with the query.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        if mode == EXACT:
+            matches = self._exact(query)
+        elif mode == PREFIX:
+            matches = self._prefix(query)
+        elif mode == FUZZY:
+            matches = self._fuzzy(query, max_distance if max_distance is not None else (1 if len(query) <= 5 else 2))
+        else:
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        kinds = set(kinds) if kinds else None
+        results = []
+        for symbol_index in matches:
+            name, kind, file_index, container, signature = self.symbols[symbol_index]
+            if kinds is not None and kind not in kinds:
+                continue
+            results.append({
+                "name": name,
+                "kind": kind,
+                "file": self.files[file_index],
+                "container": container,
+                "signature": signature,
+            })
+            if len(results) >= limit:
+                break
+        return results
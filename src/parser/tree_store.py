@@ -0,0 +1,248 @@
+"""
+Segmented, memory-mapped store of the parsed file trees.
+
+`index/file_trees.json` holds every `TreeNode` with its function bodies inline, so reading one file
+means parsing all of them. `index/file_trees.bin` holds the same data as one record per file:
+
+    header      magic, version, file count, and the offset and length of the path list
+    records     per file: a table of `(offset, length)` pairs locating each function body, the
+                bodies as UTF-8, then the rest of the `TreeNode` as JSON with the bodies left out
+    paths       JSON array of the file paths, in record order
+    directory   per file: record offset, function count, bodies length and JSON length
+
+Opening the store maps the file and reads only the path list. A file's `TreeNode` is decoded from
+its own record, and a single function body is two reads at fixed offsets.
+
+The store is written by `process_modules` next to the JSON file; older indexes can be converted with
+
+    python -m src.parser.tree_store convert [index/file_trees.json] [index/file_trees.bin]
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import pathlib
+import argparse
+
+from src.parser.TreeNode import FunctionNode, TreeNode
+from src.parser.manifest import FILE_TREES_PATH, INDEX_DIR
+
+FILE_TREE_STORE_VERSION = 1
+FILE_TREE_STORE_PATH = INDEX_DIR / "file_trees.bin"
+
+MAGIC = b"CVFT"
+# Magic, version, file count, path list offset and length
+HEADER = struct.Struct("<4sIIQQ")
+# Record offset, function count, bodies length, JSON length
+DIRECTORY_ENTRY = struct.Struct("<QQQQ")
+BODY_SPAN = struct.Struct("<QQ")
+
+
+def _encode_record(record):
+    # Record layout: body spans, bodies, then the JSON of everything else
+    bodies = []
+    functions = []
+    for function in record["functions"]:
+        body = function["body"]
+        bodies.append(body.encode("utf-8") if isinstance(body, str) else (body or b""))
+        functions.append({**function, "body": None})
+    spans = bytearray()
+    position = 0
+    for body in bodies:
+        spans += BODY_SPAN.pack(position, len(body))
+        position += len(body)
+    metadata = json.dumps({**record, "functions": functions}, separators=(",", ":")).encode("utf-8")
+    return bytes(spans) + b"".join(bodies) + metadata, len(bodies), position, len(metadata)
+
+
+def write_file_tree_store(records, path=FILE_TREE_STORE_PATH):
+    """
+    Write the store from an iterable of `TreeNode.to_dict()` records, replacing `path` atomically.
+
+    Returns:
+        int: Number of files written.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = path.with_suffix(f".{os.getpid()}.tmp")
+    paths = []
+    directory = bytearray()
+    with open(temporary_path, "wb") as f:
+        f.seek(HEADER.size)
+        for record in records:
+            encoded, function_count, bodies_length, metadata_length = _encode_record(record)
+            directory += DIRECTORY_ENTRY.pack(f.tell(), function_count, bodies_length, metadata_length)
+            paths.append(record["file_path"])
+            f.write(encoded)
+        paths_offset = f.tell()
+        encoded_paths = json.dumps(paths, separators=(",", ":")).encode("utf-8")
+        f.write(encoded_paths)
+        f.write(directory)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, FILE_TREE_STORE_VERSION, len(paths), paths_offset, len(encoded_paths)))
+    os.replace(temporary_path, path)
+    return len(paths)
+
+
+def save_file_tree_store(file_trees, path=FILE_TREE_STORE_PATH):
+    """Write the `TreeNode`s of `file_trees` to the store, one at a time."""
+    return write_file_tree_store((node_tree.to_dict() for node_tree in file_trees.values()), path)
+
+
+def convert_file_trees_json(json_path=FILE_TREES_PATH, store_path=FILE_TREE_STORE_PATH):
+    """Convert a `file_trees.json` written by `save_file_trees` to a store. Returns the number of files."""
+    with open(json_path, "r") as f:
+        records = json.load(f)
+    return write_file_tree_store(records, store_path)
+
+
+class FileTreeStore:
+    """
+    Read-only view of a store, mapped into memory.
+
+    Supports `len`, `in` and iteration over the file paths, in the order they were written.
+    Lookups never decode more than the record they need.
+    """
+
+    def __init__(self, path=FILE_TREE_STORE_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = None
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, count, paths_offset, paths_length = HEADER.unpack_from(self._map)
+        except (ValueError, struct.error):
+            self._file.close()
+            raise ValueError(f"{path} is not a file tree store")
+        if magic != MAGIC or version != FILE_TREE_STORE_VERSION:
+            self.close()
+            raise ValueError(f"{path} was written by another version")
+        self._paths = json.loads(self._map[paths_offset : paths_offset + paths_length])
+        self._directory_offset = paths_offset + paths_length
+        self._indices = {file_path: index for index, file_path in enumerate(self._paths)}
+        if len(self._paths) != count:
+            self.close()
+            raise ValueError(f"{path} is truncated")
+
+    @classmethod
+    def open(cls, path=FILE_TREE_STORE_PATH):
+        """Open the store at `path`, or return `None` if it is missing or unreadable."""
+        try:
+            return cls(path)
+        except (OSError, ValueError):
+            return None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __contains__(self, file_path):
+        return file_path in self._indices
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def _entry(self, file_path):
+        index = self._indices.get(file_path)
+        if index is None:
+            raise KeyError(file_path)
+        return DIRECTORY_ENTRY.unpack_from(self._map, self._directory_offset + index * DIRECTORY_ENTRY.size)
+
+    def record(self, file_path, bodies=False):
+        """
+        Return the `TreeNode.to_dict()` record of `file_path`.
+
+        Function bodies are `None` unless `bodies` is set, then they are decoded from the record as well.
+        """
+        offset, function_count, bodies_length, metadata_length = self._entry(file_path)
+        bodies_offset = offset + function_count * BODY_SPAN.size
+        metadata_offset = bodies_offset + bodies_length
+        record = json.loads(self._map[metadata_offset : metadata_offset + metadata_length])
+        if bodies:
+            for index, function in enumerate(record["functions"]):
+                start, length = BODY_SPAN.unpack_from(self._map, offset + index * BODY_SPAN.size)
+                function["body"] = self._map[bodies_offset + start : bodies_offset + start + length].decode("utf-8")
+        return record
+
+    def get(self, file_path):
+        """
+        Return the `TreeNode` of `file_path`, bodies included. Raises `KeyError` for unknown files.
+
+        The bodies are copied out of the record as a single buffer and decoded when read.
+        """
+        offset, function_count, bodies_length, _ = self._entry(file_path)
+        node_tree = TreeNode.from_dict(self.record(file_path))
+        bodies_offset = offset + function_count * BODY_SPAN.size
+        bodies = self._map[bodies_offset : bodies_offset + bodies_length]
+        for index, function in enumerate(node_tree.functions):
+            start, length = BODY_SPAN.unpack_from(self._map, offset + index * BODY_SPAN.size)
+            function.body = (bodies, start, start + length)
+        return node_tree
+
+    def function_body(self, file_path, index):
+        """Return the body of the `index`-th function of `file_path`, without decoding anything else."""
+        offset, function_count, bodies_length, _ = self._entry(file_path)
+        if not 0 <= index < function_count:
+            raise IndexError(f"{file_path} has {function_count} functions")
+        start, length = BODY_SPAN.unpack_from(self._map, offset + index * BODY_SPAN.size)
+        bodies_offset = offset + function_count * BODY_SPAN.size
+        return self._map[bodies_offset + start : bodies_offset + start + length].decode("utf-8")
+
+    def function(self, file_path, index):
+        """Return the `index`-th `FunctionNode` of `file_path`."""
+        data = self.record(file_path)["functions"][index]
+        return FunctionNode.from_dict({**data, "body": self.function_body(file_path, index)})
+
+    def items(self):
+        """Yield `(file_path, TreeNode)` for every file, decoding one record at a time."""
+        for file_path in self._paths:
+            yield file_path, self.get(file_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert", help="convert file_trees.json to a store")
+    convert.add_argument("json_path", nargs="?", default=str(FILE_TREES_PATH))
+    convert.add_argument("store_path", nargs="?", default=str(FILE_TREE_STORE_PATH))
+    show = commands.add_parser("show", help="print the record of one file, or one function body")
+    show.add_argument("file_path")
+    show.add_argument("--function", type=int, help="index of the function whose body to print")
+    show.add_argument("--store", default=str(FILE_TREE_STORE_PATH))
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        count = convert_file_trees_json(pathlib.Path(args.json_path), pathlib.Path(args.store_path))
+        print(f"Wrote {count} file trees to {args.store_path}")
+        return 0
+
+    store = FileTreeStore.open(pathlib.Path(args.store))
+    if store is None:
+        print(f"No file tree store at {args.store}", file=sys.stderr)
+        return 1
+    with store:
+        if args.file_path not in store:
+            print(f"{args.file_path} is not in the store", file=sys.stderr)
+            return 1
+        if args.function is not None:
+            print(store.function_body(args.file_path, args.function))
+        else:
+            print(json.dumps(store.record(args.file_path, bodies=True), indent=4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,363 @@
+"""
+Trigram index over the indexed source files, backing the `/grep` endpoint.
+
+Every file is reduced to the set of byte trigrams of its lowercased contents while `process_modules`
+has its bytes in memory. The index maps each trigram to the sorted IDs of the files containing it
+and is stored in two files under `index/`:
+
+    trigrams.bin        header, sorted trigram keys, posting offsets and the posting lists, read
+                        through `mmap` so a query only touches the pages of the trigrams it needs
+    trigram_docs.json   `[path, content hash]` per file ID, `null` for files deleted or changed since
+
+Updates are incremental: files whose content hash is unchanged keep their ID and postings, changed
+files are tombstoned and appended under a new ID, and the posting lists are rewritten by copying
+the old lists and appending the new IDs. Once more than half of the IDs are tombstones the index
+is rebuilt from scratch on the next run.
+
+A regex query is turned into an AND/OR tree of the trigrams its matches must contain. Only the
+files passing that filter are read and searched with the regex itself.
+"""
+
+import os
+import re
+import sys
+import json
+import mmap
+import array
+import bisect
+import struct
+import logging
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+from src.parser.manifest import INDEX_DIR
+
+TRIGRAM_INDEX_VERSION = 1
+TRIGRAM_INDEX_PATH = INDEX_DIR / "trigrams.bin"
+TRIGRAM_DOCS_PATH = INDEX_DIR / "trigram_docs.json"
+
+MAGIC = b"CVTG"
+# Magic, version, generation, trigram count
+HEADER = struct.Struct("<4sIII")
+
+# Rebuild the index from scratch once more than this share of its file IDs are tombstones
+MAX_DEAD_RATIO = 0.5
+
+DEFAULT_GREP_LIMIT = 100
+MAX_LINE_LENGTH = 300
+
+_REPEATS = tuple(
+    getattr(sre_constants, name) for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT") if hasattr(sre_constants, name)
+)
+
+
+def source_trigrams(code):
+    """Return the sorted trigram keys of the lowercased `code` bytes as an `array` of uint32."""
+    code = code.lower()
+    if len(code) < 4 or sys.byteorder != "little":
+        keys = {a | (b << 8) | (c << 16) for a, b, c in zip(code, code[1:], code[2:])}
+        return array.array("I", sorted(keys))
+    # Read the bytes as four interleaved runs of 4-byte words, so the windows are collected in C,
+    # then keep the first three bytes of each distinct window and add the final trigram
+    view = memoryview(code)
+    windows = set()
+    for offset in range(4):
+        windows.update(view[offset : offset + (len(code) - offset) // 4 * 4].cast("I"))
+    keys = {window & 0xFFFFFF for window in windows}
+    keys.add(int.from_bytes(code[-3:], "little"))
+    return array.array("I", sorted(keys))
+
+
+def _trigram_keys(literal):
+    return [int.from_bytes(literal[i : i + 3], "little") for i in range(len(literal) - 2)]
+
+
+def _little_endian(values):
+    if sys.byteorder != "little":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def _and(parts):
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else ("and", parts)
+
+
+def _or(parts):
+    if not parts or any(part is None for part in parts):
+        return None
+    return parts[0] if len(parts) == 1 else ("or", parts)
+
+
+def _plan(subpattern, ignore_case):
+    parts = []
+    literal = bytearray()
+
+    def end_literal():
+        keys = _trigram_keys(bytes(literal).lower())
+        if ignore_case:
+            # Only ASCII letters are lowercased in the index, other bytes could match other cases
+            keys = [key for key in keys if not any((key >> shift) & 0x80 for shift in (0, 8, 16))]
+        parts.extend(keys)
+        literal.clear()
+
+    for op, argument in subpattern:
+        if op is sre_constants.LITERAL:
+            literal += chr(argument).encode("utf-8")
+            continue
+        if op is sre_constants.AT:  # Anchors do not consume characters
+            continue
+        end_literal()
+        if op is sre_constants.SUBPATTERN:
+            parts.append(_plan(argument[-1], ignore_case))
+        elif op in _REPEATS:
+            minimum, _, item = argument
+            if minimum >= 1:
+                parts.append(_plan(item, ignore_case))
+        elif op is sre_constants.BRANCH:
+            parts.append(_or([_plan(branch, ignore_case) for branch in argument[1]]))
+        elif op is getattr(sre_constants, "ATOMIC_GROUP", None):
+            parts.append(_plan(argument, ignore_case))
+    end_literal()
+    return _and(parts)
+
+
+def regex_trigram_query(pattern, ignore_case=False):
+    """
+    Return the trigrams a match of `pattern` must contain as a tree of `("and", parts)`,
+    `("or", parts)` and trigram keys, or `None` when any file could match.
+    """
+    return _plan(sre_parse.parse(pattern), ignore_case)
+
+
+class TrigramIndex:
+    """
+    Memory-mapped trigram index.
+
+    Attributes:
+        docs (list): `[path, content hash]` per file ID, `None` for tombstones.
+        generation (int): Incremented by every write, shared by both index files.
+    """
+
+    def __init__(self, docs, generation, index_file=None):
+        self.docs = docs
+        self.generation = generation
+        self._file = index_file
+        self._map = None
+        self._keys = self._offsets = self._postings = memoryview(b"").cast("I")
+        if index_file is not None:
+            self._map = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            _, _, _, count = HEADER.unpack_from(self._map)
+            view = memoryview(self._map)
+            keys_end = HEADER.size + 4 * count
+            offsets_end = keys_end + 8 * (count + 1)
+            self._keys = view[HEADER.size : keys_end].cast("I")
+            self._offsets = view[keys_end:offsets_end].cast("Q")
+            self._postings = view[offsets_end:].cast("I")
+
+    @classmethod
+    def open(cls, index_path=TRIGRAM_INDEX_PATH, docs_path=TRIGRAM_DOCS_PATH):
+        """Open the saved index, or return `None` if it is missing, stale or half written."""
+        try:
+            with open(docs_path, "r") as f:
+                data = json.load(f)
+            index_file = open(index_path, "rb")
+        except (OSError, ValueError):
+            return None
+        magic, version, generation, _ = HEADER.unpack(index_file.read(HEADER.size).ljust(HEADER.size, b"\0"))
+        if (
+            magic != MAGIC or version != TRIGRAM_INDEX_VERSION or data.get("version") != TRIGRAM_INDEX_VERSION
+            or data.get("generation") != generation or sys.byteorder != "little"
+        ):
+            index_file.close()
+            logging.info("Trigram index is stale, it will be rebuilt by the next indexing run")
+            return None
+        return cls(data["docs"], generation, index_file)
+
+    def close(self):
+        self._keys = self._offsets = self._postings = memoryview(b"").cast("I")
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = self._file = None
+
+    @property
+    def dead_ratio(self):
+        return sum(doc is None for doc in self.docs) / len(self.docs) if self.docs else 0.0
+
+    def live_hashes(self):
+        """Map the path of every live file to the content hash it was indexed with."""
+        return {doc[0]: doc[1] for doc in self.docs if doc is not None}
+
+    def _posting_slice(self, key):
+        position = bisect.bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            return 0, 0
+        return self._offsets[position], self._offsets[position + 1]
+
+    def _posting_count(self, key):
+        start, end = self._posting_slice(key)
+        return end - start
+
+    def postings(self, key):
+        """Return the IDs of the files containing the trigram `key`, tombstones included."""
+        start, end = self._posting_slice(key)
+        # A copy, a view would keep the map from being closed
+        return self._postings[start:end].tolist()
+
+    def _evaluate(self, query):
+        if isinstance(query, int):
+            return set(self.postings(query))
+        operator, parts = query
+        if operator == "or":
+            result = set()
+            for part in parts:
+                result |= self._evaluate(part)
+            return result
+        # Intersect starting from the rarest trigrams
+        keys = sorted((part for part in parts if isinstance(part, int)), key=self._posting_count)
+        result = None
+        for part in keys + [part for part in parts if not isinstance(part, int)]:
+            ids = self._evaluate(part)
+            result = ids if result is None else result & ids
+            if not result:
+                break
+        return result
+
+    def candidates(self, query):
+        """Return the IDs of the live files that may contain a match of the trigram `query`."""
+        ids = range(len(self.docs)) if query is None else sorted(self._evaluate(query))
+        return [doc_id for doc_id in ids if self.docs[doc_id] is not None]
+
+    def grep(self, pattern, ignore_case=False, limit=DEFAULT_GREP_LIMIT, path_prefix=None):
+        """
+        Search the indexed files for `pattern`, reading only the files the trigrams cannot rule out.
+
+        Returns:
+            dict: `results`, each with the `file`, 1-based `line` and `column` and the `text` of the
+            matching line, `candidates`, the files read, and `truncated` if `limit` was reached.
+        """
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        regex = re.compile(pattern, flags)
+        query = regex_trigram_query(pattern, bool(regex.flags & re.IGNORECASE))
+
+        results = []
+        candidates = 0
+        for doc_id in self.candidates(query):
+            path = self.docs[doc_id][0]
+            if path_prefix and not path.startswith(path_prefix):
+                continue
+            candidates += 1
+            try:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                continue
+            line, line_start = 1, 0
+            for match in regex.finditer(text):
+                line += text.count("\n", line_start, match.start())
+                line_start = text.rfind("\n", 0, match.start()) + 1
+                line_end = text.find("\n", match.start())
+                results.append({
+                    "file": path,
+                    "line": line,
+                    "column": match.start() - line_start + 1,
+                    "text": text[line_start : line_end if line_end != -1 else len(text)][:MAX_LINE_LENGTH],
+                })
+                if len(results) >= limit:
+                    return {"results": results, "candidates": candidates, "truncated": True}
+        return {"results": results, "candidates": candidates, "truncated": False}
+
+
+class TrigramIndexWriter:
+    """
+    Build the next version of the index while files are still being read.
+
+    Files are added as their trigrams arrive, in any order, and get the next free ID; the live ID
+    of the same path in `previous` becomes a tombstone. `write` also tombstones the files that are
+    no longer indexed and writes the postings of `previous` followed by the new ones.
+
+    Args:
+        previous (TrigramIndex): Index of the previous run, or `None` to build a new one.
+    """
+
+    def __init__(self, previous=None):
+        self.previous = previous
+        self.docs = list(previous.docs) if previous is not None else []
+        self._live_ids = {doc[0]: doc_id for doc_id, doc in enumerate(self.docs) if doc is not None}
+        self._postings = {}
+        self.added = 0
+
+    def add(self, file_path, content_hash, keys):
+        previous_id = self._live_ids.pop(file_path, None)
+        if previous_id is not None:
+            self.docs[previous_id] = None
+        doc_id = len(self.docs)
+        self.docs.append([file_path, content_hash])
+        self.added += 1
+        for key in keys:
+            postings = self._postings.get(key)
+            if postings is None:
+                postings = self._postings[key] = array.array("I")
+            postings.append(doc_id)
+
+    def write(self, live_paths, index_path=TRIGRAM_INDEX_PATH, docs_path=TRIGRAM_DOCS_PATH):
+        """Write the index of `live_paths`, replacing the saved files atomically."""
+        previous = self.previous
+        removed = [file_path for file_path in self._live_ids if file_path not in live_paths]
+        for file_path in removed:
+            self.docs[self._live_ids.pop(file_path)] = None
+        if previous is not None and not self.added and not removed:
+            return
+
+        old_keys = previous._keys if previous is not None else []
+        all_keys = sorted(set(old_keys).union(self._postings))
+        generation = (previous.generation + 1) if previous is not None else 1
+
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = index_path.with_suffix(f".{os.getpid()}.tmp")
+        offsets = array.array("Q", [0])
+        with open(temporary_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, TRIGRAM_INDEX_VERSION, generation, len(all_keys)))
+            f.write(_little_endian(array.array("I", all_keys)).tobytes())
+            # Offsets are only known once the postings are laid out, reserve their space first
+            offsets_position = f.tell()
+            f.seek(8 * (len(all_keys) + 1), os.SEEK_CUR)
+            total = 0
+            for key in all_keys:
+                if previous is not None:
+                    start, end = previous._posting_slice(key)
+                    if end > start:
+                        f.write(previous._postings[start:end].tobytes())
+                        total += end - start
+                postings = self._postings.get(key)
+                if postings is not None:
+                    f.write(_little_endian(postings).tobytes())
+                    total += len(postings)
+                offsets.append(total)
+            f.seek(offsets_position)
+            f.write(_little_endian(offsets).tobytes())
+        os.replace(temporary_path, index_path)
+
+        # Written last: readers only accept the pair once both carry the same generation
+        temporary_path = docs_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temporary_path, "w") as f:
+            json.dump(
+                {"version": TRIGRAM_INDEX_VERSION, "generation": generation, "docs": self.docs}, f,
+                separators=(",", ":")
+            )
+        os.replace(temporary_path, docs_path)
+
+        live = sum(doc is not None for doc in self.docs)
+        logging.info(
+            f"Trigram index: {live} files, {len(self.docs) - live} tombstones, {len(all_keys)} trigrams, "
+            f"{self.added} files (re)indexed"
+        )
@@ -0,0 +1,158 @@
+"""
+Single-pass source file discovery.
+
+`walk_source_files` walks a directory tree once with `os.scandir`, pruning skipped and ignored
+directories before descending into them and picking each file's language by a dictionary lookup
+on its extension. `.gitignore` files are honoured at every level of the tree. Files are yielded as
+soon as they are found, so callers can start fingerprinting and parsing while the walk continues.
+"""
+
+import os
+import re
+
+# Directory names that are never descended into
+SKIP_DIRECTORIES = frozenset([
+    'node_modules', 'build', 'dist', 'out', 'bin', '.git', '.svn', '.vscode',
+    '__pycache__', '.idea', 'obj', 'lib', 'vendor', 'target', '.next', 'pkg',
+    'venv', '.tox', 'wheels', 'Debug', 'Release', 'deps'
+])
+
+GITIGNORE_FILE = ".gitignore"
+
+
+def _translate_gitignore_pattern(pattern):
+    """Translate the glob part of a `.gitignore` pattern into a regular expression."""
+    regex = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            regex.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            character_class = pattern[i + 1 : end].replace("\\", "\\\\")
+            if character_class.startswith("!"):
+                character_class = "^" + character_class[1:]
+            regex.append(f"[{character_class}]")
+            i = end + 1
+        else:
+            if pattern[i] == "\\" and i + 1 < len(pattern):
+                i += 1
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(regex)
+
+
+class GitIgnore:
+    """
+    The patterns of one `.gitignore` file, matched against paths below its directory.
+
+    Supports comments, `!` negation, directory-only patterns with a trailing `/`, patterns
+    anchored by a leading or inner `/`, and the `*`, `?`, `[...]` and `**` wildcards.
+    """
+
+    def __init__(self, base_dir, lines):
+        self.base_dir = base_dir
+        self.patterns = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            elif line.startswith("\\"):
+                line = line[1:]
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            prefix = "^" if anchored else "^(?:.*/)?"
+            regex = re.compile(prefix + _translate_gitignore_pattern(line.lstrip("/")) + "$")
+            self.patterns.append((regex, negate, directory_only))
+
+    @classmethod
+    def from_directory(cls, directory):
+        """Load `directory/.gitignore`, or return `None` when there is none."""
+        try:
+            with open(os.path.join(directory, GITIGNORE_FILE), "r", encoding="utf-8", errors="replace") as f:
+                return cls(directory, f.readlines())
+        except OSError:
+            return None
+
+    def match(self, path, is_dir):
+        """
+        Return `True` if `path` is ignored, `False` if a negated pattern re-includes it, or `None`
+        when no pattern matches. The last matching pattern wins, as in git.
+        """
+        # Walked paths always start with the directory holding the `.gitignore`
+        relative_path = path[len(self.base_dir):].lstrip(os.sep).replace(os.sep, "/")
+        result = None
+        for regex, negate, directory_only in self.patterns:
+            if directory_only and not is_dir:
+                continue
+            if regex.match(relative_path):
+                result = not negate
+        return result
+
+
+def is_ignored(gitignores, path, is_dir):
+    """Check `path` against `.gitignore` files ordered from the outermost to the innermost directory."""
+    ignored = False
+    for gitignore in gitignores:
+        result = gitignore.match(path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
+
+
+def walk_source_files(top, extension_languages, skip_directories=SKIP_DIRECTORIES):
+    """
+    Yield `(file_path, lang)` for every file under `top` whose extension is in `extension_languages`.
+
+    Directories are visited depth first in sorted order, so the output is the same on every file
+    system. Hidden entries, directories named in `skip_directories` and paths ignored by a
+    `.gitignore` are skipped without being descended into. Symlinked directories are not followed.
+
+    Args:
+        top (str): Directory to walk.
+        extension_languages (dict): Maps file extensions such as `.py` to language names.
+        skip_directories (frozenset): Directory names that are never descended into.
+    """
+    stack = [(top, ())]
+    while stack:
+        directory, gitignores = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        if any(entry.name == GITIGNORE_FILE for entry in entries):
+            gitignore = GitIgnore.from_directory(directory)
+            if gitignore is not None and gitignore.patterns:
+                gitignores = gitignores + (gitignore,)
+
+        subdirectories = []
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in skip_directories and not is_ignored(gitignores, entry.path, True):
+                    subdirectories.append(entry.path)
+                continue
+            lang = extension_languages.get(os.path.splitext(entry.name)[1])
+            if lang is not None and entry.is_file() and not is_ignored(gitignores, entry.path, False):
+                yield entry.path, lang
+
+        stack.extend((subdirectory, gitignores) for subdirectory in reversed(subdirectories))
@@ -0,0 +1,115 @@
+"""
+Optional per-job profiling of indexing runs.
+
+A `ProfileSession` profiles the job thread with cProfile or, if it is installed, pyinstrument and
+writes the result under `index/profiles/`. With cProfile, threads started through `profile_thread`
+while the session is active, such as the indexing pipeline's read and parse threads, get their own
+profiler and their stats are merged into the same dump. From Python 3.12 cProfile is built on the
+process-wide `sys.monitoring`, which allows a single profiler at a time, so the session's profiler
+records those threads itself. Parse worker processes are not profiled; profile a run with one worker
+to see the parsers.
+"""
+
+import sys
+import cProfile
+import pstats
+import threading
+import contextvars
+
+from src.parser.manifest import INDEX_DIR
+
+PROFILE_DIR = INDEX_DIR / "profiles"
+
+CPROFILE = "cprofile"
+PYINSTRUMENT = "pyinstrument"
+PROFILERS = (CPROFILE, PYINSTRUMENT)
+
+# A cProfile profiler sees every thread, and enabling a second one raises `ValueError`
+PROCESS_WIDE_CPROFILE = sys.version_info >= (3, 12)
+
+_current_session = contextvars.ContextVar("profile_session", default=None)
+
+
+def profiler_available(profiler):
+    if profiler == CPROFILE:
+        return True
+    if profiler == PYINSTRUMENT:
+        try:
+            import pyinstrument  # noqa: F401
+        except ImportError:
+            return False
+        return True
+    return False
+
+
+class ProfileSession:
+    """
+    Profile the calling thread, and the threads it starts through `profile_thread`, until exit.
+
+    Args:
+        profiler (str): `cprofile` or `pyinstrument`.
+        name (str): File name of the dump without its extension, e.g. the job ID.
+
+    Attributes:
+        path (pathlib.Path): Where the profile is written, a `.prof` file readable with `pstats`
+            or snakeviz for cProfile and an HTML report for pyinstrument.
+    """
+
+    def __init__(self, profiler, name):
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler: {profiler}")
+        self.profiler = profiler
+        self.path = PROFILE_DIR / f"{name}.{'prof' if profiler == CPROFILE else 'html'}"
+        self._thread_profiles = []
+        self._lock = threading.Lock()
+        self._profile = None
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_session.set(self)
+        if self.profiler == CPROFILE:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            from pyinstrument import Profiler
+            self._profile = Profiler()
+            self._profile.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        _current_session.reset(self._token)
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        if self.profiler == CPROFILE:
+            self._profile.disable()
+            stats = pstats.Stats()
+            with self._lock:
+                profiles = [self._profile] + self._thread_profiles
+            for profile in profiles:
+                # A thread that failed before its profiler ran has no stats, which `pstats` rejects
+                if profile.getstats():
+                    stats.add(profile)
+            stats.dump_stats(self.path)
+        else:
+            self._profile.stop()
+            self.path.write_text(self._profile.output_html(), encoding="utf-8")
+        return False
+
+    def wrap(self, target):
+        if self.profiler != CPROFILE or PROCESS_WIDE_CPROFILE:
+            return target
+
+        def profiled_target(*args, **kwargs):
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(target, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self._thread_profiles.append(profile)
+
+        return profiled_target
+
+
+def profile_thread(target):
+    """Return `target` wrapped to be profiled by the session active in the calling thread, if any."""
+    session = _current_session.get()
+    return target if session is None else session.wrap(target)
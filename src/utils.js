@@ -323,3 +323,74 @@ export function phoneticSimilarity(code1, code2) {
 
     return score / longer.length;  // Return the percentage of similarity
 }
+
+// Decode a graph asset written by src/generator/binary_graph.py into { nodes, links }.
+// String and JSON columns index into the interned string table, numbers are float64 or int64 values
+// and links are int32 node positions.
+// Optional columns start with a presence bitmap, and nodes without the field are left without it.
+export function decodeBinaryGraph(buffer) {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== 'CVGB') {
+        throw new Error('Not a binary graph file');
+    }
+    const [version, stringCount, nodeCount, linkCount, columnCount] =
+        [4, 8, 12, 16, 20].map(offset => view.getUint32(offset, true));
+    if (version !== 3) {
+        throw new Error(`Unsupported binary graph version: ${version}`);
+    }
+
+    const align = position => position + (-position & 7);
+    let position = 24;
+    const columns = [];
+    for (let i = 0; i < columnCount; i++) {
+        columns.push([0, 4, 8].map(offset => view.getUint32(position + offset, true)));
+        position += 12;
+    }
+    position = align(position);
+
+    const offsets = new Uint32Array(buffer, position, stringCount + 1);
+    position += offsets.byteLength;
+    const decoder = new TextDecoder();
+    const blob = new Uint8Array(buffer, position, offsets[stringCount]);
+    const strings = new Array(stringCount);
+    for (let i = 0; i < stringCount; i++) {
+        strings[i] = decoder.decode(blob.subarray(offsets[i], offsets[i + 1]));
+    }
+    position = align(position + blob.byteLength);
+
+    const nodes = Array.from({ length: nodeCount }, () => ({}));
+    columns.forEach(([nameIndex, columnType, optional]) => {
+        const name = strings[nameIndex];
+        let present = () => true;
+        if (optional) {
+            const bitmap = new Uint8Array(buffer, position, (nodeCount + 7) >> 3);
+            present = i => (bitmap[i >> 3] >> (i & 7)) & 1;
+            position = align(position + bitmap.byteLength);
+        }
+        if (columnType === 1) {
+            const values = new Float64Array(buffer, position, nodeCount);
+            nodes.forEach((node, i) => { if (present(i)) node[name] = values[i]; });
+            position += values.byteLength;
+        } else if (columnType === 2) {
+            const values = new BigInt64Array(buffer, position, nodeCount);
+            nodes.forEach((node, i) => { if (present(i)) node[name] = Number(values[i]); });
+            position += values.byteLength;
+        } else {
+            const values = new Uint32Array(buffer, position, nodeCount);
+            const decode = columnType === 3 ? index => JSON.parse(strings[index]) : index => strings[index];
+            nodes.forEach((node, i) => { if (present(i)) node[name] = decode(values[i]); });
+            position += values.byteLength;
+        }
+        position = align(position);
+    });
+
+    const sources = new Int32Array(buffer, position, linkCount);
+    position = align(position + sources.byteLength);
+    const targets = new Int32Array(buffer, position, linkCount);
+    const links = new Array(linkCount);
+    for (let i = 0; i < linkCount; i++) {
+        links[i] = { source: nodes[sources[i]].id, target: nodes[targets[i]].id };
+    }
+    return { nodes, links };
+}
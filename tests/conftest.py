@@ -0,0 +1,46 @@
+import sys
+import pathlib
+import subprocess
+
+import pytest
+
+ROOT = pathlib.Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(scope="session")
+def languages():
+    """The tree-sitter languages, loaded from the `languages.so` at the repository root."""
+    pytest.importorskip("tree_sitter")
+    library = ROOT / "languages.so"
+    if not library.exists():
+        pytest.skip("languages.so is not built")
+
+    from src.parser import parsers
+    from src.parser.process import load_languages
+
+    # The default name is only found through the library search path
+    parsers.LANGUAGE_LIBRARY = str(library)
+    return load_languages()
+
+
+@pytest.fixture
+def git():
+    """Run `git -C <repo> <args>` with a test identity, failing the test on a non-zero exit."""
+
+    def run(repo, *args):
+        subprocess.run(
+            ["git", "-C", str(repo), "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+            check=True, capture_output=True
+        )
+
+    return run
+
+
+@pytest.fixture
+def client():
+    """A test client of the Flask app in `codeview.py`."""
+    pytest.importorskip("flask")
+    import codeview
+
+    return codeview.app.test_client()
@@ -0,0 +1,25 @@
+package com.example.store;
+
+import java.util.ArrayList;
+import java.util.List;
+import com.example.store.model.Item;
+
+public class Inventory {
+    private final List<Item> items = new ArrayList<>();
+    private int capacity;
+
+    @Override
+    public String toString() {
+        return "Inventory(" + items.size() + ")";
+    }
+
+    public boolean add(Item item, int count) {
+        if (items.size() + count > capacity) {
+            return false;
+        }
+        items.add(item);
+        return true;
+    }
+
+    public abstract int remaining();
+}
@@ -0,0 +1,23 @@
+package com.example.store
+
+import com.example.store.model.Item
+import kotlinx.coroutines.flow.Flow
+
+data class Entry(val id: Int, val name: String?)
+
+interface Repository {
+    fun find(id: Int): Entry?
+}
+
+class MemoryRepository : Repository {
+    val entries = mutableMapOf<Int, Entry>()
+
+    @Synchronized
+    override fun find(id: Int): Entry? {
+        return entries[id]
+    }
+
+    fun add(entry: Entry) {
+        entries[entry.id] = entry
+    }
+}
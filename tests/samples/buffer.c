@@ -0,0 +1,22 @@
+#include <stdlib.h>
+#include "buffer.h"
+
+int buffer_count = 0;
+
+struct buffer {
+    char *data;
+    size_t size;
+};
+
+struct buffer *buffer_new(size_t size) {
+    struct buffer *b = malloc(sizeof(struct buffer));
+    b->data = malloc(size);
+    b->size = size;
+    buffer_count++;
+    return b;
+}
+
+void buffer_free(struct buffer *b) {
+    free(b->data);
+    free(b);
+}
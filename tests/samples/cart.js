@@ -0,0 +1,22 @@
+import { formatPrice } from './format';
+import Item from './item';
+
+export const TAX_RATE = 0.2;
+
+export class Cart {
+  constructor() {
+    this.items = [];
+  }
+
+  add(item) {
+    this.items.push(item);
+  }
+}
+
+function total(items, rate) {
+  return items.reduce((sum, item) => sum + item.price, 0) * (1 + rate);
+}
+
+export default function render(cart) {
+  return formatPrice(total(cart.items, TAX_RATE));
+}
@@ -0,0 +1,25 @@
+#include <vector>
+#include "matrix.h"
+
+namespace linalg {
+
+class Matrix {
+public:
+    int rows;
+    int cols;
+    std::vector<double> values;
+
+    double at(int row, int col) const {
+        return values[row * cols + col];
+    }
+};
+
+int trace(const Matrix& m) {
+    int sum = 0;
+    for (int i = 0; i < m.rows; i++) {
+        sum += m.at(i, i);
+    }
+    return sum;
+}
+
+}
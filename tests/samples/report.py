@@ -0,0 +1,17 @@
+import os
+from collections import Counter
+
+DEFAULT_LIMIT = 10
+
+
+class Report:
+    def __init__(self, words):
+        self.counts = Counter(words)
+
+    def top(self, limit=DEFAULT_LIMIT):
+        return self.counts.most_common(limit)
+
+
+def load(path):
+    with open(path) as f:
+        return Report(f.read().split())
@@ -0,0 +1,18 @@
+package server
+
+import (
+	"fmt"
+	"net/http"
+)
+
+type Handler struct {
+	name string
+}
+
+func (h *Handler) ServeHTTP(w http.ResponseWriter, r *http.Request) {
+	fmt.Fprintf(w, "hello %s", h.name)
+}
+
+func NewHandler(name string) *Handler {
+	return &Handler{name: name}
+}
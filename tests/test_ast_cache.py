@@ -0,0 +1,79 @@
+import os
+
+from src.parser import ast_cache
+from src.parser.TreeNode import FunctionNode, TreeNode
+from src.parser.ast_cache import ParseCache
+
+
+def node_tree(name):
+    return TreeNode(
+        file_path=f"repos/a/src/{name}.java", class_names=[name], imports="import java.util.List;",
+        functions=[FunctionNode("run", [], "void", "{ return; }", class_names=[name])]
+    )
+
+
+def test_hit_returns_the_tree_under_the_new_file_path(tmp_path):
+    cache = ParseCache("grammar-1", cache_dir=tmp_path)
+    cache.put("java", "hash-a", node_tree("Main"))
+
+    found = cache.get("java", "hash-a", "repos/b/src/Main.java")
+
+    expected = node_tree("Main").to_dict()
+    expected["file_path"] = "repos/b/src/Main.java"
+    assert found.to_dict() == expected
+    assert cache.stats() == {"hits": 1, "misses": 0, "evictions": 0}
+
+
+def test_miss_on_other_contents_or_language(tmp_path):
+    cache = ParseCache("grammar-1", cache_dir=tmp_path)
+    cache.put("java", "hash-a", node_tree("Main"))
+
+    assert cache.get("java", "hash-b", "Main.java") is None
+    assert cache.get("kotlin", "hash-a", "Main.kt") is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_grammar_or_cache_version_change_invalidates_entries(tmp_path, monkeypatch):
+    ParseCache("grammar-1", cache_dir=tmp_path).put("java", "hash-a", node_tree("Main"))
+
+    assert ParseCache("grammar-2", cache_dir=tmp_path).get("java", "hash-a", "Main.java") is None
+    assert ParseCache("grammar-1", cache_dir=tmp_path).get("java", "hash-a", "Main.java") is not None
+    monkeypatch.setattr(ast_cache, "CACHE_VERSION", ast_cache.CACHE_VERSION + 1)
+    assert ParseCache("grammar-1", cache_dir=tmp_path).get("java", "hash-a", "Main.java") is None
+
+
+def test_grammar_version_follows_the_library_contents(tmp_path):
+    library = tmp_path / "languages.so"
+    library.write_bytes(b"grammar")
+    before = ast_cache.grammar_version(library)
+    library.write_bytes(b"rebuilt grammar")
+
+    assert ast_cache.grammar_version(library) != before
+
+
+def test_evict_removes_the_least_recently_used_entries(tmp_path):
+    cache = ParseCache("grammar-1", cache_dir=tmp_path)
+    names = ["First", "Second", "Third"]
+    for age, name in enumerate(names):
+        cache.put("java", name, node_tree(name))
+        # Written one minute apart, oldest first
+        path = cache._entry_path("java", name)
+        os.utime(path, (1_000_000 + 60 * age, 1_000_000 + 60 * age))
+    entry_size = max(cache._entry_path("java", name).stat().st_size for name in names)
+
+    # Reading the oldest entry makes it the most recently used
+    assert cache.get("java", "First", "First.java") is not None
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+
+    assert cache.evictions == 1
+    assert [name for name in names if cache._entry_path("java", name).exists()] == ["First", "Third"]
+
+
+def test_evict_keeps_a_cache_under_its_cap(tmp_path):
+    cache = ParseCache("grammar-1", cache_dir=tmp_path)
+    cache.put("java", "hash-a", node_tree("Main"))
+
+    cache.evict()
+
+    assert cache.evictions == 0 and cache.get("java", "hash-a", "Main.java") is not None
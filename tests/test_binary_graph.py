@@ -0,0 +1,43 @@
+from src.generator.binary_graph import decode_graph, encode_graph
+
+
+def test_round_trip_keeps_absent_fields_absent():
+    graph = {
+        "nodes": [
+            {"id": "a/Main.java", "package": "a", "fx": 1.5, "fy": -2, "fz": 0},
+            {"id": "a/Util.java", "package": "a"},
+            {"id": "b/app.js", "user": "b", "fx": 3, "fy": 4, "fz": 5.25},
+        ],
+        "links": [{"source": "a/Main.java", "target": "a/Util.java"}, {"source": "b/app.js", "target": "a/Main.java"}],
+    }
+
+    assert decode_graph(encode_graph(graph)) == graph
+
+
+def test_round_trip_nodes_past_one_bitmap_byte():
+    nodes = [{"id": f"n{index}", **({"fx": index} if index % 3 else {})} for index in range(20)]
+    graph = {"nodes": nodes, "links": []}
+
+    decoded = decode_graph(encode_graph(graph))
+
+    assert decoded == graph
+    assert [node.get("fx") for node in decoded["nodes"]][:4] == [None, 1, 2, None]
+
+
+def test_round_trip_keeps_value_types():
+    graph = {
+        "nodes": [
+            {"id": "a", "size": 2.0, "count": 3, "big": 1 << 60, "mixed": 1, "flags": True, "tags": ["x", "y"]},
+            {"id": "b", "size": 0.5, "count": -1, "big": 0, "mixed": "one", "flags": False, "tags": None},
+            {"id": "c", "size": 1e300, "count": 0, "big": 7, "mixed": 2.5, "flags": None, "tags": {"k": 1}},
+        ],
+        "links": [],
+    }
+
+    decoded = decode_graph(encode_graph(graph))
+
+    assert decoded == graph
+    for node, decoded_node in zip(graph["nodes"], decoded["nodes"]):
+        assert {key: type(value) for key, value in decoded_node.items()} == {
+            key: type(value) for key, value in node.items()
+        }
@@ -0,0 +1,81 @@
+import shutil
+import subprocess
+
+import pytest
+
+from src import clone
+from src.clone import CLONED, EXISTS, FAILED, clone_repositories, sparse_checkout_patterns
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+@pytest.fixture
+def bare_url(tmp_path, git):
+    work = tmp_path / "work"
+    work.mkdir()
+    git(work, "init", "-q")
+    for name in ("Main.java", "README.md", "notes.txt"):
+        (work / name).write_text(f"{name}\n")
+    git(work, "add", ".")
+    git(work, "commit", "-q", "-m", "initial")
+    bare = tmp_path / "service.git"
+    subprocess.run(["git", "clone", "-q", "--bare", str(work), str(bare)], check=True, capture_output=True)
+    return f"file://{bare}"
+
+
+def test_clone_local_bare_repository(tmp_path, bare_url):
+    base_path = tmp_path / "repos"
+
+    results = list(clone_repositories([bare_url, f"{bare_url} "], str(base_path)))
+
+    assert sorted(result["status"] for result in results) == [CLONED, EXISTS]
+    assert all(result["path"] == str(base_path / "service") for result in results)
+    assert (base_path / "service" / "Main.java").read_text() == "Main.java\n"
+
+    # A second run finds the clone in place
+    assert [result["status"] for result in clone_repositories([bare_url], str(base_path))] == [EXISTS]
+
+
+def test_clone_sparse_checkout(tmp_path, bare_url):
+    base_path = tmp_path / "repos"
+
+    [result] = clone_repositories([bare_url], str(base_path), sparse_patterns=sparse_checkout_patterns([".java"]))
+
+    assert result["status"] == CLONED
+    assert sorted(path.name for path in (base_path / "service").iterdir() if path.name != ".git") == [
+        "Main.java", "README.md"
+    ]
+
+
+def test_clone_failure_leaves_no_partial_clone(tmp_path):
+    base_path = tmp_path / "repos"
+
+    [result] = clone_repositories([f"file://{tmp_path / 'missing.git'}"], str(base_path))
+
+    assert result["status"] == FAILED
+    assert result["error"]
+    assert not (base_path / "missing").exists()
+
+
+@pytest.mark.parametrize("sparse_patterns", [None, ["*.java"]])
+def test_clone_url_is_not_read_as_an_option(tmp_path, monkeypatch, sparse_patterns):
+    commands = []
+
+    def run(command, **kwargs):
+        commands.append(command)
+        return subprocess.CompletedProcess(command, 128, "", "fatal: not a repository")
+
+    monkeypatch.setattr(clone.subprocess, "run", run)
+    url = f"--upload-pack=touch {tmp_path / 'executed'}"
+
+    [result] = clone.clone_repositories([url], str(tmp_path / "repos"), sparse_patterns=sparse_patterns)
+
+    assert result["status"] == FAILED
+    [command] = commands
+    assert command[command.index(url) - 1] == "--"
+
+
+def test_clone_and_process_rejects_option_urls(client):
+    response = client.post("/clone_and_process", json={"repo_urls": ["https://example.com/a.git", "--upload-pack=id"]})
+
+    assert response.status_code == 400
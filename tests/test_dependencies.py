@@ -0,0 +1,112 @@
+import pytest
+
+from src.parser.TreeNode import TreeNode
+from src.parser.process import parse_file
+from src.parser.dependencies import (
+    StreamingLinker, compare_with_legacy, legacy_resolve_dependencies, resolve_dependencies
+)
+
+SOURCES = {
+    "util/Strings.java": """package com.acme.util;
+
+public class Strings {
+    public static String trim(String value) {
+        return value.trim();
+    }
+}
+""",
+    "util/Numbers.java": """package com.acme.util;
+
+public class Numbers {
+    public static int parse(String value) {
+        return Integer.parseInt(value);
+    }
+}
+""",
+    # Package-qualified, static and self imports
+    "app/App.java": """package com.acme.app;
+
+import com.acme.util.Strings;
+import static com.acme.util.Numbers.parse;
+import com.acme.app.App;
+
+public class App {
+    public static void main(String[] args) {
+        System.out.println(Strings.trim(args[0]) + parse(args[1]));
+    }
+}
+""",
+    "app/Wildcard.java": """package com.acme.app;
+
+import com.acme.util.*;
+
+public class Wildcard {
+    public void run() {
+        new Strings();
+    }
+}
+""",
+    "kt/Report.kt": """package com.acme.kt
+
+import com.acme.util.Numbers
+import com.acme.app.*
+
+class Report {
+    fun render(value: String): Int {
+        return Numbers.parse(value)
+    }
+}
+""",
+}
+LANGUAGE_NAMES = {".java": "java", ".kt": "kotlin"}
+
+
+@pytest.fixture
+def file_trees(tmp_path, languages):
+    source_dir = tmp_path / "repos" / "shop" / "src" / "com" / "acme"
+    trees = {}
+    for name, source in sorted(SOURCES.items()):
+        path = source_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source)
+        trees[str(path)] = parse_file(str(path), languages[LANGUAGE_NAMES[path.suffix]])
+    return trees
+
+
+def short_links(links):
+    return [(link["source"].split("/acme/")[1], link["target"].split("/acme/")[1]) for link in links]
+
+
+def test_links_match_the_legacy_matcher(file_trees):
+    dependencies, links = resolve_dependencies(file_trees)
+    legacy_dependencies, legacy_links = legacy_resolve_dependencies(file_trees)
+
+    assert links == legacy_links
+    assert {path: sorted(importers) for path, importers in dependencies.items()} == {
+        path: sorted(importers) for path, importers in legacy_dependencies.items()
+    }
+    assert compare_with_legacy(file_trees, links) == {"missing": [], "extra": []}
+    # Wildcard imports name no symbol path and a file importing itself is not linked to itself
+    assert short_links(links) == [
+        ("app/App.java", "util/Numbers.java"), ("kt/Report.kt", "util/Numbers.java"), ("app/App.java", "util/Strings.java")
+    ]
+
+
+def test_streaming_linker_is_independent_of_arrival_order(file_trees):
+    linker = StreamingLinker()
+    for file_path in reversed(list(file_trees)):
+        linker.add(file_path, file_trees[file_path])
+
+    assert linker.finish(file_trees)[1] == resolve_dependencies(file_trees)[1]
+
+
+def test_compare_with_legacy_reports_substring_only_matches():
+    file_trees = {
+        "Util.java": TreeNode(file_path="Util.java", package_import_paths={"acme.Util": "acme.Util"}, imports="import java.util.List;"),
+        "Main.java": TreeNode(file_path="Main.java", imports="import acme.UtilHelper;"),
+    }
+
+    _, links = resolve_dependencies(file_trees)
+
+    assert links == []
+    assert compare_with_legacy(file_trees, links) == {"missing": [("Main.java", "Util.java")], "extra": []}
@@ -0,0 +1,48 @@
+from src.generator.dillude import build_root_level_graph, partition_user_graphs
+
+GRAPH = {
+    "nodes": [
+        {"id": "repos/b/src/Main.java", "user": "b", "fileSize": 100},
+        {"id": "repos/a/src/App.java", "user": "a", "fileSize": 10},
+        {"id": "repos/a/src/Util.java", "user": "a", "fileSize": 20},
+        {"id": "repos/b/src/Helper.java", "user": "b", "fileSize": 5},
+        {"id": "repos/c/src/Lonely.java", "user": "c", "fileSize": 1},
+    ],
+    "links": [
+        {"source": "repos/a/src/App.java", "target": "repos/a/src/Util.java"},
+        {"source": "repos/b/src/Main.java", "target": "repos/a/src/Util.java"},
+        {"source": "repos/b/src/Helper.java", "target": "repos/b/src/Main.java"},
+        {"source": "repos/b/src/Main.java", "target": "repos/a/src/App.java"},
+        {"source": "repos/a/src/App.java", "target": "repos/b/src/Helper.java"},
+        # A link to a file outside the graph is dropped
+        {"source": "repos/a/src/App.java", "target": "repos/z/src/Gone.java"},
+    ],
+}
+
+
+def test_partition_keeps_each_users_nodes_and_internal_links_in_order():
+    graphs = partition_user_graphs(GRAPH)
+
+    assert list(graphs) == ["b", "a", "c"]
+    assert graphs["a"] == {
+        "nodes": [GRAPH["nodes"][1], GRAPH["nodes"][2]],
+        "links": [GRAPH["links"][0]],
+    }
+    assert graphs["b"] == {
+        "nodes": [GRAPH["nodes"][0], GRAPH["nodes"][3]],
+        "links": [GRAPH["links"][2]],
+    }
+    assert graphs["c"] == {"nodes": [GRAPH["nodes"][4]], "links": []}
+
+
+def test_root_level_graph_aggregates_users_and_deduplicates_links():
+    graph = build_root_level_graph({**GRAPH, "links": GRAPH["links"][:5]})
+
+    assert graph == {
+        "nodes": [
+            {"id": "b", "description": "b", "fileSize": 105, "fileCount": 2},
+            {"id": "a", "description": "a", "fileSize": 30, "fileCount": 2},
+            {"id": "c", "description": "c", "fileSize": 1, "fileCount": 1},
+        ],
+        "links": [{"source": "b", "target": "a"}, {"source": "a", "target": "b"}],
+    }
@@ -0,0 +1,46 @@
+import pytest
+
+from src.generator.graph_views import FILE, GraphViews
+
+GRAPH = {
+    "nodes": [
+        {"id": f"repos/{user}/src/{name}", "user": user, "package": f"repos/{user}/src", "fileSize": 10}
+        for user, name in [("a", "A.java"), ("a", "B.java"), ("a", "C.java"), ("b", "d.js"), ("b", "e.js")]
+    ],
+    "links": [
+        {"source": "repos/a/src/A.java", "target": "repos/a/src/B.java"},
+        {"source": "repos/a/src/B.java", "target": "repos/a/src/C.java"},
+        {"source": "repos/b/src/d.js", "target": "repos/a/src/A.java"},
+    ],
+}
+
+
+def test_view_pages_through_the_level():
+    views = GraphViews(GRAPH)
+
+    first = views.view(FILE, limit=2)
+    second = views.view(FILE, limit=2, offset=first["next_offset"])
+    last = views.view(FILE, limit=2, offset=second["next_offset"])
+
+    ids = [node["id"] for page in (first, second, last) for node in page["nodes"]]
+    assert sorted(ids) == sorted(node["id"] for node in GRAPH["nodes"])
+    assert last["next_offset"] is None
+
+
+def test_view_around_a_focus():
+    view = GraphViews(GRAPH).view(FILE, focus="repos/a/src/B.java", hops=1)
+
+    assert {node["id"]: node["hops"] for node in view["nodes"]} == {
+        "repos/a/src/B.java": 0, "repos/a/src/A.java": 1, "repos/a/src/C.java": 1
+    }
+
+
+@pytest.mark.parametrize("arguments", [{"limit": 0}, {"limit": -1}, {"hops": -1}, {"offset": -1}])
+def test_view_rejects_out_of_range_arguments(arguments):
+    with pytest.raises(ValueError):
+        GraphViews(GRAPH).view(FILE, focus="repos/a/src/A.java", **arguments)
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=-1", "hops=-1"])
+def test_graph_endpoint_rejects_out_of_range_arguments(client, query):
+    assert client.get(f"/graph?level=file&{query}").status_code == 400
@@ -0,0 +1,30 @@
+import shutil
+
+import pytest
+
+from src.generator.impact import changed_files
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+@pytest.fixture
+def repo(tmp_path, git):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git(repo, "init", "-q")
+    for name in ("a.py", "b.py"):
+        (repo / name).write_text(f"{name}\n")
+        git(repo, "add", name)
+        git(repo, "commit", "-q", "-m", name)
+    return repo
+
+
+def test_changed_files_of_a_range(repo):
+    assert changed_files(str(repo), "HEAD~1..HEAD") == [str(repo / "b.py")]
+
+
+@pytest.mark.parametrize("diff_range", ["--output=written.txt", "-p", "", None])
+def test_changed_files_rejects_options(repo, diff_range):
+    with pytest.raises(ValueError):
+        changed_files(str(repo), diff_range)
+    assert not (repo / "written.txt").exists()
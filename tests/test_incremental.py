@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from conftest import ROOT
+from src.parser import dependencies, manifest
+from src.parser.TreeNode import TreeNode
+from src.parser.dependencies import INCREMENTAL_CHANGE_RATIO, resolve_dependencies, update_dependencies
+
+FILE_COUNT = 40
+
+# Indexes `repos` of a copy of the package, then applies the edits of `edits.json` and indexes it
+# again incrementally and from scratch, saving each `full_graph.json` and how the links of the
+# incremental run were resolved.
+INDEX_SCRIPT = """
+import json, pathlib, shutil, sys
+from src.parser import dependencies, parsers, process
+
+parsers.LANGUAGE_LIBRARY = str(pathlib.Path("languages.so").absolute())
+calls = []
+for module, name in [(process, "update_dependencies"), (dependencies, "resolve_dependencies")]:
+    function = getattr(module, name)
+    setattr(module, name, lambda *args, name=name, function=function: calls.append(name) or function(*args))
+
+def index(name, **kwargs):
+    process.process_modules("repos", **kwargs)
+    shutil.copy("assets/full_graph.json", name)
+
+index("initial.json")
+for path, source in json.loads(pathlib.Path("edits.json").read_text()).items():
+    if source is None:
+        pathlib.Path(path).unlink()
+    else:
+        pathlib.Path(path).write_text(source)
+calls.clear()
+index("incremental.json")
+pathlib.Path("calls.json").write_text(json.dumps(calls))
+index("rebuild.json", full_rebuild=True)
+"""
+
+
+def util_source(index, body="return value;"):
+    return f"""package com.acme.util;
+
+public class Util{index} {{
+    public static int apply{index}(int value) {{
+        {body}
+    }}
+}}
+"""
+
+
+def app_source(index, imports):
+    lines = "".join(f"import com.acme.util.Util{target};\n" for target in imports)
+    return f"""package com.acme.app;
+
+{lines}
+public class App{index} {{
+    public void run() {{
+    }}
+}}
+"""
+
+
+def strip_positions(graph):
+    return {
+        "links": graph["links"],
+        "nodes": [{key: value for key, value in node.items() if key not in ("fx", "fy", "fz")} for node in graph["nodes"]],
+    }
+
+
+@pytest.fixture
+def package(tmp_path, languages):
+    package = tmp_path / "package"
+    shutil.copytree(ROOT / "src", package / "src", ignore=shutil.ignore_patterns("__pycache__"))
+    shutil.copy(ROOT / "languages.so", package)
+    (package / "assets" / "files").mkdir(parents=True)
+    source_dir = package / "repos" / "shop" / "src" / "com" / "acme"
+    (source_dir / "util").mkdir(parents=True)
+    (source_dir / "app").mkdir()
+    for index in range(FILE_COUNT // 2):
+        (source_dir / "util" / f"Util{index}.java").write_text(util_source(index))
+        (source_dir / "app" / f"App{index}.java").write_text(app_source(index, [index, (index + 1) % (FILE_COUNT // 2)]))
+    return package
+
+
+def test_incremental_index_matches_a_full_rebuild(package):
+    source_dir = "repos/shop/src/com/acme"
+    edits = {
+        # Added: a new utility and an importer of it
+        f"{source_dir}/util/UtilNew.java": util_source("New"),
+        f"{source_dir}/app/App0.java": app_source(0, [0, "New"]),
+        # Edited without changing its symbols, and deleted along with the links to it
+        f"{source_dir}/util/Util3.java": util_source(3, "return value * 2;"),
+        f"{source_dir}/util/Util5.java": None,
+    }
+    (package / "edits.json").write_text(json.dumps(edits))
+
+    subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", INDEX_SCRIPT], cwd=package, check=True, capture_output=True,
+        env={**os.environ, "PYTHONPATH": str(package)}
+    )
+
+    initial, incremental, rebuild = (
+        json.loads((package / name).read_text()) for name in ("initial.json", "incremental.json", "rebuild.json")
+    )
+    # 4 of 40 files changed, within the ratio resolved incrementally
+    assert json.loads((package / "calls.json").read_text()) == ["update_dependencies"]
+    assert strip_positions(incremental) == strip_positions(rebuild)
+    assert incremental["links"] != initial["links"]
+    targets = {link["target"].rsplit("/", 1)[1] for link in incremental["links"]}
+    assert "UtilNew.java" in targets and "Util5.java" not in targets
+
+
+def trees(count):
+    return {
+        f"Util{index}.java": TreeNode(
+            file_path=f"Util{index}.java",
+            package_import_paths={f"acme.Util{index}": f"acme.Util{index}"},
+            imports=f"import acme.Util{(index + 1) % count};",
+        )
+        for index in range(count)
+    }
+
+
+@pytest.mark.parametrize("changed_count, full", [(2, False), (3, True)])
+def test_update_falls_back_to_a_full_resolve_past_the_change_ratio(monkeypatch, changed_count, full):
+    file_trees = trees(2 * INCREMENTAL_CHANGE_RATIO)
+    _, links = resolve_dependencies(file_trees)
+    resolves = []
+    monkeypatch.setattr(dependencies, "resolve_dependencies", lambda trees: resolves.append(trees) or ([], []))
+
+    update_dependencies(file_trees, links, set(list(file_trees)[:changed_count]))
+
+    assert bool(resolves) == full
+
+
+def test_update_matches_a_full_resolve():
+    file_trees = trees(2 * INCREMENTAL_CHANGE_RATIO)
+    _, previous_links = resolve_dependencies(file_trees)
+    del file_trees["Util4.java"]
+    file_trees["Util7.java"].imports = "import acme.Util1;"
+
+    _, links = update_dependencies(file_trees, previous_links, {"Util4.java", "Util7.java"})
+
+    assert links == resolve_dependencies(file_trees)[1]
+
+
+def test_fingerprint_trusts_mtime_and_size_then_compares_hashes(tmp_path, monkeypatch):
+    path = tmp_path / "Main.java"
+    path.write_text("class Main {}")
+    entry, unchanged = manifest.fingerprint_file(str(path))
+    assert not unchanged
+
+    hashed = []
+    hash_file = manifest.hash_file
+    monkeypatch.setattr(manifest, "hash_file", lambda file_path: hashed.append(file_path) or hash_file(file_path))
+
+    assert manifest.fingerprint_file(str(path), entry) == (entry, True)
+    assert hashed == []
+
+    # Touched with the same contents: hashed again and found unchanged
+    os.utime(path, (entry["mtime"] + 10, entry["mtime"] + 10))
+    touched, unchanged = manifest.fingerprint_file(str(path), entry)
+    assert unchanged and touched["hash"] == entry["hash"] and len(hashed) == 1
+
+    # Edited: the size differs, so it is hashed and found changed
+    path.write_text("class Main { int x; }")
+    edited, unchanged = manifest.fingerprint_file(str(path), touched)
+    assert not unchanged and edited["hash"] != entry["hash"]
+
+
+def test_manifest_is_dropped_when_stale(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest, "INDEX_DIR", tmp_path)
+    monkeypatch.setattr(manifest, "MANIFEST_PATH", tmp_path / "file_manifest.json")
+    entries = {"repos/a/Main.java": {"path": "repos/a/Main.java", "mtime": 1.0, "size": 2, "hash": "ab"}}
+
+    manifest.save_manifest("repos", entries)
+    assert manifest.load_manifest("repos") == entries
+    assert manifest.load_manifest("other") == {}
+
+    monkeypatch.setattr(manifest, "MANIFEST_VERSION", manifest.MANIFEST_VERSION + 1)
+    assert manifest.load_manifest("repos") == {}
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from src.jobs import DONE, FAILED, JobManager
+
+
+def finished(job):
+    while not job.finished:
+        job.wait_for_update(job._version, 1)
+    return job.to_dict()
+
+
+def test_submit_deduplicates_queued_and_running_jobs():
+    manager = JobManager()
+    release = threading.Event()
+    job, created = manager.submit("local", "/repos", lambda report: release.wait(5) and {"files": 1})
+
+    duplicate, duplicate_created = manager.submit("local", "/repos", lambda report: {"files": 2})
+    other, other_created = manager.submit("local", "/other", lambda report: {"files": 3})
+    release.set()
+
+    assert (created, duplicate_created, other_created) == (True, False, True)
+    assert duplicate is job
+    assert finished(job)["result"] == {"files": 1}
+    assert finished(other)["result"] == {"files": 3}
+    # Once the job finished its key is free again
+    again, again_created = manager.submit("local", "/repos", lambda report: None)
+    assert again_created and again is not job
+    assert {listed.id for listed in manager.list()} == {job.id, other.id, again.id}
+    finished(again)
+
+
+def test_report_records_stages_and_progress():
+    def run(report):
+        report("parse", files_discovered=2, files_parsed=0)
+        report(files_parsed=2)
+        report("write")
+        return "ok"
+
+    status = finished(JobManager().submit("local", "/repos", run)[0])
+
+    assert status["state"] == DONE and status["result"] == "ok" and status["stage"] is None
+    assert status["progress"] == {"files_discovered": 2, "files_parsed": 2}
+    assert list(status["stage_timings"]) == ["parse", "write"]
+
+
+def test_failed_job_keeps_its_error():
+    def run(report):
+        raise RuntimeError("disk full")
+
+    status = finished(JobManager().submit("local", "/repos", run)[0])
+
+    assert status["state"] == FAILED and status["error"] == "disk full"
+
+
+def test_wait_for_update_wakes_on_report_and_times_out():
+    manager = JobManager()
+    reported = threading.Event()
+    release = threading.Event()
+
+    def run(report):
+        reported.wait(5)
+        report("parse")
+        release.wait(5)
+
+    job, _ = manager.submit("local", "/repos", run)
+    version = job.wait_for_update(None, 5)
+    while job.state != "running":
+        version = job.wait_for_update(version, 1)
+
+    # Nothing changes until the job reports
+    assert job.wait_for_update(version, 0.05) == version
+    reported.set()
+    assert job.wait_for_update(version, 5) != version
+    assert job.stage == "parse"
+    release.set()
+    finished(job)
+
+
+@pytest.mark.parametrize("route", ["/process/local", "/clone_and_process"])
+@pytest.mark.parametrize("field, value", [
+    ("workers", "many"), ("workers", 0), ("workers", -2), ("workers", None), ("io_workers", 0), ("workers", True)
+])
+def test_endpoints_reject_invalid_worker_counts(client, route, field, value):
+    data = {"path": "./missing", "repo_urls": ["https://example.com/a.git"], field: value}
+
+    response = client.post(route, json=data)
+
+    assert response.status_code == 400
+    assert field in response.json["error"]
+
+
+def test_clone_and_process_rejects_invalid_clone_workers(client):
+    response = client.post("/clone_and_process", json={"repo_urls": ["https://example.com/a.git"], "clone_workers": 0})
+
+    assert response.status_code == 400
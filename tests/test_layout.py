@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.generator.layout import EXACT_REPULSION_MAX_NODES, layout_graph
+
+
+def random_graph(count, seed=0):
+    rng = random.Random(seed)
+    nodes = [{"id": f"repos/a/src/File{index}.java"} for index in range(count)]
+    links = [
+        {"source": nodes[rng.randrange(count)]["id"], "target": nodes[rng.randrange(count)]["id"]}
+        for _ in range(2 * count)
+    ]
+    return {"nodes": nodes, "links": links}
+
+
+def distance(positions, first, second):
+    return float(np.linalg.norm(np.subtract(positions[first], positions[second])))
+
+
+@pytest.mark.parametrize("count", [200, 2 * EXACT_REPULSION_MAX_NODES])
+def test_update_only_moves_the_changed_nodes_and_their_neighbours(count):
+    graph = random_graph(count)
+    previous = layout_graph(graph)
+    source, target = graph["nodes"][1]["id"], graph["nodes"][count - 2]["id"]
+    graph["links"].append({"source": source, "target": target})
+    affected = {source, target} | {
+        link[end] for link in graph["links"] for end in ("source", "target")
+        if source in (link["source"], link["target"]) or target in (link["source"], link["target"])
+    }
+
+    updated = layout_graph(graph, previous)
+
+    moved = {node_id for node_id, position in updated["positions"].items() if position != previous["positions"][node_id]}
+    assert moved and moved <= affected
+    assert distance(updated["positions"], source, target) < distance(previous["positions"], source, target)
+
+
+def test_unchanged_graph_keeps_its_layout():
+    graph = random_graph(100)
+    previous = layout_graph(graph)
+
+    assert layout_graph(graph, previous) == previous
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from src.parser.pipeline import Pipeline
+
+
+def read_task(task):
+    # Odd tasks are "cached" and skip the parse stage
+    return (task, None) if task % 2 == 0 else (None, -task)
+
+
+def read_every_task(task):
+    return task, None
+
+
+def square(payload):
+    return payload * payload
+
+
+def fail_on_seven(payload):
+    if payload == 7:
+        raise ValueError("cannot parse 7")
+    return payload
+
+
+def read_failing(task):
+    raise OSError(f"cannot read {task}")
+
+
+@pytest.mark.parametrize("cpu_workers", [1, 2])
+def test_run_pairs_every_task_with_its_result(cpu_workers):
+    pipeline = Pipeline(read_task, square, io_workers=3, cpu_workers=cpu_workers, queue_size=4)
+
+    results = list(pipeline.run(range(50)))
+
+    assert sorted(results) == sorted((task, task * task if task % 2 == 0 else -task) for task in range(50))
+    metrics = pipeline.metrics()
+    assert metrics["parse"]["processed"] == 25 and metrics["consume"]["processed"] == 50
+
+
+def test_single_workers_keep_task_order():
+    pipeline = Pipeline(read_every_task, square, io_workers=1, cpu_workers=1, queue_size=2)
+
+    assert [task for task, _ in pipeline.run(range(30))] == list(range(30))
+
+
+@pytest.mark.parametrize("cpu_workers", [1, 2])
+def test_parse_error_is_raised_to_the_consumer(cpu_workers):
+    pipeline = Pipeline(read_every_task, fail_on_seven, io_workers=2, cpu_workers=cpu_workers, queue_size=2)
+
+    with pytest.raises(ValueError, match="cannot parse 7"):
+        list(pipeline.run(range(20)))
+
+
+def test_read_error_is_raised_to_the_consumer():
+    with pytest.raises(OSError, match="cannot read"):
+        list(Pipeline(read_failing, square, io_workers=2).run(range(5)))
+
+
+@pytest.mark.parametrize("cpu_workers", [1, 2])
+def test_slow_consumer_holds_back_the_producers(cpu_workers):
+    io_workers, queue_size = 2, 2
+    pulled = []
+
+    def tasks():
+        for task in range(60):
+            pulled.append(task)
+            yield task
+
+    pipeline = Pipeline(read_every_task, square, io_workers=io_workers, cpu_workers=cpu_workers, queue_size=queue_size)
+    # Items held by the three queues, the read threads and the parses in flight, plus one each by the
+    # discover thread, the parse thread waiting for a free slot and the consumer
+    bound = 3 * queue_size + io_workers + 2 * cpu_workers + 3
+
+    results = []
+    for task, result in pipeline.run(tasks()):
+        time.sleep(0.01)
+        results.append((task, result))
+        assert len(pulled) - len(results) <= bound
+
+    assert sorted(results) == [(task, task * task) for task in range(60)]
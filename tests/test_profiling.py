@@ -0,0 +1,24 @@
+import pstats
+import cProfile
+import threading
+
+from src import profiling
+
+
+def busy():
+    return sum(i * i for i in range(10000))
+
+
+def test_cprofile_session_includes_stage_threads(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    with profiling.ProfileSession(profiling.CPROFILE, "job") as session:
+        threads = [threading.Thread(target=profiling.profile_thread(busy)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # A stage thread that failed before its profiler ran
+        session._thread_profiles.append(cProfile.Profile())
+
+    stats = pstats.Stats(str(session.path))
+    assert any(function == "busy" for _, _, function in stats.stats)
@@ -0,0 +1,68 @@
+"""
+Parity of the compiled, single-pass queries with the extractors they replaced.
+
+`samples/expected/` holds the `TreeNode` of every sample as extracted by the original per-file
+traversers, regenerated only when a change to the extracted data is intended. The original Kotlin
+query captured `import_list`, which the shipped grammar does not have, so its expected imports were
+extracted with `import` instead. Imports, class names and property declarations are collected
+through sets, so they are compared sorted, and exports deduplicated as the original traversers ran
+their query again on child nodes, which repeated them.
+"""
+
+import json
+import pathlib
+
+import pytest
+
+from src.parser import queries
+from src.parser.process import EXTENSION_LANGUAGES, process_code_bytes
+
+SAMPLES = pathlib.Path(__file__).parent / "samples"
+SAMPLE_FILES = sorted(path for path in SAMPLES.iterdir() if path.suffix in EXTENSION_LANGUAGES)
+
+
+def normalize(data):
+    imports = data["imports"]
+    if isinstance(imports, str):
+        imports = imports.split("\n")
+    return {
+        **data,
+        "imports": sorted(filter(None, imports)),
+        "class_names": sorted(data["class_names"]),
+        "property_declarations": sorted(data["property_declarations"]),
+        "exports": sorted(set(data["exports"])),
+    }
+
+
+def test_every_language_has_a_sample():
+    assert {EXTENSION_LANGUAGES[path.suffix] for path in SAMPLE_FILES} == set(EXTENSION_LANGUAGES.values())
+
+
+@pytest.mark.parametrize("path", SAMPLE_FILES, ids=lambda path: path.name)
+def test_tree_matches_original_extractors(languages, path):
+    language = languages[EXTENSION_LANGUAGES[path.suffix]]
+    node_tree = process_code_bytes(path.read_bytes(), language, path.name)
+
+    with open(SAMPLES / "expected" / f"{path.name}.json") as f:
+        expected = json.load(f)
+    assert normalize(node_tree.to_dict()) == normalize(expected)
+
+
+def test_every_query_compiles(languages):
+    for language in languages.values():
+        assert queries.get_query(language) is not None, language.name
+
+
+def test_invalid_query_skips_its_language_only(languages, monkeypatch):
+    kotlin = languages["kotlin"]
+    key = (kotlin.name, kotlin.language_id)
+    monkeypatch.setitem(queries._query_sources, "kotlin", "(import_list) @import")
+    monkeypatch.delitem(queries._compiled_queries, key, raising=False)
+    monkeypatch.setattr(queries, "_failed_queries", set())
+
+    kotlin_tree = process_code_bytes((SAMPLES / "Repository.kt").read_bytes(), kotlin, "Repository.kt")
+    assert kotlin_tree.file_path == "Repository.kt"
+    assert kotlin_tree.functions == [] and kotlin_tree.imports == ""
+
+    python_tree = process_code_bytes((SAMPLES / "report.py").read_bytes(), languages["python"], "report.py")
+    assert [function.name for function in python_tree.functions] == ["__init__", "top", "load"]
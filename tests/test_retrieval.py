@@ -0,0 +1,64 @@
+import pytest
+
+from src.parser.TreeNode import FunctionNode, TreeNode
+from src.parser.retrieval import FUNCTION, OUTLINE, RetrievalIndex
+
+
+def tree(file_path, class_name, functions):
+    return TreeNode(
+        file_path=file_path,
+        class_names=[class_name],
+        functions=[FunctionNode(name, [], "void", body, class_names=[class_name]) for name, body in functions],
+    )
+
+
+FILE_TREES = {
+    "repos/shop/src/Invoice.java": tree("repos/shop/src/Invoice.java", "Invoice", [("computeTotal", "return sum;")]),
+    "repos/shop/src/Ledger.java": tree("repos/shop/src/Ledger.java", "Ledger", [("record", "entries.add(entry);")]),
+    "repos/shop/src/Mailer.java": tree("repos/shop/src/Mailer.java", "Mailer", [("send", "smtp.send(message);")]),
+}
+LINKS = [{"source": "repos/shop/src/Ledger.java", "target": "repos/shop/src/Invoice.java"}]
+
+
+def test_rank_best_match_first():
+    index = RetrievalIndex(FILE_TREES, LINKS)
+
+    score, unit_id = index.rank("how is the invoice total computed")[0]
+
+    assert score == pytest.approx(1.0)
+    assert (index.units[unit_id].file, index.units[unit_id].name) == ("repos/shop/src/Invoice.java", "computeTotal")
+
+
+def test_rank_seeds_proximity_from_the_best_files():
+    index = RetrievalIndex(FILE_TREES, LINKS)
+
+    ranked = {(index.units[unit_id].file, index.units[unit_id].kind): score for score, unit_id in index.rank("invoice")}
+
+    # The linked ledger outline does not match the question but ranks through its link to the invoice
+    assert ranked[("repos/shop/src/Ledger.java", OUTLINE)] > 0
+    assert ("repos/shop/src/Mailer.java", OUTLINE) not in ranked
+    assert ("repos/shop/src/Ledger.java", FUNCTION) not in ranked
+
+
+def test_build_context_truncates_an_oversized_first_unit():
+    trees = {
+        "repos/shop/src/Invoice.java": tree(
+            "repos/shop/src/Invoice.java", "Invoice", [("computeTotal", "total += line.amount;\n" * 500)]
+        )
+    }
+
+    context = RetrievalIndex(trees).build_context("line amount", token_budget=100)
+
+    assert context["items"][0]["name"] == "computeTotal"
+    assert 0 < context["tokens"] <= 100
+    assert context["context"].endswith("...\n```")
+
+
+def test_build_context_rejects_a_non_positive_budget():
+    with pytest.raises(ValueError):
+        RetrievalIndex(FILE_TREES, LINKS).build_context("invoice", token_budget=0)
+
+
+@pytest.mark.parametrize("budget", [0, -5])
+def test_context_endpoint_rejects_a_non_positive_budget(client, budget):
+    assert client.post("/context", json={"question": "invoice", "budget": budget}).status_code == 400
@@ -0,0 +1,6 @@
+import pytest
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_grep_rejects_a_non_positive_limit(client, limit):
+    assert client.get(f"/grep?q=main&limit={limit}").status_code == 400
@@ -0,0 +1,108 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from src.parser.walker import GitIgnore, is_ignored, walk_source_files
+
+# (patterns, relative path, is_dir, expected result of `GitIgnore.match`)
+CASES = [
+    # Unanchored patterns match at any depth, anchored ones only below the .gitignore directory
+    (["foo"], "foo", False, True),
+    (["foo"], "src/foo", False, True),
+    (["foo"], "src/foo", True, True),
+    (["/foo"], "foo", False, True),
+    (["/foo"], "src/foo", False, None),
+    (["src/foo"], "src/foo", False, True),
+    (["src/foo"], "lib/src/foo", False, None),
+    (["*.log"], "a/b/debug.log", False, True),
+    (["*.log"], "a/b/debug.logs", False, None),
+    (["debug?.js"], "debug1.js", False, True),
+    (["debug?.js"], "debug10.js", False, None),
+    (["[ab].js"], "b.js", False, True),
+    (["[!ab].js"], "b.js", False, None),
+    (["[!ab].js"], "c.js", False, True),
+    # `*` does not cross directories, `**` does
+    (["src/*.py"], "src/a.py", False, True),
+    (["src/*.py"], "src/sub/a.py", False, None),
+    (["**/gen"], "gen", True, True),
+    (["**/gen"], "a/b/gen", True, True),
+    (["src/**/gen.py"], "src/gen.py", False, True),
+    (["src/**/gen.py"], "src/a/b/gen.py", False, True),
+    (["src/**"], "src/a/b.py", False, True),
+    # A trailing slash only matches directories
+    (["build/"], "build", True, True),
+    (["build/"], "build", False, None),
+    (["build/"], "src/build", True, True),
+    # The last matching pattern wins, so negation re-includes what an earlier pattern ignored
+    (["*.js", "!keep.js"], "keep.js", False, False),
+    (["*.js", "!keep.js"], "drop.js", False, True),
+    (["!keep.js", "*.js"], "keep.js", False, True),
+    # Comments, blank lines and escapes
+    (["# foo", "", "   "], "# foo", False, None),
+    (["\\#foo"], "#foo", False, True),
+    (["\\!important"], "!important", False, True),
+]
+
+
+@pytest.mark.parametrize("patterns, path, is_dir, expected", CASES)
+def test_match(tmp_path, patterns, path, is_dir, expected):
+    gitignore = GitIgnore(str(tmp_path), [f"{pattern}\n" for pattern in patterns])
+
+    assert gitignore.match(os.path.join(str(tmp_path), *path.split("/")), is_dir) is expected
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+@pytest.mark.parametrize("patterns, path, is_dir, expected", CASES)
+def test_match_agrees_with_git(tmp_path, git, patterns, path, is_dir, expected):
+    git(tmp_path, "init", "-q")
+    (tmp_path / ".gitignore").write_text("".join(f"{pattern}\n" for pattern in patterns))
+    target = tmp_path / path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if is_dir:
+        target.mkdir()
+    else:
+        target.write_text("")
+
+    checked = subprocess.run(
+        ["git", "-C", str(tmp_path), "check-ignore", "--verbose", "--non-matching", "--no-index", path + "/" * is_dir],
+        capture_output=True, text=True
+    )
+
+    source, _, _ = checked.stdout.partition("\t")
+    pattern = source.split(":", 2)[2] if source.count(":") >= 2 else ""
+    git_result = None if not pattern else not pattern.startswith("!")
+    assert git_result is expected
+
+
+def test_nested_gitignore_takes_precedence(tmp_path):
+    files = {
+        ".gitignore": "*.gen.java\nbuild/\n",
+        "Main.java": "",
+        "Main.gen.java": "",
+        "build/Out.java": "",
+        "app/.gitignore": "!Keep.gen.java\n/Local.java\n",
+        "app/Keep.gen.java": "",
+        "app/Other.gen.java": "",
+        "app/Local.java": "",
+        "app/sub/Local.java": "",
+    }
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+    found = sorted(os.path.relpath(path, tmp_path) for path, _ in walk_source_files(str(tmp_path), {".java": "java"}))
+
+    assert found == ["Main.java", "app/Keep.gen.java", "app/sub/Local.java"]
+
+
+def test_is_ignored_lets_the_innermost_match_win(tmp_path):
+    outer = GitIgnore(str(tmp_path), ["*.txt\n"])
+    inner = GitIgnore(str(tmp_path / "docs"), ["!notes.txt\n"])
+    path = str(tmp_path / "docs" / "notes.txt")
+
+    assert is_ignored((outer,), path, False)
+    assert not is_ignored((outer, inner), path, False)
+    assert is_ignored((outer, inner), str(tmp_path / "docs" / "todo.txt"), False)